@@ -0,0 +1,163 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL = 6 * 60 * 60
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    return _SPACES.sub(" ", query).strip().casefold().rstrip("?.! ")
+
+
+def chunks_fingerprint(chunks):
+    digest = hashlib.blake2b(digest_size=16)
+    for row in chunks:
+        digest.update(row["chunk"].encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class MemoryBackend:
+    """Process-local LRU store with a TTL, an entry cap and a byte cap."""
+
+    def __init__(
+        self,
+        ttl=DEFAULT_TTL,
+        max_entries=DEFAULT_MAX_ENTRIES,
+        max_bytes=DEFAULT_MAX_BYTES,
+        clock=time.monotonic,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, size, expires = entry
+            if expires <= self.clock():
+                self._drop(key)
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        size = len(key) + len(value.encode())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, size, self.clock() + self.ttl)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+
+class SharedBackend:
+    """Store answers in a shared key-value service so every worker can reuse them.
+
+    ``client`` needs redis-py style ``get(key)`` and ``set(key, value, ex=ttl)``.
+    A failing client is treated as a miss so the answer is still generated.
+    """
+
+    def __init__(self, client, ttl=DEFAULT_TTL, prefix="pulse:answer:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.errors = 0
+
+    def get(self, key):
+        try:
+            value = self.client.get(self.prefix + key)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"answer cache get failed: {e}")
+            return None
+        if isinstance(value, bytes):
+            value = value.decode()
+        return value
+
+    def set(self, key, value):
+        try:
+            self.client.set(self.prefix + key, value.encode(), ex=self.ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"answer cache set failed: {e}")
+
+
+class AnswerCache:
+    """Exact-match cache of LLM answers for the RAG answer states.
+
+    An answer is keyed on the normalized query, a fingerprint of the retrieved
+    chunks and the prompt version, so re-indexed knowledge or an edited prompt
+    never serves a stale answer. ``key`` returns None for a query that should
+    not be cached, and ``get``/``put`` treat a None key as a miss.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(query, chunks, prompt_version):
+        query = normalize_query(query)
+        if not query:
+            return None
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{prompt_version}\0{query}\0".encode())
+        digest.update(chunks_fingerprint(chunks).encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        if key is None:
+            return None
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, key, answer):
+        if key is not None and answer:
+            self.backend.set(key, answer)
+
+    def stats(self):
+        stats = {"hits": self.hits, "misses": self.misses}
+        for name in ("bytes", "evictions", "expirations", "errors"):
+            if hasattr(self.backend, name):
+                stats[name] = getattr(self.backend, name)
+        return stats
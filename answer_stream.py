@@ -0,0 +1,65 @@
+import re
+import time
+
+DEFAULT_MIN_CHARS = 80
+DEFAULT_INTERVAL = 1.0
+
+# where a part may end: after . ? or ! followed by whitespace, or at a newline
+_BREAK = re.compile(r"(?<=[.?!])\s|\n")
+
+
+class AnswerStream:
+    """Sends an LLM answer to the user a few sentences at a time.
+
+    ``send`` reads the answer from an iterator of text pieces, such as
+    ``deps.llm_stream``, and passes it on as parts that end at a sentence
+    break and hold at least ``min_chars`` characters. A part is held back
+    until ``interval`` seconds have passed since the one before, and text
+    generated meanwhile is joined into it, so a fast model does not flood the
+    chat. Whatever is left when the stream ends is sent at once.
+
+    In ``process_input_or_callback_async`` the parts are handed to the host's
+    ``cb`` on the event loop as they are produced, while the answer state is
+    still running in the executor. The bots do not stream for sessions with a
+    ``batch_cb``: it receives a turn's outputs in one list at the end of the
+    turn, so the answer is generated and sent whole.
+    """
+
+    def __init__(
+        self,
+        min_chars=DEFAULT_MIN_CHARS,
+        interval=DEFAULT_INTERVAL,
+        clock=time.monotonic,
+    ):
+        self.min_chars = min_chars
+        self.interval = interval
+        self.clock = clock
+
+    def send(self, send_text, pieces):
+        """Pass the answer in ``pieces`` to ``send_text`` part by part.
+
+        Returns the whole answer, exactly as generated.
+        """
+        text = []
+        pending = ""
+        sent_at = None
+        for piece in pieces:
+            text.append(piece)
+            pending += piece
+            cut = self._cut(pending)
+            if cut and (sent_at is None or self.clock() - sent_at >= self.interval):
+                part, pending = pending[:cut], pending[cut:]
+                send_text(part.strip())
+                sent_at = self.clock()
+        if pending.strip():
+            send_text(pending.strip())
+        return "".join(text)
+
+    def _cut(self, text):
+        # the last break that leaves min_chars before it, or 0 while there is none
+        if len(text) < self.min_chars:
+            return 0
+        cut = 0
+        for match in _BREAK.finditer(text, self.min_chars):
+            cut = match.start()
+        return cut
@@ -0,0 +1,41 @@
+import weakref
+
+# callers pass their own timeout; see beckn.TIMEOUTS
+DEFAULT_TIMEOUT = None
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def client():
+    """Return the httpx.AsyncClient shared by every conversation on the running loop."""
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    http = _clients.get(loop)
+    if http is None:
+        import httpx
+
+        http = httpx.AsyncClient(
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+        _clients[loop] = http
+    return http
+
+
+async def post(url, json=None, **kwargs):
+    return await client().post(url, json=json, **kwargs)
+
+
+async def aclose():
+    """Close the running loop's client; call it before the loop shuts down."""
+    import asyncio
+
+    http = _clients.pop(asyncio.get_running_loop(), None)
+    if http is not None:
+        await http.aclose()
@@ -0,0 +1,295 @@
+import contextvars
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import async_http
+import tracing
+
+BAP_CLIENT_URL = "https://ps-bap-client.becknprotocol.io"
+BAP_ID = "ps-bap-network.becknprotocol.io"
+BAP_URI = "https://ps-bap-network.becknprotocol.io"
+DOMAIN = "online-dispute-resolution:0.1.0"
+CORE_VERSION = "1.1.0"
+TTL = "PT10M"
+
+# (connect, read) seconds per action
+TIMEOUTS = {
+    "search": (3.05, 30),
+    "select": (3.05, 20),
+    "init": (3.05, 20),
+    "confirm": (3.05, 30),
+}
+# actions that only read from the gateway, so they are safe to send again
+IDEMPOTENT_ACTIONS = frozenset({"search", "select"})
+# seconds for a batch of calls sent with post_many to all come back
+BATCH_DEADLINE = 25
+RETRY_STATUSES = frozenset({502, 503, 504})
+
+logger = logging.getLogger("beckn")
+
+
+def context(action, provider=None):
+    """Return the Beckn ``context`` block for ``action``, addressed to ``provider``."""
+    ctx = {
+        "domain": DOMAIN,
+        "location": {"country": {"code": "IND"}},
+        "action": action,
+        "version": CORE_VERSION,
+        "transaction_id": "",
+        "message_id": "",
+        "timestamp": "",
+        "bap_id": BAP_ID,
+        "bap_uri": BAP_URI,
+        "ttl": TTL,
+    }
+    if provider is not None:
+        ctx["bpp_id"] = provider["bpp_id"]
+        ctx["bpp_uri"] = provider["bpp_uri"]
+    return ctx
+
+
+def parse_providers(response_data):
+    """Return the providers listed in a /search response, one dict per provider."""
+    providers = []
+    for resp in response_data["responses"]:
+        if "providers" in resp["message"]:
+            for provider in resp["message"]["providers"]:
+                providers.append(
+                    {
+                        "bpp_id": resp["context"]["bpp_id"],
+                        "bpp_uri": resp["context"]["bpp_uri"],
+                        "id": provider["id"],
+                        "name": provider["descriptor"]["name"],
+                        "short_desc": provider["descriptor"]["short_desc"],
+                        "long_desc": provider["descriptor"]["long_desc"],
+                        "url": provider["descriptor"]["additional_desc"]["url"],
+                    }
+                )
+        else:
+            print("No providers found in the response")
+    return providers
+
+
+def parse_quote(response_data):
+    """Return the quote in a /select response, or None if no BPP answered."""
+    if response_data["responses"] == []:
+        return None
+    quote = response_data["responses"][0]["message"]["order"]["quote"]
+    return {
+        "quote": quote["price"]["value"],
+        "base_fee": quote["breakup"][0]["price"]["value"],
+        "fee_per_hearing": quote["breakup"][1]["price"]["value"],
+    }
+
+
+class FailedResponse:
+    """Stands in for a response when the gateway could not be reached in time."""
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        raise ValueError(self.text)
+
+
+class ActionStats:
+    __slots__ = ("calls", "errors", "retries", "total", "max")
+
+    def __init__(self):
+        self.calls = self.errors = self.retries = 0
+        self.total = self.max = 0.0
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "mean_seconds": self.total / self.calls if self.calls else 0.0,
+            "max_seconds": self.max,
+        }
+
+
+class BecknClient:
+    """Client for the BAP's Beckn API, shared by every session of both bots.
+
+    Calls go through one pooled ``requests.Session`` (or the event loop's
+    ``async_http`` client) with per-action connect/read timeouts. Idempotent
+    actions are retried on connection errors, timeouts and gateway errors with
+    jittered exponential backoff, waiting at most ``max_backoff`` seconds
+    between attempts. A call that still fails returns a ``FailedResponse``
+    with status 504 or 503, so the bots answer it like any other failed
+    request instead of raising mid-conversation.
+    """
+
+    def __init__(
+        self,
+        base_url=BAP_CLIENT_URL,
+        timeouts=TIMEOUTS,
+        retries=2,
+        backoff=0.25,
+        max_backoff=2.0,
+        pool_size=32,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeouts = dict(timeouts)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pool_size = pool_size
+        self._session = None
+        self._executor = None
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def url(self, action):
+        return f"{self.base_url}/{action}"
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=4, pool_maxsize=self.pool_size
+                    )
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
+    def post(self, action, data):
+        import requests
+
+        timeout = self.timeouts.get(action, TIMEOUTS["confirm"])
+        for attempt in range(self._attempts(action)):
+            if attempt:
+                time.sleep(self._delay(attempt))
+            start = time.perf_counter()
+            try:
+                response = self.session.post(
+                    self.url(action), json=data, timeout=timeout
+                )
+            except requests.Timeout as e:
+                response = FailedResponse(504, f"{action} timed out: {e}")
+            except requests.ConnectionError as e:
+                response = FailedResponse(503, f"{action} connection failed: {e}")
+            self._record(action, time.perf_counter() - start, response, attempt)
+            if response.status_code not in RETRY_STATUSES:
+                break
+        return response
+
+    async def post_async(self, action, data):
+        import asyncio
+
+        import httpx
+
+        connect, read = self.timeouts.get(action, TIMEOUTS["confirm"])
+        timeout = httpx.Timeout(read, connect=connect)
+        for attempt in range(self._attempts(action)):
+            if attempt:
+                await asyncio.sleep(self._delay(attempt))
+            start = time.perf_counter()
+            try:
+                response = await async_http.post(
+                    self.url(action), json=data, timeout=timeout
+                )
+            except httpx.TimeoutException as e:
+                response = FailedResponse(504, f"{action} timed out: {e!r}")
+            except httpx.TransportError as e:
+                response = FailedResponse(503, f"{action} connection failed: {e!r}")
+            self._record(action, time.perf_counter() - start, response, attempt)
+            if response.status_code not in RETRY_STATUSES:
+                break
+        return response
+
+    def post_many(self, action, bodies, deadline=BATCH_DEADLINE):
+        """Send ``bodies`` to ``action`` concurrently and return the responses in order.
+
+        Calls still running after ``deadline`` seconds are answered with a 504
+        ``FailedResponse`` and left to finish in the background.
+        """
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.pool_size, thread_name_prefix="beckn"
+                    )
+        # each call runs in a copy of this context, so it is traced under this turn
+        submit = self._executor.submit
+        futures = [
+            submit(contextvars.copy_context().run, self.post, action, data)
+            for data in bodies
+        ]
+        wait(futures, timeout=deadline)
+        return [self._result(action, future, deadline) for future in futures]
+
+    async def post_many_async(self, action, bodies, deadline=BATCH_DEADLINE):
+        import asyncio
+
+        tasks = [
+            asyncio.ensure_future(self.post_async(action, data)) for data in bodies
+        ]
+        _, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        return [self._result(action, task, deadline) for task in tasks]
+
+    def stats(self):
+        """Return call counts and latency per action."""
+        with self._lock:
+            return {action: s.as_dict() for action, s in self._stats.items()}
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    @staticmethod
+    def _result(action, future, deadline):
+        if not future.done() or future.cancelled():
+            return FailedResponse(504, f"{action} missed the {deadline}s deadline")
+        return future.result()
+
+    def _attempts(self, action):
+        return 1 + self.retries if action in IDEMPOTENT_ACTIONS else 1
+
+    def _delay(self, attempt):
+        delay = self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+        return min(delay, self.max_backoff)
+
+    def _record(self, action, elapsed, response, attempt):
+        tracing.record(
+            f"beckn.{action}",
+            elapsed,
+            status_code=response.status_code,
+            attempt=attempt + 1,
+        )
+        with self._lock:
+            stats = self._stats.get(action)
+            if stats is None:
+                stats = self._stats[action] = ActionStats()
+            stats.calls += 1
+            stats.total += elapsed
+            stats.max = max(stats.max, elapsed)
+            if attempt:
+                stats.retries += 1
+            if response.status_code != 200:
+                stats.errors += 1
+        if response.status_code in RETRY_STATUSES:
+            logger.warning(
+                f"{action} attempt {attempt + 1} failed with {response.status_code}"
+            )
+
+
+default_client = BecknClient()
@@ -0,0 +1,122 @@
+"""Time to the first visible answer text, with and without an AnswerStream.
+
+The ``llm`` module of ``conversations.py`` gets an ``llm_stream`` that
+yields a six-sentence answer a word at a time, ``token_ms`` apart; its
+``llm`` takes as long and returns the same text. Each bot is walked up to
+a RAG answer, then the turn that receives the chunks is timed: when ``cb``
+first got text, how many messages the answer took and how long the turn
+ran, on the sync path and on the async one, where the answer state runs in
+the executor. The answer stored in the chat history must be the same in
+every mode:
+
+    python pulse/benchmarks/answer_streaming.py [runs] [token_ms]
+"""
+import asyncio
+import sys
+import time
+
+import conversations
+from answer_cache import AnswerCache
+from answer_stream import AnswerStream
+from conversations import CHUNKS, cb_fsm, venture_fsm
+
+ANSWER = (
+    "A cheque bounce is an offence under Section 138 of the Negotiable "
+    "Instruments Act. The payee must send a legal notice within thirty days "
+    "of the bank's return memo. The drawer then has fifteen days to pay the "
+    "amount of the cheque. If the drawer does not pay, a complaint can be "
+    "filed before the magistrate within one month. The court may impose a "
+    "fine of up to twice the cheque amount, imprisonment of up to two years, "
+    "or both.\nYou can also settle the dispute through online mediation."
+)
+# name: (bot, inputs up to the RAG callback)
+SCRIPTS = {
+    "cb/generate_response": (
+        cb_fsm.FSM,
+        ["hi", "language_selected", "1", "what is a cheque bounce"],
+    ),
+    "venture/generate_query_response": (
+        venture_fsm.FSM,
+        ["hi", "language_selected", "2", "1", "what is udyam"],
+    ),
+}
+MODES = {
+    "off": None,
+    "stream": AnswerStream(),
+    "stream, no pacing": AnswerStream(interval=0),
+}
+TOKEN_DELAY = 0.01
+
+
+def words():
+    return ANSWER.replace(" ", " \0").replace("\n", "\n\0").split("\0")
+
+
+def llm_stream(messages):
+    for word in words():
+        time.sleep(TOKEN_DELAY)
+        yield word
+
+
+def llm(messages):
+    return "".join(llm_stream(messages))
+
+
+def answer_turn(fsm_cls, inputs, stream, run_async):
+    # a cache of its own, so every run asks the model
+    cls = type(
+        fsm_cls.__name__,
+        (fsm_cls,),
+        {"answer_stream": stream, "answer_cache": AnswerCache()},
+    )
+    sent = []
+    fsm = cls(lambda output: sent.append((time.perf_counter(), output)))
+    for text in inputs:
+        fsm.process_input_or_callback(text)
+    sent.clear()
+    start = time.perf_counter()
+    if run_async:
+        asyncio.run(fsm.process_input_or_callback_async(CHUNKS))
+    else:
+        fsm.process_input_or_callback(CHUNKS)
+    end = time.perf_counter()
+    answer = [at for at, output in sent if output.text in ANSWER]
+    history = fsm.variables["history"][-1]["message"]
+    return answer[0] - start, len(answer), end - start, history
+
+
+def main(runs=5, token_ms=10):
+    global TOKEN_DELAY
+    TOKEN_DELAY = token_ms / 1000
+    llm_module = sys.modules["llm"]
+    llm_module.llm, llm_module.llm_stream = llm, llm_stream
+    print(f"{len(words())} words, {token_ms} ms apart")
+    print(f"{'answer turn':34} {'mode':24} {'first text':>10} {'messages':>8}")
+    failures = 0
+    with conversations.stubbed() as quiet:
+        for name, (fsm_cls, inputs) in SCRIPTS.items():
+            for run_async in (False, True):
+                for mode, stream in MODES.items():
+                    first = []
+                    with quiet():
+                        for _ in range(runs):
+                            seconds, parts, total, history = answer_turn(
+                                fsm_cls, inputs, stream, run_async
+                            )
+                            first.append(seconds)
+                            if history != ANSWER:
+                                failures += 1
+                    first.sort()
+                    median = first[len(first) // 2] * 1000
+                    mode = f"{'async' if run_async else 'sync'}, {mode}"
+                    print(
+                        f"  {name:32} {mode:24} {median:7.0f} ms {parts:8} "
+                        f"(turn {total * 1000:.0f} ms)"
+                    )
+    if failures:
+        print(f"{failures} runs stored a different answer in the history")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
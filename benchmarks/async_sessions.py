@@ -0,0 +1,111 @@
+"""Drive many cheque-bounce conversations concurrently on one event loop.
+
+Each conversation walks to the ODR provider list and picks a provider, making
+the Beckn /search and /select calls. The Beckn gateway is replaced by a fake
+with a fixed latency, so the run shows how far one loop overlaps the waits:
+
+    python pulse/benchmarks/async_sessions.py [conversations] [latency_ms]
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import async_http
+import cb_fsm
+
+INPUTS = ["hi", "language_selected", "4", "1", "1", "1"]
+RESPONSES = {
+    "search": {
+        "responses": [
+            {
+                "context": {"bpp_id": "bpp", "bpp_uri": "https://bpp.example"},
+                "message": {
+                    "providers": [
+                        {
+                            "id": "p1",
+                            "descriptor": {
+                                "name": "Provider",
+                                "short_desc": "Online arbitration",
+                                "long_desc": "Arbitration for financial disputes",
+                                "additional_desc": {"url": "https://bpp.example"},
+                            },
+                        }
+                    ]
+                },
+            }
+        ]
+    },
+    "select": {
+        "responses": [
+            {
+                "message": {
+                    "order": {
+                        "quote": {
+                            "price": {"value": "1500"},
+                            "breakup": [
+                                {"price": {"value": "500"}},
+                                {"price": {"value": "1000"}},
+                            ],
+                        }
+                    }
+                }
+            }
+        ]
+    },
+}
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self._data = data
+        self.text = json.dumps(data)
+
+    def json(self):
+        return self._data
+
+
+def fake_gateway(latency):
+    async def post(url, json=None, **kwargs):
+        await asyncio.sleep(latency)
+        return FakeResponse(RESPONSES[url.rsplit("/", 1)[1]])
+
+    return post
+
+
+async def conversation(outputs):
+    async def cb(output):
+        outputs.append(output)
+
+    fsm = cb_fsm.FSM(cb)
+    for message in INPUTS:
+        await fsm.process_input_or_callback_async(message)
+    return fsm.state
+
+
+async def run(conversations):
+    outputs = []
+    return await asyncio.gather(*(conversation(outputs) for _ in range(conversations)))
+
+
+def main(conversations=2000, latency_ms=200):
+    async_http.post = fake_gateway(latency_ms / 1000)
+    start = time.perf_counter()
+    states = asyncio.run(run(conversations))
+    elapsed = time.perf_counter() - start
+    assert set(states) == {"fix_provider"}, set(states)
+
+    serial = conversations * 2 * latency_ms / 1000
+    print(f"conversations      {conversations}")
+    print(f"gateway latency    {latency_ms} ms, 2 calls per conversation")
+    print(f"wall time          {elapsed:.2f} s (blocking one by one: {serial:.0f} s)")
+    print(f"conversations/s    {conversations / elapsed:.0f}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
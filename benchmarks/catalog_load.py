@@ -0,0 +1,36 @@
+"""Time loading the provider workbooks with and without the catalog cache.
+
+    python pulse/benchmarks/catalog_load.py [repeats]
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from catalog import PROVIDER_COLUMNS, CatalogCache, read_providers
+
+WORKBOOKS = ["data/data.xlsx", "data/venture_dummy_catalog.xlsx"]
+
+
+def timed(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+def main(repeats=50):
+    cache = CatalogCache()
+    for name in WORKBOOKS:
+        path = os.path.join(ROOT, name)
+        parse = timed(lambda: read_providers(path, PROVIDER_COLUMNS), repeats)
+        cache.load(path)
+        cached = timed(lambda: cache.load(path), repeats * 100)
+        print(f"{name:35} parse {parse * 1000:7.2f} ms  cached {cached * 1e6:6.1f} us")
+    print(f"cache {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,406 @@
+"""Per-turn cost of ``process_input_or_callback`` over scripted conversations.
+
+Each script walks one major path of a bot, from the greeting to the end of
+the flow. ``cb`` discards its outputs, ``llm`` answers at once (or after
+``--llm-ms``) and the Beckn gateway is a client that returns canned
+responses, so only the bots' own work is timed. The report gives
+p50/p95/p99 latency per turn of every script and per state entered, and the
+memory allocated per turn measured with tracemalloc in a separate pass:
+
+    python pulse/benchmarks/conversations.py [--runs N] [--json out.json]
+        [--compare before.json] [script ...]
+
+``--json`` saves the results so two revisions can be compared with
+``--compare``.
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+LLM_DELAY = 0.0
+
+
+def _llm(messages):
+    if LLM_DELAY:
+        time.sleep(LLM_DELAY)
+    return "Section 138 makes the dishonour of a cheque an offence."
+
+
+# installed before the bots import it, so no run ever reaches a real model
+sys.modules["llm"] = types.SimpleNamespace(
+    llm=_llm,
+    sm=lambda content: {"role": "system", "content": content},
+    um=lambda content: {"role": "user", "content": content},
+)
+
+import beckn
+import cb_fsm
+import search_cache
+import venture_fsm
+
+CHUNKS = '{"chunks": [{"chunk": "Section 138 covers dishonour of cheques."}]}'
+FORM = json.dumps(
+    {
+        "r_name": "Ravi",
+        "r_phone": "9000000001",
+        "r_email": "ravi@example.com",
+        "c_name": "Chitra",
+        "c_phone": "9000000002",
+        "c_email": "chitra@example.com",
+        "c_address": "12 MG Road",
+        "c_city": "Bengaluru",
+        "dispute_details": "Cheque returned unpaid",
+    }
+)
+NOTICE = [
+    "Drawer Name",
+    "Drawer Address",
+    "Payee Name",
+    "Payee Address",
+    "Bank",
+    "123456",
+    "01/01/2024",
+    "50000",
+    "01/02/2024",
+    "Insufficient funds",
+]
+
+# name: (bot, inputs from the greeting to the end of the flow)
+SCRIPTS = {
+    "cb/know_more": (
+        cb_fsm.FSM,
+        ["hi", "language_selected", "1", "what is a cheque bounce", CHUNKS, "1"]
+        + ["can I file a case", CHUNKS, "2", "2"],
+    ),
+    "cb/consult_lawyer": (
+        cb_fsm.FSM,
+        ["hi", "language_selected", "2", "1", "1", "1", "2"],
+    ),
+    "cb/notice_draft": (
+        cb_fsm.FSM,
+        ["hi", "language_selected", "3"] + NOTICE + ["2"],
+    ),
+    "cb/odr": (
+        cb_fsm.FSM,
+        ["hi", "language_selected", "4", "1", "1", "1", "1", FORM, "{}", "1", "2"],
+    ),
+    "venture/udyam_eligibility": (
+        venture_fsm.FSM,
+        ["hi", "language_selected", "2", "2", "1", "1", "1", "2", "2"],
+    ),
+    # stops at the advisor list: choosing an advisor fails in select_advisor
+    "venture/gst": (
+        venture_fsm.FSM,
+        ["hi", "language_selected", "4"],
+    ),
+    "venture/odr": (
+        venture_fsm.FSM,
+        ["hi", "language_selected", "6", "2", "1", "1", "1", FORM, "{}", "1", "2"],
+    ),
+}
+
+PROVIDER = {
+    "id": "provider-1",
+    "descriptor": {
+        "name": "Fair Resolve",
+        "short_desc": "Online mediation",
+        "long_desc": "Mediation of cheque and commercial disputes",
+        "additional_desc": {"url": "https://example.com/fair-resolve"},
+    },
+}
+RESPONSES = {
+    "search": {
+        "responses": [
+            {
+                "context": {"bpp_id": "bpp-1", "bpp_uri": "https://bpp.example.com"},
+                "message": {"providers": [PROVIDER]},
+            }
+        ]
+    },
+    "select": {
+        "responses": [
+            {
+                "message": {
+                    "order": {
+                        "quote": {
+                            "price": {"value": "1500"},
+                            "breakup": [
+                                {"price": {"value": "1000"}},
+                                {"price": {"value": "500"}},
+                            ],
+                        }
+                    }
+                }
+            }
+        ]
+    },
+    "init": {"responses": [{"message": {"order": {}}}]},
+    "confirm": {
+        "responses": [
+            {
+                "message": {
+                    "order": {
+                        "fulfillments": [
+                            {"agent": {"person": {"id": "agent-1", "name": "Asha"}}}
+                        ],
+                        "payments": [{"status": "PAID"}],
+                        "cancellation_terms": [
+                            {"cancellation_fee": {"percentage": "10"}}
+                        ],
+                        "docs": [
+                            {
+                                "descriptor": {"short_desc": "Agreement"},
+                                "url": "https://example.com/agreement.pdf",
+                            }
+                        ],
+                    }
+                }
+            }
+        ]
+    },
+}
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self._data = data
+        self.text = json.dumps(data)
+
+    def json(self):
+        return self._data
+
+
+class CannedClient(beckn.BecknClient):
+    """A Beckn client that answers every call from ``RESPONSES``."""
+
+    def post(self, action, data):
+        return FakeResponse(RESPONSES[action])
+
+    async def post_async(self, action, data):
+        return self.post(action, data)
+
+    def post_many(self, action, bodies, deadline=beckn.BATCH_DEADLINE):
+        return [self.post(action, data) for data in bodies]
+
+    async def post_many_async(self, action, bodies, deadline=beckn.BATCH_DEADLINE):
+        return self.post_many(action, bodies)
+
+
+def _discard(output):
+    pass
+
+
+@contextlib.contextmanager
+def stubbed():
+    """Run the bots on the canned gateway, from a directory that holds pulse/.
+
+    Yields a context manager that sends what the bots print to /dev/null.
+    """
+    clients = cb_fsm.FSM.beckn_client, venture_fsm.FSM.beckn_client
+    cb_fsm.FSM.beckn_client = venture_fsm.FSM.beckn_client = CannedClient()
+    logging.disable(logging.INFO)
+    # the bots read their catalogs and templates from pulse/data
+    workdir = tempfile.mkdtemp()
+    os.symlink(ROOT, os.path.join(workdir, "pulse"))
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    devnull = open(os.devnull, "w")
+    try:
+        yield lambda: contextlib.redirect_stdout(devnull)
+    finally:
+        devnull.close()
+        os.chdir(cwd)
+        os.unlink(os.path.join(workdir, "pulse"))
+        os.rmdir(workdir)
+        logging.disable(logging.NOTSET)
+        cb_fsm.FSM.beckn_client, venture_fsm.FSM.beckn_client = clients
+
+
+def timed(fsm, steps):
+    """Record (state entered, seconds) for every step ``fsm`` takes."""
+    trigger = fsm._graph.trigger
+
+    def next():
+        start = time.perf_counter()
+        result = trigger(fsm)
+        steps.append((fsm.state, time.perf_counter() - start))
+        return result
+
+    fsm.next = next
+
+
+def run_script(fsm_cls, inputs, turns, states):
+    fsm = fsm_cls(_discard)
+    # a fresh cache, so every run sends its own /search
+    fsm.provider_search_cache = search_cache.SearchCache()
+    steps = []
+    timed(fsm, steps)
+    for i, text in enumerate(inputs):
+        start = time.perf_counter()
+        fsm.process_input_or_callback(text)
+        turns[i].append(time.perf_counter() - start)
+    for state, elapsed in steps:
+        states.setdefault(state, []).append(elapsed)
+    return fsm.state
+
+
+def allocations(fsm_cls, inputs, runs):
+    """Return the mean peak bytes and net blocks allocated by each turn."""
+    peaks = [0] * len(inputs)
+    blocks = [0] * len(inputs)
+    tracemalloc.start()
+    try:
+        for _ in range(runs):
+            fsm = fsm_cls(_discard)
+            fsm.provider_search_cache = search_cache.SearchCache()
+            for i, text in enumerate(inputs):
+                before = sys.getallocatedblocks()
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+                fsm.process_input_or_callback(text)
+                peaks[i] += tracemalloc.get_traced_memory()[1] - base
+                blocks[i] += sys.getallocatedblocks() - before
+    finally:
+        tracemalloc.stop()
+    return [p / runs for p in peaks], [b / runs for b in blocks]
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    n = len(ordered)
+
+    def rank(q):
+        # nearest rank
+        return ordered[max(0, -(-n * q // 100) - 1)] * 1e6
+
+    return {
+        "n": n,
+        "mean_us": sum(ordered) / n * 1e6,
+        "p50_us": rank(50),
+        "p95_us": rank(95),
+        "p99_us": rank(99),
+    }
+
+
+def bench(name, runs, alloc_runs):
+    fsm_cls, inputs = SCRIPTS[name]
+    for _ in range(max(1, runs // 10)):
+        run_script(fsm_cls, inputs, [[] for _ in inputs], {})
+    turns = [[] for _ in inputs]
+    states = {}
+    for _ in range(runs):
+        final = run_script(fsm_cls, inputs, turns, states)
+    peaks, blocks = allocations(fsm_cls, inputs, alloc_runs)
+    return {
+        "final_state": final,
+        "conversation_us": sum(sum(t) for t in turns) / runs * 1e6,
+        "turns": [
+            dict(
+                percentiles(samples),
+                input=text[:40],
+                alloc_peak_bytes=peak,
+                alloc_net_blocks=block,
+            )
+            for text, samples, peak, block in zip(inputs, turns, peaks, blocks)
+        ],
+        "states": {state: percentiles(s) for state, s in sorted(states.items())},
+    }
+
+
+def revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(name, result, before=None):
+    old = (before or {}).get(name)
+    line = f"{name}: {result['conversation_us'] / 1000:.2f} ms per conversation"
+    if old:
+        line += f" (was {old['conversation_us'] / 1000:.2f} ms)"
+    print(f"{line}, ends in {result['final_state']}")
+    print(f"  {'turn':36} {'p50':>8} {'p95':>8} {'p99':>8} {'alloc':>9} {'blocks':>7}")
+    for i, turn in enumerate(result["turns"]):
+        label = f"{i + 1:2} {turn['input']!r}"[:36]
+        print(
+            f"  {label:36} {turn['p50_us']:8.1f} {turn['p95_us']:8.1f} "
+            f"{turn['p99_us']:8.1f} {turn['alloc_peak_bytes'] / 1024:7.1f}kB "
+            f"{turn['alloc_net_blocks']:7.0f}"
+        )
+    print(f"  {'state':36} {'p50':>8} {'p95':>8} {'p99':>8} {'p50 was':>9}")
+    old_states = old["states"] if old else {}
+    for state, stats in result["states"].items():
+        was = old_states.get(state, {}).get("p50_us")
+        was = f"{was:9.1f}" if was is not None else f"{'-':>9}"
+        print(
+            f"  {state[:36]:36} {stats['p50_us']:8.1f} {stats['p95_us']:8.1f} "
+            f"{stats['p99_us']:8.1f} {was}"
+        )
+
+
+def main(argv=None):
+    global LLM_DELAY
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("scripts", nargs="*", help=", ".join(SCRIPTS))
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--alloc-runs", type=int, default=20)
+    parser.add_argument("--llm-ms", type=float, default=0.0)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="results saved earlier with --json")
+    args = parser.parse_args(argv)
+    unknown = sorted(set(args.scripts) - set(SCRIPTS))
+    if unknown:
+        parser.error(f"unknown scripts: {', '.join(unknown)}")
+    LLM_DELAY = args.llm_ms / 1000
+
+    before = None
+    if args.compare:
+        with open(args.compare) as f:
+            before = json.load(f)["scripts"]
+
+    results = {}
+    with stubbed() as quiet:
+        for name in args.scripts or SCRIPTS:
+            with quiet():
+                results[name] = bench(name, args.runs, args.alloc_runs)
+            report(name, results[name], before)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    "revision": revision(),
+                    "python": platform.python_version(),
+                    "runs": args.runs,
+                    "llm_ms": args.llm_ms,
+                    "scripts": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
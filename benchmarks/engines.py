@@ -0,0 +1,121 @@
+"""Compare the transitions and builtin engines of fsm_graph.StateGraph.
+
+Every conversation of ``conversations.py`` first runs on both engines, with
+the sync and the async ``process_input_or_callback``. After each turn the
+state, the status, the session variables and the outputs must match those of
+``transitions.Machine``; the first difference is printed and the script
+exits with status 1. Then turn latency is measured on both engines:
+
+    python pulse/benchmarks/engines.py [runs]
+"""
+import asyncio
+import sys
+import time
+import uuid
+from itertools import zip_longest
+
+import conversations
+from conversations import percentiles, search_cache
+from fsm_graph import compiled_graph
+
+ENGINES = ("transitions", "builtin")
+FIELDS = ("state", "status", "variables", "outputs")
+NOT_RUN = (None, "not run", {}, [])
+
+
+def variant(fsm_cls, engine):
+    cls = type(fsm_cls.__name__, (fsm_cls,), {"engine": engine})
+    compiled_graph(cls)
+    return cls
+
+
+def new_session(cls, outputs):
+    fsm = cls(outputs.append)
+    fsm.provider_search_cache = search_cache.SearchCache()
+    return fsm
+
+
+def record(fsm, outputs):
+    turn = (fsm.state, fsm.status, fsm.variables.to_dict(), list(map(repr, outputs)))
+    outputs.clear()
+    return turn
+
+
+def transcript(cls, inputs, run_async):
+    # ids in the Beckn calls come from uuid4; make them the same on every run
+    ids = (uuid.UUID(int=i) for i in range(1, 1_000_000))
+    uuid4, uuid.uuid4 = uuid.uuid4, lambda: next(ids)
+    outputs = []
+    fsm = new_session(cls, outputs)
+    turns = []
+    try:
+        for text in inputs:
+            try:
+                if run_async:
+                    asyncio.run(fsm.process_input_or_callback_async(text))
+                else:
+                    fsm.process_input_or_callback(text)
+            except Exception as e:
+                # the engines must fail the same way too
+                turns.append((fsm.state, "raised", f"{type(e).__name__}: {e}", []))
+                break
+            turns.append(record(fsm, outputs))
+    finally:
+        uuid.uuid4 = uuid4
+    return turns
+
+
+def differential(quiet):
+    failures = 0
+    for name, (fsm_cls, inputs) in conversations.SCRIPTS.items():
+        classes = [variant(fsm_cls, engine) for engine in ENGINES]
+        for run_async in (False, True):
+            with quiet():
+                expected, actual = (
+                    transcript(cls, inputs, run_async) for cls in classes
+                )
+            mode = "async" if run_async else "sync"
+            turns = zip_longest(expected, actual, fillvalue=NOT_RUN)
+            for i, (want, got) in enumerate(turns):
+                if want != got:
+                    failures += 1
+                    print(f"{name} ({mode}): turn {i + 1} {inputs[i]!r} differs")
+                    for field, w, g in zip(FIELDS, want, got):
+                        if w != g:
+                            print(f"  {field}: {w!r} != {g!r}")
+                    break
+            else:
+                print(f"{name} ({mode}): {len(inputs)} turns match")
+    return failures
+
+
+def latency(runs, quiet):
+    print(f"{'turn latency':28} {'engine':12} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, (fsm_cls, inputs) in conversations.SCRIPTS.items():
+        for engine in ENGINES:
+            cls = variant(fsm_cls, engine)
+            samples = []
+            with quiet():
+                for _ in range(runs):
+                    fsm = new_session(cls, [])
+                    for text in inputs:
+                        start = time.perf_counter()
+                        fsm.process_input_or_callback(text)
+                        samples.append(time.perf_counter() - start)
+            stats = percentiles(samples)
+            print(
+                f"  {name:26} {engine:12} {stats['p50_us']:8.1f} "
+                f"{stats['p95_us']:8.1f} {stats['p99_us']:8.1f}"
+            )
+
+
+def main(runs=200):
+    with conversations.stubbed() as quiet:
+        failures = differential(quiet)
+        if failures:
+            sys.exit(1)
+        latency(runs, quiet)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
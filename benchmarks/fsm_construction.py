@@ -0,0 +1,52 @@
+"""Per-session construction cost: a Machine per session vs. the compiled StateGraph.
+
+Run from the directory the bots run from (the parent of ``pulse``):
+
+    python pulse/benchmarks/fsm_construction.py [sessions]
+"""
+import logging
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transitions import Machine
+
+import cb_fsm
+import venture_fsm
+from fsm_graph import compiled_graph
+
+# FSM now defines ``next`` itself, which transitions warns about when binding.
+logging.getLogger("transitions").setLevel(logging.ERROR)
+
+
+def _noop(output):
+    pass
+
+
+def per_machine(fsm_cls, graph):
+    # What FSM.__init__ did before the graph was compiled: rebuild the
+    # transitions list and a full Machine bound to the new session.
+    model = fsm_cls.__new__(fsm_cls)
+    model.cb = _noop
+    transitions = [dict(t) for t in reversed(graph.transitions)]
+    transitions.reverse()
+    Machine(model=model, states=list(graph.states), transitions=transitions, initial="zero")
+
+
+def main(sessions=2000):
+    for module in (cb_fsm, venture_fsm):
+        fsm_cls = module.FSM
+        graph = compiled_graph(fsm_cls)
+        before = timeit.timeit(lambda: per_machine(fsm_cls, graph), number=sessions)
+        after = timeit.timeit(lambda: fsm_cls(_noop), number=sessions)
+        print(
+            f"{module.__name__}: per-session Machine {before / sessions * 1e6:.1f}us, "
+            f"compiled graph {after / sessions * 1e6:.2f}us "
+            f"({before / after:.0f}x faster)"
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,128 @@
+"""Guard evaluations per turn with sequential and compiled dispatch.
+
+The conversations of ``conversations.py`` run on copies of both bots whose
+guards and discriminator keys count their calls, once with every guard
+checked in turn as ``Machine`` does and once with ``compiled_dispatch``.
+The report gives the calls per turn, then the time of one ``next`` out of
+the states with the most guards, with their enter and exit callbacks
+switched off:
+
+    python pulse/benchmarks/guard_dispatch.py [runs] [steps]
+"""
+import functools
+import sys
+import time
+from collections import Counter
+
+import conversations
+from conversations import CHUNKS, cb_fsm, search_cache, venture_fsm
+from fsm_graph import StateGraph
+
+SCRIPTS = dict(
+    conversations.SCRIPTS,
+    **{
+        "venture/udyam_question": (
+            venture_fsm.FSM,
+            ["hi", "language_selected", "2", "1", "what is udyam", CHUNKS]
+            + ["2", "1", "1", "1", "1"],
+        )
+    },
+)
+# (bot, state, input, variables); the first guard checked, then the last
+STEPS = [
+    (cb_fsm.FSM, "select_options_main", "4", {}),
+    (cb_fsm.FSM, "select_options_main", "1", {}),
+    (venture_fsm.FSM, "select_options_main", "6", {}),
+    (venture_fsm.FSM, "select_options_main", "1", {}),
+    (venture_fsm.FSM, "generate_query_response", "", {"rag_trigger": "slot"}),
+    (venture_fsm.FSM, "generate_query_response", "", {"rag_trigger": "investment"}),
+]
+
+
+def variant(fsm_cls, compiled, calls=None):
+    """Return a subclass of ``fsm_cls`` with its own graph.
+
+    With ``calls``, its guards and discriminator keys count their calls there.
+    """
+    transitions = fsm_cls.build_transitions()
+    guards = set()
+    for t in transitions:
+        conditions = t.get("conditions", ())
+        guards.update([conditions] if isinstance(conditions, str) else conditions)
+
+    def counted(label, func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            calls[label] += 1
+            return func(*args)
+
+        return wrapper
+
+    keys = {}
+    namespace = {"compiled_dispatch": compiled}
+    for name in guards if calls is not None else ():
+        guard = namespace[name] = counted("guards", getattr(fsm_cls, name))
+        if hasattr(guard, "discriminator"):
+            key, value = guard.discriminator
+            if key not in keys:
+                keys[key] = counted("keys", key)
+            guard.discriminator = (keys[key], value)
+    cls = type(fsm_cls.__name__, (fsm_cls,), namespace)
+    states = fsm_cls.states + getattr(fsm_cls, "extra_states", ())
+    cls._graph = StateGraph(cls, states, transitions, compiled=compiled)
+    return cls
+
+
+def count_calls(runs, quiet):
+    print(f"{'calls per turn':30} {'sequential':>10} {'compiled':>17}")
+    for name, (fsm_cls, inputs) in SCRIPTS.items():
+        counts = []
+        for compiled in (False, True):
+            calls = Counter()
+            cls = variant(fsm_cls, compiled, calls)
+            with quiet():
+                for _ in range(runs):
+                    fsm = cls(lambda output: None)
+                    fsm.provider_search_cache = search_cache.SearchCache()
+                    for text in inputs:
+                        fsm.process_input_or_callback(text)
+            turns = runs * len(inputs)
+            counts.append((calls["guards"] / turns, calls["keys"] / turns))
+        (sequential, _), (guards, keys) = counts
+        print(f"  {name:28} {sequential:10.2f} {guards:8.2f} + {keys:.2f} keys")
+
+
+def time_steps(number):
+    print(f"{'one next() out of':56} {'sequential':>10} {'compiled':>10}")
+    for fsm_cls, state, text, variables in STEPS:
+        times = []
+        for compiled in (False, True):
+            cls = variant(fsm_cls, compiled)
+            fsm = cls(lambda output: None)
+            for callback in dir(cls):
+                if callback.startswith(("on_enter_", "on_exit_")):
+                    setattr(fsm, callback, lambda: None)
+            for k, v in variables.items():
+                fsm.variables[k] = v
+            fsm.input = text
+            best = float("inf")
+            for _ in range(5):
+                start = time.perf_counter()
+                for _ in range(number):
+                    fsm.state = state
+                    fsm.next()
+                best = min(best, time.perf_counter() - start)
+            times.append(best / number * 1e6)
+        given = text or ", ".join(f"{k}={v}" for k, v in variables.items())
+        name = f"{fsm_cls.__module__} {state} {given}"
+        print(f"  {name:54} {times[0]:7.2f} us {times[1]:7.2f} us")
+
+
+def main(runs=50, steps=20000):
+    with conversations.stubbed() as quiet:
+        count_calls(runs, quiet)
+        time_steps(steps)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,65 @@
+"""Prompt history size and build time per turn: full joined history vs. ChatHistory.
+
+    python pulse/benchmarks/history_window.py [turns]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_history import ChatHistory, estimate_tokens
+from session_state import SessionVariables
+
+ANSWER = (
+    "According to the Negotiable Instruments Act, a bounced cheque can lead to a "
+    "penalty. Banks may also charge a fee depending on their policy. "
+    "This is not legal advice. "
+) * 3
+
+
+class Variables(SessionVariables):
+    __slots__ = ("history", "history_summary")
+
+
+def main(turns=200):
+    window = ChatHistory()
+    full, windowed = Variables(), Variables()
+    full_tokens = window_tokens = 0
+    full_time = window_time = 0.0
+    for i in range(turns):
+        query = f"What happens in case {i} if the cheque bounces twice?"
+
+        start = time.perf_counter()
+        history = full.get("history", [])
+        text = "\n".join([f"{row['name']}: {row['message']}" for row in history])
+        full.extend(
+            "history",
+            [{"name": "User", "message": query}, {"name": "Bot", "message": ANSWER}],
+        )
+        full_time += time.perf_counter() - start
+        full_tokens += estimate_tokens(text)
+
+        start = time.perf_counter()
+        text = window.render(windowed)
+        window.add(windowed, query, ANSWER)
+        window_time += time.perf_counter() - start
+        window_tokens += estimate_tokens(text)
+
+    print(f"turns {turns}")
+    print(f"{'':<10}{'tokens/turn':>12}{'last turn':>12}{'us/turn':>10}")
+    last_full = estimate_tokens(
+        "\n".join(f"{row['name']}: {row['message']}" for row in full["history"][:-2])
+    )
+    print(
+        f"{'full':<10}{full_tokens // turns:>12}{last_full:>12}"
+        f"{full_time / turns * 1e6:>10.1f}"
+    )
+    print(
+        f"{'window':<10}{window_tokens // turns:>12}{estimate_tokens(text):>12}"
+        f"{window_time / turns * 1e6:>10.1f}"
+    )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,69 @@
+"""Measure the cold import of the bots with ``python -X importtime``.
+
+Each module is imported in a fresh interpreter ``runs`` times. The report
+shows the best cumulative time for the bot, its slowest direct imports, and
+which of the heavy dependencies were loaded by the import itself:
+
+    python pulse/benchmarks/import_time.py [runs] [module ...]
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("pandas", "requests", "httpx", "transitions", "dotenv", "llm", "asyncio")
+MODULES = ("cb_fsm", "venture_fsm")
+
+
+def import_times(module):
+    """Return {package: (cumulative_us, children)} for one cold import."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    ).stderr
+    # a package is reported after everything it imported, one level deeper
+    times = {}
+    pending = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        depth = len(name) - len(name.lstrip())
+        children = []
+        while pending and pending[-1][0] > depth:
+            children.append(pending.pop()[1])
+        name = name.strip()
+        times[name] = (int(cumulative), children[::-1])
+        pending.append((depth, name))
+    return times
+
+
+def subtree(times, name):
+    names = [name]
+    for child in times[name][1]:
+        names.extend(subtree(times, child))
+    return names
+
+
+def main(runs=5, *modules):
+    for module in modules or MODULES:
+        samples = [import_times(module) for _ in range(runs)]
+        best = min(samples, key=lambda times: times[module][0])
+        direct = sorted(
+            ((best[name][0], name) for name in best[module][1]), reverse=True
+        )
+        imported = set(subtree(best, module))
+        loaded = [name for name in HEAVY if name in imported]
+        print(f"{module}: {best[module][0] / 1000:.1f} ms (best of {runs})")
+        for cumulative, name in direct[:8]:
+            print(f"  {name:24} {cumulative / 1000:7.1f} ms")
+        print(f"  heavy dependencies loaded: {', '.join(loaded) or 'none'}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) if arg.isdigit() else arg for arg in sys.argv[1:]))
@@ -0,0 +1,66 @@
+"""Time the /init step of on_enter_confirm_odr_provider against a slow gateway.
+
+The gateway is faked with a fixed latency per call. The three /init calls go
+out together, so the step should take about one round trip:
+
+    python pulse/benchmarks/init_fanout.py [latency_ms]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cb_fsm
+from beckn import BecknClient
+
+
+class FakeResponse:
+    status_code = 200
+    text = "{}"
+
+    def json(self):
+        return {}
+
+
+class SlowGatewayClient(BecknClient):
+    def __init__(self, latency):
+        super().__init__()
+        self.latency = latency
+
+    def post(self, action, data):
+        time.sleep(self.latency)
+        return FakeResponse()
+
+
+def main(latency_ms=300):
+    fsm = cb_fsm.FSM(lambda output: None)
+    fsm.beckn_client = SlowGatewayClient(latency_ms / 1000)
+    fsm.variables.update(
+        json.loads(
+            '{"r_name": "r", "r_phone": "1", "r_email": "r@example.com",'
+            ' "c_name": "c", "c_phone": "2", "c_email": "c@example.com",'
+            ' "c_address": "a", "c_city": "Pune"}'
+        )
+    )
+    fsm.variables["selected_provider"] = {
+        "bpp_id": "bpp",
+        "bpp_uri": "https://bpp.example",
+        "id": "p1",
+        "quote": "1500",
+    }
+
+    start = time.perf_counter()
+    fsm.on_enter_confirm_odr_provider()
+    elapsed = time.perf_counter() - start
+    print(f"gateway latency  {latency_ms} ms per call, 3 /init calls")
+    print(
+        f"confirm step     {elapsed * 1000:.0f} ms "
+        f"(one after another: {3 * latency_ms} ms)"
+    )
+    print(f"init_results     {fsm.variables['init_results']}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
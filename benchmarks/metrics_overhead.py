@@ -0,0 +1,69 @@
+"""Cost of metrics.Metrics instrumentation per callback and per turn.
+
+First one guard is called bare and through the instrumentation wrapper, for
+the overhead of a single call. Then the conversations of
+``conversations.py`` run on plain and instrumented copies of both bots:
+
+    python pulse/benchmarks/metrics_overhead.py [runs]
+"""
+import sys
+import time
+
+import conversations
+from conversations import cb_fsm, percentiles, search_cache
+from fsm_graph import compiled_graph
+from metrics import Metrics
+
+
+def variant(fsm_cls, metrics=None):
+    cls = type(fsm_cls.__name__, (fsm_cls,), {"__module__": fsm_cls.__module__})
+    compiled_graph(cls)
+    if metrics is not None:
+        metrics.instrument(cls)
+    return cls
+
+
+def per_call(number=200_000):
+    plain = variant(cb_fsm.FSM)(None)
+    wrapped = variant(cb_fsm.FSM, Metrics())(None)
+    times = []
+    for fsm in (plain, wrapped):
+        fsm.input = "1"
+        best = float("inf")
+        for _ in range(5):
+            start = time.perf_counter()
+            for _ in range(number):
+                fsm.is_know_more()
+            best = min(best, time.perf_counter() - start)
+        times.append(best / number * 1e6)
+    print(f"one guard call: {times[0]:.2f} us bare, {times[1]:.2f} us instrumented")
+    print(f"  overhead {times[1] - times[0]:.2f} us per callback")
+
+
+def per_turn(runs, quiet):
+    print(f"{'turn latency':28} {'p50 plain':>10} {'instrumented':>13}")
+    for name, (fsm_cls, inputs) in conversations.SCRIPTS.items():
+        p50 = []
+        for metrics in (None, Metrics()):
+            cls = variant(fsm_cls, metrics)
+            samples = []
+            with quiet():
+                for _ in range(runs):
+                    fsm = cls(lambda output: None)
+                    fsm.provider_search_cache = search_cache.SearchCache()
+                    for text in inputs:
+                        start = time.perf_counter()
+                        fsm.process_input_or_callback(text)
+                        samples.append(time.perf_counter() - start)
+            p50.append(percentiles(samples)["p50_us"])
+        print(f"  {name:26} {p50[0]:7.1f} us {p50[1]:10.1f} us")
+
+
+def main(runs=200):
+    per_call()
+    with conversations.stubbed() as quiet:
+        per_turn(runs, quiet)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,96 @@
+"""Time the provider listing step against a large catalog.
+
+Builds a synthetic catalog of ``rows`` providers and compares the listing in
+on_enter_fetch_lsp, which sends precomputed cards, with formatting every card
+from ``df.iterrows()`` on each request:
+
+    python pulse/benchmarks/provider_listing.py [rows] [repeats]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+import catalog
+import cb_fsm
+
+
+def synthetic_frame(rows):
+    return pd.DataFrame(
+        {
+            "service_number": range(1, rows + 1),
+            "provider_name": [f"Provider {i}" for i in range(rows)],
+            "short_desc": ["Cheque bounce cases"] * rows,
+            "long_desc": ["Experienced lawyers for financial disputes."] * rows,
+            "url": [f"https://provider{i}.example" for i in range(rows)],
+            "base_fee": [2000 + i for i in range(rows)],
+            "item_per_hearing_fee": [400] * rows,
+            "intent_fulfillment_time": ["2024-03-01T15:37:00Z"] * rows,
+        }
+    )
+
+
+def iterrows_listing(df, cb):
+    providers = []
+    for i, row in df.iterrows():
+        readable_timestamp = datetime.fromisoformat(
+            row["intent_fulfillment_time"].replace("Z", "+00:00")
+        ).strftime("%Y-%m-%d %H:%M")
+        cb(
+            f"{row['provider_name']}\n{row['short_desc']}\n{row['long_desc']}\n"
+            f"URL: {row['url']}\nBase Fee: {row['base_fee']}\n"
+            f"Item per Hearing Fee: {row['item_per_hearing_fee']}\n"
+            f"Fulfillment Time: {readable_timestamp}"
+        )
+        providers.append(
+            {
+                "id": row["service_number"],
+                "provider_name": row["provider_name"],
+                "base_fee": row["base_fee"],
+                "intent_fulfillment_time": readable_timestamp,
+            }
+        )
+    return providers
+
+
+def main(rows=500, repeats=20):
+    df = synthetic_frame(rows)
+    table = catalog.ProviderTable(
+        catalog.to_rows(catalog.add_provider_columns(df.copy()))
+    )
+    original = catalog.default_catalog
+    catalog.default_catalog = catalog.CatalogCache(reader=lambda path, columns: table)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # the reader ignores the workbook; it only has to exist for the mtime check
+        os.makedirs(os.path.join(tmp, "pulse", "data"))
+        open(os.path.join(tmp, "pulse", "data", "data.xlsx"), "w").close()
+        os.chdir(tmp)
+        try:
+            fsm = cb_fsm.FSM(lambda output: None)
+            fsm.on_enter_fetch_lsp()
+            start = time.perf_counter()
+            for _ in range(repeats):
+                fsm.on_enter_fetch_lsp()
+            listing = (time.perf_counter() - start) / repeats
+        finally:
+            os.chdir(cwd)
+            catalog.default_catalog = original
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        iterrows_listing(df, lambda text: None)
+    iterrows = (time.perf_counter() - start) / repeats
+
+    print(f"{rows} providers, {len(fsm.variables['providers'])} listed")
+    print(f"precomputed cards {listing * 1000:8.3f} ms per listing")
+    print(f"df.iterrows()     {iterrows * 1000:8.3f} ms per listing")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,74 @@
+"""Compare a per-webhook restore/save host with SessionManager.
+
+Many users walk the cheque-bounce notice form, one turn at a time, with a few
+users much more active than the rest. The baseline builds an FSM, restores it
+from a JSON store, runs the turn and saves it again for every turn. The
+manager keeps the hottest ``resident`` sessions live and spills the others:
+
+    python pulse/benchmarks/resident_sessions.py [users] [turns] [resident]
+"""
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cb_fsm
+from session_manager import SessionManager
+
+INPUTS = ["hi", "language_selected", "3", "dn", "da", "pn", "pa", "ci", "cn", "cd"]
+
+
+def traffic(users, turns, seed=1):
+    rng = random.Random(seed)
+    # a few users send most of the messages
+    weights = [1 / (rank + 1) for rank in range(users)]
+    return rng.choices(range(users), weights=weights, k=turns)
+
+
+def per_webhook(schedule):
+    store = {}
+    progress = {}
+    start = time.perf_counter()
+    for user in schedule:
+        step = progress.get(user, 0)
+        fsm = cb_fsm.FSM(lambda output: None)
+        if user in store:
+            state, variables = json.loads(store[user])
+            fsm._restore_state(state, variables)
+        fsm.process_input_or_callback(INPUTS[step])
+        store[user] = json.dumps(fsm._save_state())
+        progress[user] = (step + 1) % len(INPUTS)
+        if progress[user] == 0:
+            del store[user]
+    return time.perf_counter() - start
+
+
+def managed(schedule, resident):
+    manager = SessionManager(cb_fsm.FSM, max_sessions=resident)
+    progress = {}
+    start = time.perf_counter()
+    for user in schedule:
+        step = progress.get(user, 0)
+        manager.process(user, INPUTS[step], cb=lambda output: None)
+        progress[user] = (step + 1) % len(INPUTS)
+        if progress[user] == 0:
+            manager.discard(user)
+    return time.perf_counter() - start, manager
+
+
+def main(users=5000, turns=50_000, resident=500):
+    schedule = traffic(users, turns)
+    cb_fsm.FSM(lambda output: None)  # compile the graph outside the timings
+    baseline = per_webhook(schedule)
+    elapsed, manager = managed(schedule, resident)
+    print(f"{users} users, {turns} turns, {resident} resident sessions")
+    print(f"restore/save per webhook  {baseline / turns * 1e6:7.1f} us/turn")
+    print(f"SessionManager            {elapsed / turns * 1e6:7.1f} us/turn")
+    print(f"manager {manager.stats()}, {len(manager.store)} stored")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,95 @@
+"""Time the selection step with and without quote prefetching.
+
+The gateway is faked with a fixed latency per call. With a QuotePrefetcher the
+/select calls go out when the provider list is shown, so by the time the user
+has picked one the step answers without a round trip:
+
+    python pulse/benchmarks/select_prefetch.py [latency_ms] [think_ms]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cb_fsm
+from beckn import BecknClient
+from quote_prefetch import QuotePrefetcher
+
+PROVIDERS = [
+    {
+        "bpp_id": "bpp",
+        "bpp_uri": "https://bpp.example",
+        "id": f"p{i}",
+        "name": f"Provider {i}",
+        "short_desc": "Online mediation",
+        "long_desc": "",
+        "url": "https://bpp.example",
+    }
+    for i in range(4)
+]
+
+
+class FakeResponse:
+    status_code = 200
+    text = ""
+
+    def json(self):
+        return {
+            "responses": [
+                {
+                    "message": {
+                        "order": {
+                            "quote": {
+                                "price": {"value": "1500"},
+                                "breakup": [
+                                    {"price": {"value": "500"}},
+                                    {"price": {"value": "1000"}},
+                                ],
+                            }
+                        }
+                    }
+                }
+            ]
+        }
+
+
+class SlowGatewayClient(BecknClient):
+    def __init__(self, latency):
+        super().__init__()
+        self.latency = latency
+        self.calls = 0
+
+    def post(self, action, data):
+        self.calls += 1
+        time.sleep(self.latency)
+        return FakeResponse()
+
+
+def select_step(client, prefetcher, think):
+    fsm = cb_fsm.FSM(lambda output: None)
+    fsm.beckn_client = client
+    fsm.quote_prefetcher = prefetcher
+    if prefetcher is not None:
+        prefetcher.prefetch([(p, fsm.select_request(p)) for p in PROVIDERS], client)
+    time.sleep(think)
+    fsm.variables["selected_provider"] = dict(PROVIDERS[1])
+    start = time.perf_counter()
+    fsm.on_enter_selected_provider_details()
+    return time.perf_counter() - start
+
+
+def main(latency_ms=300, think_ms=1000):
+    latency, think = latency_ms / 1000, think_ms / 1000
+    client = SlowGatewayClient(latency)
+    plain = select_step(client, None, think)
+    prefetcher = QuotePrefetcher()
+    prefetched = select_step(client, prefetcher, think)
+    print(f"gateway latency  {latency_ms} ms per call, user thinks {think_ms} ms")
+    print(f"select on demand {plain * 1000:.0f} ms")
+    print(f"select prefetched {prefetched * 1000:.1f} ms")
+    print(f"prefetcher       {prefetcher.stats()}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
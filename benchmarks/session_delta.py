@@ -0,0 +1,75 @@
+"""Session-store write volume: a full snapshot per turn vs. a delta per turn.
+
+Replays a long venture chat (a few option picks, then many Q&A turns that grow
+``history``) and saves after every turn, the way the host persists sessions.
+
+    python pulse/benchmarks/session_delta.py [turns] [compact_every]
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import venture_fsm
+from snapshot import snapshot_codec
+
+ANSWER = (
+    "According to the MSMED Act, registration is free and online. "
+    "You need an Aadhaar number and PAN. This is not legal advice. "
+)
+
+
+def scripted_turns(turns):
+    yield "select_options_main", lambda v: v.__setitem__("service_picked", "1")
+    yield "ask_investment", lambda v: v.__setitem__("investment", "1")
+    yield "ask_turnover", lambda v: v.__setitem__("turnover", "1")
+    for i in range(turns):
+        query = f"Question {i} about Udyam registration and GST?"
+
+        def answer(v, query=query):
+            v["udyam_query"] = query
+            v.extend(
+                "history",
+                [{"name": "User", "message": query}, {"name": "Bot", "message": ANSWER}],
+            )
+
+        yield "generate_udyam_response", answer
+
+
+def main(turns=100, compact_every=50):
+    codec = snapshot_codec(venture_fsm.FSM)
+    full_fsm = venture_fsm.FSM(lambda output: None)
+    delta_fsm = venture_fsm.FSM(lambda output: None)
+
+    full_bytes = delta_bytes = compact_bytes = 0
+    base = delta_fsm._save_snapshot()
+    chain = []
+    for state, turn in scripted_turns(turns):
+        for fsm in (full_fsm, delta_fsm):
+            fsm.state = state
+            turn(fsm.variables)
+        full_bytes += len(full_fsm._save_snapshot())
+        delta = delta_fsm._save_snapshot_delta()
+        delta_bytes += len(delta)
+        chain.append(delta)
+        if len(chain) >= compact_every:
+            base = codec.compact(base, chain)
+            compact_bytes += len(base)
+            chain = []
+
+    state, variables = codec.decode(codec.compact(base, chain))
+    assert state == full_fsm.state
+    assert variables.to_dict() == full_fsm.variables.to_dict()
+
+    print(f"turns            {turns + 3}")
+    print(f"full snapshots   {full_bytes:>10} B")
+    print(f"deltas           {delta_bytes:>10} B  ({full_bytes / delta_bytes:.1f}x less)")
+    total = delta_bytes + compact_bytes
+    print(
+        f"deltas+compact   {total:>10} B  ({full_bytes / total:.1f}x less, "
+        f"compacting every {compact_every} turns)"
+    )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,87 @@
+"""Bytes per session: plain variables dict vs. the fixed-schema Variables store.
+
+Run from the directory the bots run from (the parent of ``pulse``):
+
+    python pulse/benchmarks/session_memory.py [sessions]
+
+Values are shared between sessions, so the numbers are the per-session cost of
+the container itself.
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cb_fsm
+import venture_fsm
+
+CB_TURN = {
+    "service_picked": "3",
+    "drawer_name": "A",
+    "drawer_address": "B",
+    "payee_name": "C",
+    "payee_address": "D",
+    "cheque_info": "E",
+    "cheque_number": "123456",
+    "cheque_date": "01-01-2024",
+    "cheque_amount": "10000",
+    "date_of_return_of_cheque": "05-01-2024",
+    "reason": "insufficient funds",
+    "query": "What is the penalty?",
+    "history": [],
+}
+
+VENTURE_TURN = {
+    "service_picked": "2",
+    "query": "What is Udyam?",
+    "udyam_query": "Who can register?",
+    "history": [],
+    "rag_trigger": "turnover",
+    "random_query": False,
+    "investment": "1",
+    "turnover": "1",
+    "invalid_category": False,
+    "has_aadhar": "0",
+    "has_pan": "0",
+    "has_gst_number": "0",
+    "has_prev": "0",
+    "business_eligible": True,
+    "udyam_flow": True,
+    "providers": [],
+    "selected_provider": 1,
+    "selected_provider_name": "X",
+    "selected_base_fee": 100,
+    "intent_fulfillment_time": "2024-04-25 10:00",
+}
+
+
+def measure(factory, sessions):
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    kept = [factory() for _ in range(sessions)]
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del kept
+    return used / sessions
+
+
+def main(sessions=10_000):
+    for module, values in ((cb_fsm, CB_TURN), (venture_fsm, VENTURE_TURN)):
+        as_dict = measure(lambda: dict(values), sessions)
+        as_slots = measure(lambda: module.Variables(values), sessions)
+        print(
+            f"{module.__name__} ({len(values)} keys): dict {as_dict:.0f} B/session, "
+            f"Variables {as_slots:.0f} B/session"
+        )
+        full = dict.fromkeys(module.Variables._field_order)
+        as_dict = measure(lambda: dict(full), sessions)
+        as_slots = measure(lambda: module.Variables(full), sessions)
+        print(
+            f"{module.__name__} (all {len(full)} keys): dict {as_dict:.0f} B/session, "
+            f"Variables {as_slots:.0f} B/session"
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,88 @@
+"""Snapshot size and encode/decode time: JSON of ``_save_state()`` vs. SnapshotCodec.
+
+Run from the directory the bots run from (the parent of ``pulse``):
+
+    python pulse/benchmarks/snapshot_codec.py [iterations]
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import venture_fsm
+from snapshot import snapshot_codec
+
+
+def typical_venture_session():
+    fsm = venture_fsm.FSM(lambda output: None)
+    fsm.state = "select_odr_provider"
+    v = fsm.variables
+    v["service_picked"] = "6"
+    v["query"] = "How long does Udyam registration take?"
+    v["history"] = []
+    for i in range(6):
+        v["history"].append({"name": "User", "message": f"Question {i} about Udyam registration and GST?"})
+        v["history"].append(
+            {
+                "name": "Bot",
+                "message": "According to the MSMED Act, registration is free and online. "
+                "You need an Aadhaar number and PAN. This is not legal advice. " * 2,
+            }
+        )
+    v["rag_trigger"] = "turnover"
+    v["random_query"] = False
+    v["investment"] = "1"
+    v["turnover"] = "1"
+    v["invalid_category"] = False
+    v["odr_providers"] = [
+        {
+            "bpp_id": "ps-bpp-network.becknprotocol.io",
+            "bpp_uri": "https://ps-bpp-network.becknprotocol.io",
+            "id": f"provider-{i}",
+            "name": f"ODR Provider {i}",
+            "short_desc": "Online arbitration for financial disputes",
+            "long_desc": "Certified arbitrators, hearings over video, awards within 60 days.",
+            "url": "https://example.org/odr",
+        }
+        for i in range(3)
+    ]
+    v["selected_provider"] = dict(v["odr_providers"][0], quote="5000", base_fee="2000", fee_per_hearing="1000")
+    v["search_req"] = True
+    v["select_req"] = True
+    return fsm
+
+
+def main(iterations=20_000):
+    fsm = typical_venture_session()
+    codec = snapshot_codec(venture_fsm.FSM)
+    as_json = json.dumps(fsm._save_state())
+
+    def json_encode():
+        json.dumps(fsm._save_state())
+
+    def json_decode():
+        state, variables = json.loads(as_json)
+        venture_fsm.Variables(variables)
+
+    rows = [("json", len(as_json.encode()), json_encode, json_decode)]
+    for compress in (False, True):
+        blob = fsm._save_snapshot(compress)
+        rows.append(
+            (
+                "snapshot+zlib" if compress else "snapshot",
+                len(blob),
+                lambda compress=compress: fsm._save_snapshot(compress),
+                lambda blob=blob: codec.decode(blob),
+            )
+        )
+
+    for name, size, encode, decode in rows:
+        enc = timeit.timeit(encode, number=iterations) / iterations * 1e6
+        dec = timeit.timeit(decode, number=iterations) / iterations * 1e6
+        print(f"{name:14} {size:6d} B  encode {enc:6.1f}us  decode {dec:6.1f}us")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
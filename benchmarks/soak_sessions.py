@@ -0,0 +1,71 @@
+"""Soak test: construct many sessions and check that cost and memory stay flat.
+
+Run from the directory the bots run from (the parent of ``pulse``):
+
+    python pulse/benchmarks/soak_sessions.py [sessions] [batch]
+
+Exits non-zero if the last batch is much slower than the first, RSS keeps
+growing, or the class-level state list changes size.
+"""
+import os
+import resource
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cb_fsm
+import venture_fsm
+
+
+def rss_kib():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def soak(fsm_cls, sessions, batch):
+    states = len(fsm_cls.states)
+    fsm_cls(print)  # compile the graph outside the measured batches
+    timings = []
+    rss = []
+    for _ in range(sessions // batch):
+        start = time.perf_counter()
+        for _ in range(batch):
+            fsm_cls(print)
+        timings.append((time.perf_counter() - start) / batch * 1e6)
+        rss.append(rss_kib())
+    return states, len(fsm_cls.states), timings, rss
+
+
+def check(module, sessions, batch):
+    """Soak ``module.FSM`` and return a list of the problems found."""
+    before, after, timings, rss = soak(module.FSM, sessions, batch)
+    print(
+        f"{module.__name__}: states {before}->{after}, "
+        f"us/session first={timings[0]:.2f} last={timings[-1]:.2f}, "
+        f"rss first={rss[0]}KiB last={rss[-1]}KiB"
+    )
+    problems = []
+    if before != after:
+        problems.append("state list grew")
+    if timings[-1] > 2 * timings[0] + 1:
+        problems.append("construction time is not flat")
+    if rss[-1] - rss[0] > 4096:
+        problems.append("RSS is not flat")
+    return problems
+
+
+def main(sessions=100_000, batch=10_000):
+    ok = True
+    for module in (cb_fsm, venture_fsm):
+        for problem in check(module, sessions, batch):
+            print(f"  {problem}")
+            ok = False
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
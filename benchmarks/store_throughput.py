@@ -0,0 +1,94 @@
+"""Snapshot writes per second into SQLiteStore.
+
+Snapshots come from real cb_fsm and venture_fsm conversations. ``writers``
+threads, like webhook workers, each save ``writes`` snapshots for their own
+users. The run compares one transaction per write with group commit, and
+with queued writes that are only flushed at the end:
+
+    python pulse/benchmarks/store_throughput.py [writers] [writes]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cb_fsm
+import venture_fsm
+from sqlite_store import SQLiteStore
+
+CHUNKS = '{"chunks": [{"chunk": "Section 138 covers dishonour of cheques."}]}'
+CONVERSATIONS = {
+    "cb_fsm": (
+        cb_fsm.FSM,
+        ["hi", "language_selected", "1", "what is a cheque bounce", CHUNKS, "1"],
+    ),
+    "venture_fsm": (
+        venture_fsm.FSM,
+        ["hi", "language_selected", "1", "how do I register", CHUNKS],
+    ),
+}
+
+MODES = {
+    "one commit per write": dict(flush_window=0, max_batch=1),
+    "group commit": dict(),
+    "group commit, 1 ms window": dict(flush_window=0.001),
+    "group commit, 5 ms window": dict(flush_window=0.005),
+    "queued, flushed at end": dict(durable=False),
+}
+
+
+def snapshot(fsm_cls, inputs):
+    fsm = fsm_cls(lambda output: None)
+    for text in inputs:
+        fsm.process_input_or_callback(text)
+    return fsm._save_snapshot()
+
+
+def run(path, data, writers, writes, options):
+    store = SQLiteStore(path, **options)
+
+    def write(worker):
+        for i in range(writes):
+            store.put(f"{worker}:{i % 200}", data)
+
+    threads = [threading.Thread(target=write, args=(w,)) for w in range(writers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    store.flush()
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(1000):
+        store.get(f"{i % writers}:{i % 200}")
+    read = (time.perf_counter() - start) / 1000
+    stats = store.stats()
+    store.close()
+    return writers * writes / elapsed, stats["mean_batch"], read
+
+
+def main(writers=16, writes=500):
+    tmp = tempfile.mkdtemp()
+    try:
+        for name, (fsm_cls, inputs) in CONVERSATIONS.items():
+            data = snapshot(fsm_cls, inputs)
+            print(f"{name}: {len(data)} B snapshots, {writers} writers")
+            for mode, options in MODES.items():
+                path = os.path.join(tmp, f"{name}-{len(os.listdir(tmp))}.db")
+                rate, batch, read = run(path, data, writers, writes, options)
+                print(
+                    f"  {mode:24} {rate:9.0f} writes/s  "
+                    f"{batch:6.1f} per commit  get {read * 1e6:5.1f} us"
+                )
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
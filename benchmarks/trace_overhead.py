@@ -0,0 +1,67 @@
+"""Cost of tracing.Tracer per turn, and the spans it writes.
+
+The conversations of ``conversations.py`` run on plain and traced copies of
+both bots, the traced ones exporting to a JSONL file in a temporary
+directory. The report gives the p50 turn latency of both and the spans of
+each kind written per turn:
+
+    python pulse/benchmarks/trace_overhead.py [runs]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import conversations
+from conversations import percentiles, search_cache
+from fsm_graph import compiled_graph
+from tracing import JSONLSink, Tracer
+
+
+def variant(fsm_cls, tracer=None):
+    cls = type(fsm_cls.__name__, (fsm_cls,), {"__module__": fsm_cls.__module__})
+    compiled_graph(cls)
+    if tracer is not None:
+        tracer.instrument(cls)
+    return cls
+
+
+def kind(name):
+    return "handler" if name.startswith(("on_enter_", "on_exit_")) else name
+
+
+def per_turn(runs, quiet, directory):
+    print(f"{'turn latency':28} {'p50 plain':>10} {'traced':>10}   spans per turn")
+    for name, (fsm_cls, inputs) in conversations.SCRIPTS.items():
+        path = os.path.join(directory, name.replace("/", "_") + ".jsonl")
+        sink = JSONLSink(path)
+        p50 = []
+        for tracer in (None, Tracer(sink)):
+            cls = variant(fsm_cls, tracer)
+            samples = []
+            with quiet():
+                for _ in range(runs):
+                    fsm = cls(lambda output: None)
+                    fsm.provider_search_cache = search_cache.SearchCache()
+                    for text in inputs:
+                        start = time.perf_counter()
+                        fsm.process_input_or_callback(text)
+                        samples.append(time.perf_counter() - start)
+            p50.append(percentiles(samples)["p50_us"])
+        sink.close()
+        with open(path, encoding="utf-8") as f:
+            kinds = Counter(kind(json.loads(line)["name"]) for line in f)
+        turns = runs * len(inputs)
+        spans = ", ".join(f"{k} {n / turns:.2f}" for k, n in sorted(kinds.items()))
+        print(f"  {name:26} {p50[0]:7.1f} us {p50[1]:7.1f} us   {spans}")
+
+
+def main(runs=200):
+    with conversations.stubbed() as quiet, tempfile.TemporaryDirectory() as d:
+        per_turn(runs, quiet, d)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
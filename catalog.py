@@ -0,0 +1,154 @@
+import os
+import threading
+from datetime import datetime
+from types import MappingProxyType
+
+# workbook header -> key used by the bots
+PROVIDER_COLUMNS = MappingProxyType(
+    {
+        "SN": "service_number",
+        "Provider name": "provider_name",
+        "Provider Short Desc": "short_desc",
+        "Provider Long Desc": "long_desc",
+        "Provider Addnt Desc URL": "url",
+        "Provider Image": "image",
+        "item.descriptor.code": "descriptor_code",
+        "item.descriptor.name": "descriptor_name",
+        "item.descriptor.short_desc": "descriptor_short_desc",
+        "item.descriptor.long_desc": "descriptor_long_desc",
+        "item.descriptor.Images": "descriptor_images",
+        "item base fee": "base_fee",
+        "Item per hearing fee": "item_per_hearing_fee",
+        "categories_id": "categories_id",
+        "intent.fulfillment.time": "intent_fulfillment_time",
+    }
+)
+# (label, column) of each line after the name on a provider's listing card
+CARD_FIELDS = (
+    ("", "short_desc"),
+    ("", "long_desc"),
+    ("URL: ", "url"),
+    ("Base Fee: ", "base_fee"),
+    ("Item per Hearing Fee: ", "item_per_hearing_fee"),
+    ("Fulfillment Time: ", "fulfillment_time"),
+)
+
+
+def _plain(value):
+    # numpy scalars -> int/float/str so rows pickle and json-encode like literals
+    item = getattr(value, "item", None)
+    return item() if callable(item) else value
+
+
+def format_fulfillment_time(value):
+    """Render an ISO 8601 ``intent.fulfillment.time`` as "YYYY-MM-DD HH:MM"."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).strftime(
+        "%Y-%m-%d %H:%M"
+    )
+
+
+def read_frame(path, columns):
+    import pandas as pd
+
+    df = pd.read_excel(path, usecols=list(columns))
+    return df.rename(columns=dict(columns))
+
+
+def add_provider_columns(df):
+    """Add the formatted fulfillment time and the listing card text."""
+    df["fulfillment_time"] = df["intent_fulfillment_time"].map(
+        format_fulfillment_time
+    )
+    text = df["provider_name"].map(str)
+    for label, column in CARD_FIELDS:
+        text = text + f"\n{label}" + df[column].map(str)
+    df["card_text"] = text
+    return df
+
+
+def to_rows(df):
+    names = list(df.columns)
+    return tuple(
+        MappingProxyType({name: _plain(value) for name, value in zip(names, values)})
+        for values in df.itertuples(index=False, name=None)
+    )
+
+
+def read_providers(path, columns=PROVIDER_COLUMNS):
+    """Parse a provider workbook into a ``ProviderTable``."""
+    return ProviderTable(to_rows(add_provider_columns(read_frame(path, columns))))
+
+
+class ProviderTable(tuple):
+    """Read-only provider rows, each with its listing ``card_text``.
+
+    ``summaries`` holds, in row order, the record a session keeps in its
+    ``providers`` variable for each provider.
+    """
+
+    def __new__(cls, rows):
+        table = super().__new__(cls, rows)
+        table.summaries = tuple(
+            MappingProxyType(
+                {
+                    "id": row["service_number"],
+                    "provider_name": row["provider_name"],
+                    "base_fee": row["base_fee"],
+                    "intent_fulfillment_time": row["fulfillment_time"],
+                }
+            )
+            for row in rows
+        )
+        return table
+
+    def providers(self):
+        """Return fresh copies of the summaries for a session to keep."""
+        return [dict(summary) for summary in self.summaries]
+
+
+class CatalogCache:
+    """Provider workbooks parsed once per process into ``ProviderTable``s.
+
+    ``load`` stats the file on every call and only parses it again when its
+    mtime or size changed, so a workbook replaced on a running server is
+    picked up on the next request. Tables are shared between sessions and are
+    immutable: a tuple of read-only mappings. A missing file raises
+    ``FileNotFoundError`` as ``pd.read_excel`` does.
+    """
+
+    def __init__(self, reader=read_providers):
+        self.reader = reader
+        self.loads = self.hits = 0
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def load(self, path, columns=PROVIDER_COLUMNS):
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        key = (os.path.abspath(path), tuple(columns.items()))
+        entry = self._tables.get(key)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry[1]
+        with self._lock:
+            entry = self._tables.get(key)
+            if entry is None or entry[0] != version:
+                entry = self._tables[key] = (version, self.reader(path, columns))
+                self.loads += 1
+            else:
+                self.hits += 1
+        return entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+
+    def stats(self):
+        return {"loads": self.loads, "hits": self.hits, "tables": len(self._tables)}
+
+
+default_catalog = CatalogCache()
+
+
+def load(path, columns=PROVIDER_COLUMNS):
+    return default_catalog.load(path, columns)
@@ -0,0 +1,144 @@
+import re
+
+DEFAULT_MAX_TURNS = 6
+DEFAULT_MAX_TOKENS = 1500
+DEFAULT_SUMMARY_TOKENS = 300
+
+_SENTENCE_END = re.compile(r"(?<=[.?!])\s")
+
+
+def estimate_tokens(text):
+    # roughly four characters per token for English prompts
+    return len(text) // 4 + 1
+
+
+def render_row(row):
+    return f"{row['name']}: {row['message']}"
+
+
+def first_sentence(text):
+    return _SENTENCE_END.split(text.strip(), 1)[0]
+
+
+def extractive_summary(summary, rows):
+    """Fold ``rows`` into ``summary`` as one "asked ... / answered ..." line per turn."""
+    lines = [summary] if summary else []
+    for row in rows:
+        if row["name"] == "User":
+            lines.append(f"User asked: {first_sentence(row['message'])}")
+        else:
+            lines.append(f"Bot answered: {first_sentence(row['message'])}")
+    return "\n".join(lines)
+
+
+class _Window:
+    """The rendered rows of a history list, valid while the list is unchanged."""
+
+    __slots__ = ("rows", "length", "text", "tokens")
+
+    def __init__(self, rows, text, tokens):
+        self.rows = rows
+        self.length = len(rows)
+        self.text = text
+        self.tokens = tokens
+
+    def matches(self, rows):
+        return self.rows is rows and self.length == len(rows)
+
+
+class ChatHistory:
+    """Bounded chat history window for the RAG answer states.
+
+    The last ``max_turns`` question/answer pairs are kept verbatim in
+    ``variables["history"]`` as long as they fit in ``max_tokens``; older turns
+    are folded into ``variables["history_summary"]`` by ``summarize``, which is
+    trimmed from the front to ``summary_tokens``. Only those two are saved with
+    the session. The rendered window and its token count live in
+    ``variables.cache`` and are updated by appending and slicing, so a turn only
+    renders the rows it adds or drops; a restored session renders its rows
+    once.
+    """
+
+    def __init__(
+        self,
+        max_turns=DEFAULT_MAX_TURNS,
+        max_tokens=DEFAULT_MAX_TOKENS,
+        summary_tokens=DEFAULT_SUMMARY_TOKENS,
+        count_tokens=estimate_tokens,
+        summarize=extractive_summary,
+    ):
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.summary_tokens = summary_tokens
+        self.count_tokens = count_tokens
+        self.summarize = summarize
+
+    def render(self, variables):
+        """Return the chat history block for the prompt."""
+        text = self._window(variables).text
+        summary = variables.get("history_summary")
+        if summary:
+            return f"[Summary of earlier conversation]\n{summary}\n\n{text}"
+        return text
+
+    def add(self, variables, query, answer):
+        """Record a question/answer turn and evict what no longer fits."""
+        window = self._window(variables)
+        rows = [
+            {"name": "User", "message": query},
+            {"name": "Bot", "message": answer},
+        ]
+        lines = [render_row(row) for row in rows]
+        added_tokens = sum(self.count_tokens(line) for line in lines)
+        if window.text:
+            lines.insert(0, window.text)
+        variables.extend("history", rows)
+        window = self._keep(variables, "\n".join(lines), window.tokens + added_tokens)
+        self._evict(variables, window)
+
+    def _window(self, variables):
+        history = variables.get("history") or []
+        window = variables.cache.get("history_window")
+        if window is None or not window.matches(history):
+            lines = [render_row(row) for row in history]
+            tokens = sum(self.count_tokens(line) for line in lines)
+            window = variables.cache["history_window"] = _Window(
+                history, "\n".join(lines), tokens
+            )
+        return window
+
+    @staticmethod
+    def _keep(variables, text, tokens):
+        window = variables.cache["history_window"] = _Window(
+            variables["history"], text, tokens
+        )
+        return window
+
+    def _evict(self, variables, window):
+        history = variables["history"]
+        tokens = window.tokens
+        keep = len(history)
+        # always keep the latest turn, even when it alone is over budget
+        while keep > 2 and (keep > 2 * self.max_turns or tokens > self.max_tokens):
+            for row in history[len(history) - keep : len(history) - keep + 2]:
+                tokens -= self.count_tokens(render_row(row))
+            keep -= 2
+        if keep == len(history):
+            return
+
+        evicted = history[: len(history) - keep]
+        cut = sum(len(render_row(row)) + 1 for row in evicted)
+        variables["history"] = history[len(history) - keep :]
+        self._keep(variables, window.text[cut:], tokens)
+        variables["history_summary"] = self._trim_summary(
+            self.summarize(variables.get("history_summary", ""), evicted)
+        )
+
+    def _trim_summary(self, summary):
+        lines = summary.split("\n")
+        tokens = sum(self.count_tokens(line) for line in lines)
+        start = 0
+        while start < len(lines) - 1 and tokens > self.summary_tokens:
+            tokens -= self.count_tokens(lines[start])
+            start += 1
+        return "\n".join(lines[start:])
@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+
+import tracing
+
+ENV_FILE = "../.env-dev"
+
+_env_loaded = False
+_lock = threading.Lock()
+
+
+def load_env():
+    """Load ``ENV_FILE`` into ``os.environ``, once per process."""
+    global _env_loaded
+    if not _env_loaded:
+        with _lock:
+            if not _env_loaded:
+                from dotenv import load_dotenv
+
+                load_dotenv(ENV_FILE)
+                _env_loaded = True
+
+
+def magic_string():
+    """Return ``JB_MAGIC_STRING``, loading the environment it is set in first."""
+    load_env()
+    return os.getenv("JB_MAGIC_STRING")
+
+
+def llm_module():
+    """Return the ``llm`` module, loading the environment it reads first."""
+    load_env()
+    import llm
+
+    return llm
+
+
+def llm(messages):
+    with tracing.span("llm", messages=len(messages)):
+        return llm_module().llm(messages)
+
+
+def llm_stream(messages):
+    """Yield the answer to ``messages`` in pieces as the model generates them.
+
+    Uses the ``llm`` module's ``llm_stream`` when it has one; otherwise the
+    whole ``llm`` answer comes as a single piece.
+    """
+    module = llm_module()
+    stream = getattr(module, "llm_stream", None)
+    if stream is None:
+        yield llm(messages)
+        return
+    # recorded once the stream ends: a span must not stay current across yields
+    start = time.perf_counter()
+    first = None
+    try:
+        for piece in stream(messages):
+            if first is None:
+                first = time.perf_counter() - start
+            yield piece
+    finally:
+        tracing.record(
+            "llm",
+            time.perf_counter() - start,
+            messages=len(messages),
+            stream=True,
+            first_piece_ms=None if first is None else first * 1000,
+        )
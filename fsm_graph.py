@@ -0,0 +1,410 @@
+import contextvars
+import functools
+import threading
+from operator import methodcaller
+from types import FunctionType, MappingProxyType
+
+# a run of discriminator guards shorter than this is checked guard by guard:
+# below it the key call and the lookup cost about what they save
+MIN_SWITCH_ARMS = 5
+
+
+def discriminator(key, value):
+    """Mark a guard that is true exactly when ``key(model) == value``.
+
+    In a graph compiled with ``compiled_dispatch``, a run of at least
+    ``MIN_SWITCH_ARMS`` consecutive transitions of one state whose guards share
+    ``key`` is dispatched with one dict lookup on ``key(model)`` instead of
+    calling each guard in turn. Only the guard of
+    the transition found is called. ``key`` must be the same object for every
+    guard of a group, such as ``user_input`` or ``variable(name)``.
+    """
+
+    def mark(guard):
+        guard.discriminator = (key, value)
+        return guard
+
+    return mark
+
+
+def user_input(model):
+    return model.input
+
+
+@functools.lru_cache(maxsize=None)
+def variable(name):
+    """Return the key that reads session variable ``name``."""
+
+    def key(model):
+        return model.variables[name]
+
+    key.__name__ = f"variable_{name}"
+    return key
+
+
+class _Switch:
+    __slots__ = ("key", "targets", "order")
+
+    def __init__(self, key):
+        self.key = key
+        # value -> index of the first transition guarded by it
+        self.targets = {}
+        self.order = []
+
+    def add(self, value, index):
+        self.targets.setdefault(value, index)
+        self.order.append(index)
+
+
+_machine_cls = None
+
+
+def _dispatch_machine():
+    """Return a ``Machine`` whose ``next`` checks only the dispatched transitions."""
+    global _machine_cls
+    if _machine_cls is None:
+        from transitions import Event, Machine
+
+        class DispatchEvent(Event):
+            candidates = None
+            dispatched = frozenset()
+
+            def _process(self, event_data):
+                state = event_data.state.name
+                if state not in self.dispatched:
+                    return super()._process(event_data)
+                self.machine.callbacks(self.machine.prepare_event, event_data)
+                transitions = self.transitions[state]
+                for i in self.candidates(event_data.model, state):
+                    event_data.transition = transitions[i]
+                    if transitions[i].execute(event_data):
+                        event_data.result = True
+                        break
+
+        class DispatchMachine(Machine):
+            event_cls = DispatchEvent
+
+        _machine_cls = DispatchMachine
+    return _machine_cls
+
+
+_machine_error_cls = None
+
+
+def _machine_error():
+    """Return the error the builtin engine raises when a state has no transitions.
+
+    It subclasses ``transitions.MachineError`` when that is installed, so the
+    same ``except`` catches it on both engines, and ``Exception`` otherwise.
+    """
+    global _machine_error_cls
+    if _machine_error_cls is None:
+        try:
+            from transitions import MachineError as base
+        except ImportError:
+            base = Exception
+
+        class MachineError(base):
+            def __init__(self, value):
+                super().__init__(value)
+                self.value = value
+
+            def __str__(self):
+                return repr(self.value)
+
+        MachineError.__module__, MachineError.__qualname__ = __name__, "MachineError"
+        _machine_error_cls = MachineError
+    return _machine_error_cls
+
+
+def __getattr__(name):
+    # built on first use, so a builtin-only deployment never imports transitions
+    if name == "MachineError":
+        return _machine_error()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+ENGINES = ("transitions", "builtin")
+
+
+def _unbound(cls, name):
+    """Return a function that calls method ``name`` of a ``cls`` instance."""
+    for klass in cls.__mro__:
+        if name in vars(klass):
+            attr = vars(klass)[name]
+            if isinstance(attr, FunctionType):
+                return attr
+            break
+    return methodcaller(name)
+
+
+class StateGraph:
+    """Immutable state graph shared by every session of one FSM class.
+
+    The underlying ``Machine`` is created without a model, so sessions are never
+    registered with it. A session attaches by getting its ``state`` attribute set
+    to the initial state, and ``next`` is dispatched through the shared event.
+    Callbacks and conditions are still resolved by name on the session itself.
+
+    With ``engine="builtin"`` no ``Machine`` is built and ``trigger`` walks the
+    same table as ``trigger_async`` instead: the guards, exit and enter
+    callbacks of every transition are looked up once per session class and
+    called directly. It keeps ``Machine``'s semantics for what the bots use,
+    the one ``next`` trigger, named conditions and ``on_enter_*``/``on_exit_*``
+    callbacks, but callbacks set on a session instance are not seen.
+
+    ``trigger_async`` walks the same transitions from a table built here, in the
+    order ``Machine`` checks them. A state callback with an ``_async`` variant on
+    the session is awaited instead, and the enter callbacks of the states listed
+    in the class's ``blocking_states`` run in the loop's default executor.
+
+    With ``compiled``, both paths check the transitions of a state through its
+    dispatch program, where long runs of ``discriminator`` guards on one key
+    are replaced by a dict lookup; states without such a run are checked as
+    usual. Transitions still fire in the order ``Machine``
+    would pick them.
+    """
+
+    def __init__(
+        self,
+        fsm_cls,
+        states,
+        transitions,
+        initial="zero",
+        compiled=False,
+        engine="transitions",
+    ):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}")
+        self.states = tuple(dict.fromkeys(states))
+        self.transitions = tuple(MappingProxyType(dict(t)) for t in transitions)
+        self.initial = initial
+        self.compiled = compiled
+        self.engine = engine
+        specs = [self._state_spec(fsm_cls, name) for name in self.states]
+        self.machine = self._next = None
+        if engine == "transitions":
+            # transitions is imported here so importing a bot doesn't load it
+            if compiled:
+                Machine = _dispatch_machine()
+            else:
+                from transitions import Machine
+
+            self.machine = Machine(
+                model=None,
+                states=[dict(spec) for spec in specs],
+                transitions=[dict(t) for t in self.transitions],
+                initial=initial,
+                auto_transitions=False,
+            )
+            self._next = self.machine.events["next"]
+
+        self._table = {}
+        for t in self.transitions:
+            conditions = t.get("conditions", ())
+            if isinstance(conditions, str):
+                conditions = (conditions,)
+            self._table.setdefault(t["source"], []).append(
+                (tuple(conditions), t["dest"])
+            )
+        self._dispatch = {}
+        if compiled:
+            for state, candidates in self._table.items():
+                program = self._compile(fsm_cls, candidates)
+                if program is not None:
+                    self._dispatch[state] = program
+            if self._next is not None:
+                self._next.candidates = self._candidates
+                self._next.dispatched = frozenset(self._dispatch)
+        self._registered = frozenset(self.states)
+        self._on_enter = {s["name"]: s["on_enter"] for s in specs if "on_enter" in s}
+        self._on_exit = {s["name"]: s["on_exit"] for s in specs if "on_exit" in s}
+        self._blocking = frozenset(getattr(fsm_cls, "blocking_states", ()))
+        # session class -> {state: (exit, [(guards, dest, enter), ...])}
+        self._plans = {}
+
+    @staticmethod
+    def _state_spec(fsm_cls, name):
+        spec = {"name": name}
+        for callback in ("on_enter", "on_exit"):
+            method = f"{callback}_{name}"
+            if callable(getattr(fsm_cls, method, None)):
+                spec[callback] = method
+        return spec
+
+    @staticmethod
+    def _compile(fsm_cls, candidates):
+        # None when no run is long enough to be worth a lookup
+        program = []
+        for i, (conditions, _) in enumerate(candidates):
+            marked = None
+            if len(conditions) == 1:
+                guard = getattr(fsm_cls, conditions[0], None)
+                marked = getattr(guard, "discriminator", None)
+            if marked is None:
+                program.append(i)
+                continue
+            key, value = marked
+            last = program[-1] if program else None
+            if not isinstance(last, _Switch) or last.key is not key:
+                last = _Switch(key)
+                program.append(last)
+            last.add(value, i)
+        steps = []
+        for step in program:
+            if isinstance(step, _Switch) and len(step.order) < MIN_SWITCH_ARMS:
+                steps.extend(step.order)
+            else:
+                steps.append(step)
+        if all(type(step) is int for step in steps):
+            return None
+        return tuple(steps)
+
+    def _candidates(self, model, state):
+        """Return the indexes of the transitions of ``state`` worth checking."""
+        program = self._dispatch.get(state)
+        if program is None:
+            return range(len(self._table[state]))
+        return self._run_program(model, program)
+
+    @staticmethod
+    def _run_program(model, program):
+        for step in program:
+            if type(step) is int:
+                yield step
+                continue
+            try:
+                i = step.targets.get(step.key(model))
+            except TypeError:
+                # an unhashable value; fall back to checking each guard
+                yield from step.order
+                continue
+            if i is not None:
+                yield i
+
+    def reload_callbacks(self):
+        """Make the builtin engine look up callbacks again, after a class changed."""
+        self._plans.clear()
+
+    def attach(self, model):
+        model.state = self.initial
+
+    def trigger(self, model):
+        if self._next is None:
+            return self._step(model)
+        return self._next.trigger(model)
+
+    def _step(self, model):
+        cls = type(model)
+        plan = self._plans.get(cls)
+        if plan is None:
+            plan = self._plans[cls] = self._plan(cls)
+        state = model.state
+        if state not in self._registered:
+            raise ValueError(f"State '{state}' is not a registered state.")
+        try:
+            on_exit, candidates = plan[state]
+        except KeyError:
+            self._no_transition(state)
+
+        for i in self._candidates(model, state):
+            guards, dest, on_enter = candidates[i]
+            # guards must return True itself, as in Machine
+            for guard in guards:
+                if guard(model) != True:
+                    break
+            else:
+                if on_exit is not None:
+                    on_exit(model)
+                if dest not in self._registered:
+                    raise ValueError(f"State '{dest}' is not a registered state.")
+                model.state = dest
+                if on_enter is not None:
+                    on_enter(model)
+                return True
+        return False
+
+    def _plan(self, cls):
+        def resolve(name):
+            return None if name is None else _unbound(cls, name)
+
+        return {
+            state: (
+                resolve(self._on_exit.get(state)),
+                [
+                    (
+                        tuple(resolve(name) for name in conditions),
+                        dest,
+                        resolve(self._on_enter.get(dest)),
+                    )
+                    for conditions, dest in candidates
+                ],
+            )
+            for state, candidates in self._table.items()
+        }
+
+    @staticmethod
+    def _no_transition(state):
+        error = _machine_error()
+        raise error(f"Can't trigger event next from state {state}!") from None
+
+    async def trigger_async(self, model):
+        state = model.state
+        if state not in self._registered:
+            raise ValueError(f"State '{state}' is not a registered state.")
+        try:
+            candidates = self._table[state]
+        except KeyError:
+            self._no_transition(state)
+
+        for i in self._candidates(model, state):
+            conditions, dest = candidates[i]
+            # conditions must return True itself, as in Machine
+            if all(getattr(model, name)() == True for name in conditions):
+                await self._run(model, self._on_exit.get(state), False)
+                if dest not in self._registered:
+                    raise ValueError(f"State '{dest}' is not a registered state.")
+                model.state = dest
+                await self._run(model, self._on_enter.get(dest), dest in self._blocking)
+                return True
+        return False
+
+    @staticmethod
+    async def _run(model, callback, blocking):
+        if callback is None:
+            return
+        handler = getattr(model, f"{callback}_async", None)
+        if handler is not None:
+            await handler()
+        elif blocking:
+            import asyncio
+
+            loop = asyncio.get_running_loop()
+            # in a copy of this task's context, so tracing follows the callback
+            context = contextvars.copy_context()
+            await loop.run_in_executor(None, context.run, getattr(model, callback))
+        else:
+            getattr(model, callback)()
+
+
+_compile_lock = threading.Lock()
+
+
+def compiled_graph(fsm_cls):
+    """Return the StateGraph of ``fsm_cls``, building it on first use."""
+    graph = fsm_cls.__dict__.get("_graph")
+    if graph is None:
+        with _compile_lock:
+            graph = fsm_cls.__dict__.get("_graph")
+            if graph is None:
+                transitions = fsm_cls.build_transitions()
+                states = fsm_cls.states + getattr(fsm_cls, "extra_states", ())
+                graph = StateGraph(
+                    fsm_cls,
+                    states,
+                    transitions,
+                    compiled=getattr(fsm_cls, "compiled_dispatch", False),
+                    engine=getattr(fsm_cls, "engine", "transitions"),
+                )
+                fsm_cls._graph = graph
+    return graph
@@ -0,0 +1,97 @@
+import inspect
+import threading
+from collections import deque
+
+
+class OutputBuffer:
+    """Collects the outputs of one turn so the host can send them together.
+
+    An FSM created with a ``batch_cb`` swaps its ``cb`` for a buffer while
+    ``process_input_or_callback`` runs, then hands every output of the turn to
+    ``batch_cb`` as one list, in the order the states produced them.
+    """
+
+    __slots__ = ("outputs",)
+
+    def __init__(self):
+        self.outputs = []
+
+    def __call__(self, output):
+        self.outputs.append(output)
+
+    def __len__(self):
+        return len(self.outputs)
+
+    def flush(self, batch_cb):
+        """Pass the collected outputs to ``batch_cb`` and return its result.
+
+        Nothing is sent for a turn without output.
+        """
+        outputs, self.outputs = self.outputs, []
+        if outputs:
+            return batch_cb(outputs)
+        return None
+
+
+class OutputRelay:
+    """Hands the outputs of an async turn to the host's ``cb`` on the event loop.
+
+    The FSM calls the relay in place of ``cb``, from the loop or, in the enter
+    callbacks of ``blocking_states``, from an executor thread. ``cb`` itself is
+    only ever called on the loop, in the order the outputs were produced, and
+    awaited when it returns an awaitable. Outputs from an executor thread are
+    delivered while the state is still running, so a streamed answer reaches
+    the user part by part; the rest are delivered by ``flush`` once the step
+    returns.
+    """
+
+    __slots__ = ("cb", "loop", "thread", "pending", "drainer")
+
+    def __init__(self, cb, loop):
+        self.cb = cb
+        self.loop = loop
+        self.thread = threading.get_ident()
+        self.pending = deque()
+        self.drainer = None
+
+    def __call__(self, output):
+        if threading.get_ident() == self.thread:
+            self.pending.append(output)
+        else:
+            self.loop.call_soon_threadsafe(self._arrived, output)
+
+    async def flush(self):
+        """Deliver every output collected so far."""
+        if self.drainer is not None:
+            await self.drainer
+            self.drainer = None
+        while self.pending:
+            await self._deliver(self.pending.popleft())
+
+    def close(self):
+        """Drop what was not delivered, after a turn that failed."""
+        self.pending.clear()
+        if self.drainer is not None:
+            if self.drainer.done():
+                if not self.drainer.cancelled():
+                    # retrieved so a failed cb is not reported a second time
+                    self.drainer.exception()
+            else:
+                self.drainer.cancel()
+            self.drainer = None
+
+    def _arrived(self, output):
+        self.pending.append(output)
+        drainer = self.drainer
+        # a drainer that failed is kept, so flush raises its error
+        if drainer is None or drainer.done() and drainer.exception() is None:
+            self.drainer = self.loop.create_task(self._drain())
+
+    async def _drain(self):
+        while self.pending:
+            await self._deliver(self.pending.popleft())
+
+    async def _deliver(self, output):
+        result = self.cb(output)
+        if inspect.isawaitable(result):
+            await result
@@ -0,0 +1,123 @@
+import logging
+import threading
+import zlib
+
+import deps
+from chat_history import estimate_tokens
+
+logger = logging.getLogger("prompts")
+
+# bump when the message layout below changes
+LAYOUT_VERSION = 1
+# providers only cache prompt prefixes of at least this many tokens
+MIN_CACHEABLE_TOKENS = 1024
+
+
+class AnswerPrompt:
+    """Prompt for a RAG answer state, split so the system prefix never changes.
+
+    The instructions are sent as their own system message, built once on first
+    use. The chat history and the retrieved knowledge follow as separate
+    messages, history first because it only grows between the turns of a
+    session. ``version`` changes whenever the
+    instructions or the layout do, so it can key cached answers.
+
+    ``stats`` counts the prompt tokens sent and, of those, the tokens a
+    provider's prefix cache can serve. Given the session's ``cache`` (such as
+    ``variables.cache``), ``messages`` keeps the prompt it built there and
+    measures how much of the next one repeats it: the instructions and, as
+    the history block only grows between trims, the history the last call
+    already sent. That shared prefix counts as cacheable once it reaches
+    ``MIN_CACHEABLE_TOKENS``. Without a cache, or on the first call after a
+    restore, only the instructions can be counted.
+    """
+
+    def __init__(self, name, instructions, count_tokens=estimate_tokens):
+        self.name = name
+        self.count_tokens = count_tokens
+        self.instructions = instructions.strip()
+        self.prefix_tokens = count_tokens(self.instructions)
+        self.version = f"{name}:{LAYOUT_VERSION}:{zlib.crc32(instructions.encode()):08x}"
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cacheable_tokens = 0
+        self._system = None
+        self._lock = threading.Lock()
+
+    @property
+    def system(self):
+        # built on first use so defining a prompt doesn't import the llm module
+        if self._system is None:
+            self._system = deps.llm_module().sm(self.instructions)
+        return self._system
+
+    def messages(self, knowledge, history, query, cache=None):
+        llm = deps.llm_module()
+        sm, um = llm.sm, llm.um
+        messages = [self.system]
+        if history:
+            messages.append(sm(f"[Chat History]\n{history}"))
+        messages.append(sm(f"[Knowledge]\n{knowledge}"))
+        messages.append(um(f"User: {query}\nBot: "))
+        contents = [self.instructions]
+        contents.extend(message["content"] for message in messages[1:])
+        tokens = self.prefix_tokens + sum(
+            self.count_tokens(content) for content in contents[1:]
+        )
+        if cache is None:
+            shared = self.prefix_tokens
+        else:
+            shared = self._shared_tokens(cache.get("last_prompt"), contents)
+            cache["last_prompt"] = contents
+        self._record(tokens, shared)
+        return messages
+
+    def _shared_tokens(self, previous, contents):
+        # the tokens at the start of ``contents`` that ``previous`` sent too
+        shared = self.prefix_tokens
+        if previous is None or previous[0] != contents[0]:
+            # other sessions send the same instructions
+            return shared
+        for old, new in zip(previous[1:], contents[1:]):
+            if old == new:
+                shared += self.count_tokens(new)
+                continue
+            same = _common_prefix(old, new)
+            if same:
+                shared += self.count_tokens(new[:same])
+            break
+        return shared
+
+    def _record(self, tokens, shared):
+        cacheable = shared if shared >= MIN_CACHEABLE_TOKENS else 0
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += tokens
+            self.cacheable_tokens += cacheable
+        logger.debug(
+            f"{self.name}: {tokens} prompt tokens, {shared} shared with the last "
+            f"prompt, {cacheable} cache-eligible"
+        )
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "prefix_tokens": self.prefix_tokens,
+            "prompt_tokens": self.prompt_tokens,
+            "cacheable_tokens": self.cacheable_tokens,
+        }
+
+
+def _common_prefix(a, b):
+    """Return the length of the longest common prefix of strings ``a`` and ``b``."""
+    if b.startswith(a):
+        return len(a)
+    # a history block that only grew is caught above; bisect the rest in C
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
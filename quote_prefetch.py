@@ -0,0 +1,182 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import beckn
+from search_cache import parse_duration
+
+# how long the selection step waits for a prefetch that is still running
+DEFAULT_WAIT = 5
+
+logger = logging.getLogger("beckn")
+
+
+class QuotePrefetcher:
+    """Fetch /select quotes for listed providers before the user picks one.
+
+    ``prefetch`` sends /select for each provider in the background through the
+    session's client, at most ``max_concurrency`` at a time, and keeps the
+    parsed quotes for ``ttl`` seconds. A failed call is forgotten as soon as it
+    ends, so the next listing tries again. ``get`` returns a provider's quote,
+    waiting up to ``wait`` seconds for a call still in flight, or None so the
+    caller falls back to a normal /select. Quotes are shared between sessions
+    and must not be mutated.
+    """
+
+    def __init__(
+        self,
+        ttl=parse_duration(beckn.TTL),
+        max_concurrency=4,
+        wait=DEFAULT_WAIT,
+        clock=time.monotonic,
+    ):
+        self.ttl = ttl
+        self.max_concurrency = max_concurrency
+        self.wait = wait
+        self.clock = clock
+        self.hits = self.misses = self.fetches = self.errors = 0
+        self._entries = {}
+        # its threads are started on first use, so an idle prefetcher costs none
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="quote-prefetch"
+        )
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(provider):
+        return provider["bpp_id"], provider["id"]
+
+    def prefetch(self, requests, client):
+        """Start fetching quotes for ``requests``, a list of (provider, select body).
+
+        ``client`` is the ``BecknClient`` of the session asking, so prefetches
+        go out the way its own /select would.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        now = self.clock()
+        with self._lock:
+            self._entries = {
+                key: entry
+                for key, entry in self._entries.items()
+                if now - entry[0] < self.ttl
+            }
+            pending = [
+                (self.key(provider), data)
+                for provider, data in requests
+                if self.key(provider) not in self._entries
+            ]
+            jobs = []
+            for key, data in pending:
+                if loop is None:
+                    job = self._executor.submit(self._fetch, client, data)
+                else:
+                    job = loop.create_task(self._fetch_async(loop, client, data))
+                self._entries[key] = (now, job)
+                jobs.append((key, job))
+        # outside the lock: a job that is already done runs its callback at once
+        for key, job in jobs:
+            job.add_done_callback(functools.partial(self._forget_failed, key))
+
+    def get(self, provider):
+        job = self._job(provider)
+        if job is None:
+            return None
+        try:
+            if isinstance(job, Future):
+                quote = job.result(timeout=self.wait)
+            else:
+                # a task of an event loop that is not running here; don't block on it
+                quote = self._settled(job)
+        except FutureTimeoutError:
+            quote = None
+        return self._count(quote)
+
+    async def get_async(self, provider):
+        job = self._job(provider)
+        if job is None:
+            return None
+        if isinstance(job, Future):
+            job = asyncio.wrap_future(job)
+        elif job.get_loop() is not asyncio.get_running_loop():
+            return self._count(self._settled(job))
+        try:
+            quote = await asyncio.wait_for(asyncio.shield(job), self.wait)
+        except asyncio.TimeoutError:
+            quote = None
+        return self._count(quote)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "fetches": self.fetches,
+            "errors": self.errors,
+        }
+
+    def _job(self, provider):
+        entry = self._entries.get(self.key(provider))
+        if entry is None or self.clock() - entry[0] >= self.ttl:
+            self.misses += 1
+            return None
+        return entry[1]
+
+    @staticmethod
+    def _settled(task):
+        if task.done() and not task.cancelled() and task.exception() is None:
+            return task.result()
+        return None
+
+    def _count(self, quote):
+        if quote is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return quote
+
+    def _forget_failed(self, key, job):
+        if job.cancelled() or job.exception() is not None or job.result() is None:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] is job:
+                    del self._entries[key]
+
+    def _fetch(self, client, data):
+        try:
+            response = client.post("select", data)
+        except Exception as e:
+            response = beckn.FailedResponse(503, f"select failed: {e}")
+        return self._parse(response)
+
+    async def _fetch_async(self, loop, client, data):
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        async with semaphore:
+            try:
+                response = await client.post_async("select", data)
+            except Exception as e:
+                response = beckn.FailedResponse(503, f"select failed: {e}")
+        return self._parse(response)
+
+    def _parse(self, response):
+        self.fetches += 1
+        try:
+            if response.status_code == 200:
+                return beckn.parse_quote(response.json())
+        except (KeyError, IndexError, ValueError) as e:
+            logger.error(f"prefetched select response could not be parsed: {e}")
+        self.errors += 1
+        return None
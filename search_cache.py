@@ -0,0 +1,231 @@
+import concurrent.futures
+import json
+import logging
+import re
+import threading
+import time
+
+import beckn
+
+_DURATION = re.compile(
+    r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+(?:\.\d+)?)S)?)?"
+)
+
+logger = logging.getLogger("beckn")
+
+
+def parse_duration(value):
+    """Return the seconds in an ISO 8601 duration such as the Beckn ``ttl`` "PT10M"."""
+    match = _DURATION.fullmatch(value)
+    if match is None or value in ("P", "PT") or value.endswith("T"):
+        raise ValueError(f"not an ISO 8601 duration: {value!r}")
+    days, hours, minutes, seconds = match.groups()
+    return (
+        int(days or 0) * 86400
+        + int(hours or 0) * 3600
+        + int(minutes or 0) * 60
+        + float(seconds or 0)
+    )
+
+
+class SearchResult:
+    """A /search response parsed once and shared by every session that reads it.
+
+    ``providers`` must not be mutated; sessions copy what they keep.
+    """
+
+    status_code = 200
+
+    def __init__(self, data, providers, fetched_at):
+        self.data = data
+        self.providers = tuple(providers)
+        self.fetched_at = fetched_at
+        self.text = ""
+
+    def json(self):
+        return self.data
+
+    @property
+    def responded(self):
+        return bool(self.data["responses"])
+
+
+class SearchCache:
+    """Process-wide cache of /search results with stale-while-revalidate.
+
+    A result is served from the cache for ``ttl`` seconds (the search
+    context's ttl by default). For ``stale_for`` seconds after that it is still
+    served while one background call refreshes it. Failed calls and searches no
+    BPP answered are never cached. Concurrent misses for the same request share
+    one call, and its result or failure, on both the sync and the async path.
+    """
+
+    def __init__(
+        self,
+        parse=beckn.parse_providers,
+        ttl=parse_duration(beckn.TTL),
+        stale_for=None,
+        clock=time.monotonic,
+    ):
+        self.parse = parse
+        self.ttl = ttl
+        self.stale_for = ttl if stale_for is None else stale_for
+        self.clock = clock
+        self.hits = self.stale_hits = self.misses = self.refreshes = self.errors = 0
+        self._entries = {}
+        self._refreshing = set()
+        self._pending = {}
+        self._inflight = {}
+        self._tasks = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(data):
+        # the context only carries addressing and empty ids, so the message decides
+        return json.dumps(data["message"], sort_keys=True)
+
+    def get(self, data, fetch):
+        """Return the result for search request ``data``, fetching it if needed."""
+        key = self.key(data)
+        result = self._lookup(key)
+        if result is not None:
+            if self._claim_refresh(key, result):
+                threading.Thread(
+                    target=self._refresh, args=(key, fetch), daemon=True
+                ).start()
+            return result
+
+        with self._lock:
+            future = self._pending.get(key)
+            fetching = future is None
+            if fetching:
+                future = self._pending[key] = concurrent.futures.Future()
+        if not fetching:
+            # another thread is calling the gateway; share its result or failure
+            return future.result()
+        try:
+            result = self._lookup(key, count=False)
+            if result is None:
+                result = self._store(key, fetch())
+        except BaseException as e:
+            self._release(key)
+            future.set_exception(e)
+            raise
+        self._release(key)
+        future.set_result(result)
+        return result
+
+    async def get_async(self, data, fetch):
+        """Like ``get``, with ``fetch`` a coroutine function."""
+        import asyncio
+
+        key = self.key(data)
+        result = self._lookup(key)
+        if result is not None:
+            if self._claim_refresh(key, result):
+                self._spawn(self._refresh_async(key, fetch))
+            return result
+
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get((loop, key))
+        if task is None:
+            task = self._spawn(self._fetch_async(key, fetch))
+            self._inflight[(loop, key)] = task
+            task.add_done_callback(lambda _: self._inflight.pop((loop, key), None))
+        return await asyncio.shield(task)
+
+    def invalidate(self, data=None):
+        """Drop the cached result for ``data``, or every result."""
+        with self._lock:
+            if data is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self.key(data), None)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+        }
+
+    def _lookup(self, key, count=True):
+        result = self._entries.get(key)
+        if result is not None:
+            age = self.clock() - result.fetched_at
+            if age < self.ttl:
+                if count:
+                    self.hits += 1
+                return result
+            if age < self.ttl + self.stale_for:
+                if count:
+                    self.stale_hits += 1
+                return result
+        if count:
+            self.misses += 1
+        return None
+
+    def _store(self, key, response):
+        if response.status_code != 200:
+            return response
+        data = response.json()
+        result = SearchResult(
+            data, self.parse(data) if data["responses"] else (), self.clock()
+        )
+        if result.responded:
+            with self._lock:
+                self._entries[key] = result
+        return result
+
+    def _claim_refresh(self, key, result):
+        if self.clock() - result.fetched_at < self.ttl:
+            return False
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _refresh(self, key, fetch):
+        try:
+            self._refreshed(self._store(key, fetch()))
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"search refresh failed: {e}")
+        finally:
+            self._refreshing.discard(key)
+
+    async def _refresh_async(self, key, fetch):
+        try:
+            self._refreshed(self._store(key, await fetch()))
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"search refresh failed: {e}")
+        finally:
+            self._refreshing.discard(key)
+
+    def _refreshed(self, result):
+        if isinstance(result, SearchResult) and result.responded:
+            self.refreshes += 1
+        else:
+            self.errors += 1
+
+    async def _fetch_async(self, key, fetch):
+        return self._store(key, await fetch())
+
+    def _spawn(self, coro):
+        import asyncio
+
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _release(self, key):
+        with self._lock:
+            self._pending.pop(key, None)
+
+
+default_cache = SearchCache()
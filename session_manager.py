@@ -0,0 +1,281 @@
+import sys
+import threading
+from collections import OrderedDict
+
+from snapshot import SnapshotError
+
+# rough bytes per resident FSM besides its variables
+SESSION_OVERHEAD = 1024
+# a session's size is estimated again after this many of its turns
+RESIZE_EVERY = 8
+_MISSING = object()
+
+
+def approx_size(value):
+    """Estimate the bytes held by ``value`` and everything it contains."""
+    size = sys.getsizeof(value)
+    if isinstance(value, (str, bytes, int, float, bool)) or value is None:
+        return size
+    fields = getattr(value, "_field_order", None)
+    if fields is not None:
+        # SessionVariables: read the slots directly instead of going through items()
+        for name in fields:
+            item = getattr(value, name, _MISSING)
+            if item is not _MISSING:
+                size += approx_size(item)
+        return size + approx_size(value._extra)
+    if hasattr(value, "items"):
+        return size + sum(approx_size(k) + approx_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(approx_size(item) for item in value)
+    return size
+
+
+def _discard(output):
+    pass
+
+
+class MemoryStore:
+    """Snapshot store kept in a dict; for tests and single-process hosts."""
+
+    def __init__(self):
+        self._snapshots = {}
+
+    def get(self, key):
+        return self._snapshots.get(key)
+
+    def put(self, key, snapshot):
+        self._snapshots[key] = snapshot
+
+    def delete(self, key):
+        self._snapshots.pop(key, None)
+
+    def __len__(self):
+        return len(self._snapshots)
+
+
+class _Session:
+    __slots__ = ("fsm", "size", "turns", "busy", "lock", "alock")
+
+    def __init__(self):
+        self.fsm = None
+        self.size = 0
+        self.turns = 0
+        self.busy = 0
+        self.lock = threading.Lock()
+        self.alock = None
+
+
+class SessionManager:
+    """Live FSM sessions keyed by user id, with cold ones spilled to a store.
+
+    Sessions stay resident in LRU order, so a user's next turn runs on the
+    same FSM instance without being restored. When more than
+    ``max_sessions`` are resident, or their estimated size passes
+    ``max_bytes``, the least recently used idle sessions are written to
+    ``store`` as snapshots and dropped; they are restored from there on their
+    next turn. ``store`` is any object with ``get(key)``, ``put(key,
+    snapshot)`` and ``delete(key)``. Resident sessions only reach the store
+    when evicted or on ``flush``, so call ``flush`` before shutting down.
+
+    Turns of one user are serialized; turns of different users may run
+    concurrently from threads, or from tasks with ``process_async``.
+    """
+
+    def __init__(
+        self,
+        fsm_cls,
+        store=None,
+        max_sessions=10_000,
+        max_bytes=256 * 1024 * 1024,
+        factory=None,
+        compress=False,
+    ):
+        self.fsm_cls = fsm_cls
+        self.store = store if store is not None else MemoryStore()
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.factory = factory if factory is not None else lambda: fsm_cls(None)
+        self.compress = compress
+        self.hits = self.restores = self.creates = self.evictions = 0
+        self.resident_bytes = 0
+        self._sessions = OrderedDict()
+        self._spilling = {}
+        self._lock = threading.Lock()
+        self._store_lock = threading.Lock()
+
+    def process(self, user_id, input, cb=None, batch_cb=None):
+        """Run one turn of ``user_id``'s session and return its FSM."""
+        session = self._checkout(user_id)
+        try:
+            with session.lock:
+                fsm = self._load(user_id, session)
+                fsm.cb, fsm.batch_cb = cb or _discard, batch_cb
+                try:
+                    fsm.process_input_or_callback(input)
+                finally:
+                    fsm.cb = fsm.batch_cb = None
+        finally:
+            self._checkin(user_id, session)
+        return fsm
+
+    async def process_async(self, user_id, input, cb=None, batch_cb=None):
+        import asyncio
+
+        # the store may block (SQLiteStore waits for its commit), so it is
+        # only called from the executor, never from the loop
+        loop = asyncio.get_running_loop()
+        session = self._checkout(user_id)
+        try:
+            if session.alock is None:
+                session.alock = asyncio.Lock()
+            async with session.alock:
+                if session.fsm is None:
+                    fsm = await loop.run_in_executor(
+                        None, self._load, user_id, session
+                    )
+                else:
+                    fsm = self._load(user_id, session)
+                fsm.cb, fsm.batch_cb = cb or _discard, batch_cb
+                try:
+                    await fsm.process_input_or_callback_async(input)
+                finally:
+                    fsm.cb = fsm.batch_cb = None
+        finally:
+            evicted = self._release(user_id, session)
+            if evicted:
+                await loop.run_in_executor(None, self._spill, evicted)
+        return fsm
+
+    def discard(self, user_id):
+        """Forget ``user_id``'s session, resident or stored."""
+        with self._lock:
+            session = self._sessions.pop(user_id, None)
+            if session is not None:
+                self.resident_bytes -= session.size
+            self._spilling.pop(user_id, None)
+        self.store.delete(user_id)
+
+    def flush(self):
+        """Write every resident session to the store without evicting it.
+
+        Sessions in the middle of a turn are written once the turn ends.
+        """
+        with self._lock:
+            sessions = list(self._sessions.items())
+            for _, session in sessions:
+                session.busy += 1
+        try:
+            for user_id, session in sessions:
+                with session.lock:
+                    if session.fsm is not None:
+                        snapshot = self._snapshot(session.fsm)
+                        with self._store_lock:
+                            self.store.put(user_id, snapshot)
+        finally:
+            with self._lock:
+                for _, session in sessions:
+                    session.busy -= 1
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, user_id):
+        return user_id in self._sessions
+
+    def stats(self):
+        return {
+            "resident": len(self._sessions),
+            "resident_bytes": self.resident_bytes,
+            "hits": self.hits,
+            "restores": self.restores,
+            "creates": self.creates,
+            "evictions": self.evictions,
+        }
+
+    def _checkout(self, user_id):
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is None:
+                session = self._sessions[user_id] = _Session()
+            else:
+                self._sessions.move_to_end(user_id)
+            session.busy += 1
+            return session
+
+    def _load(self, user_id, session):
+        if session.fsm is not None:
+            self.hits += 1
+            return session.fsm
+        with self._lock:
+            snapshot = self._spilling.get(user_id)
+        if snapshot is None:
+            snapshot = self.store.get(user_id)
+        fsm = self.factory()
+        if snapshot is None:
+            self.creates += 1
+        else:
+            try:
+                fsm._restore_snapshot(snapshot)
+                self.restores += 1
+            except SnapshotError as e:
+                # damaged, or in a state this release dropped; start over
+                print(f"Error: could not restore session {user_id}: {e}")
+                fsm = self.factory()
+                self.creates += 1
+        session.fsm = fsm
+        return fsm
+
+    def _checkin(self, user_id, session):
+        self._spill(self._release(user_id, session))
+
+    def _release(self, user_id, session):
+        # returns the sessions evicted to make room, for _spill to write
+        size = None
+        if session.fsm is not None and session.turns % RESIZE_EVERY == 0:
+            size = SESSION_OVERHEAD + approx_size(session.fsm.variables)
+        session.turns += 1
+        with self._lock:
+            session.busy -= 1
+            if size is not None and self._sessions.get(user_id) is session:
+                self.resident_bytes += size - session.size
+                session.size = size
+            return self._evict()
+
+    def _spill(self, evicted):
+        for user_id, snapshot in evicted:
+            with self._store_lock:
+                # a later eviction of the same user may already have been written
+                with self._lock:
+                    current = self._spilling.get(user_id) is snapshot
+                if current:
+                    self.store.put(user_id, snapshot)
+                    with self._lock:
+                        if self._spilling.get(user_id) is snapshot:
+                            del self._spilling[user_id]
+
+    def _evict(self):
+        evicted = []
+        skipped = []
+        while self._sessions and (
+            len(self._sessions) > self.max_sessions
+            or self.resident_bytes > self.max_bytes
+        ):
+            user_id, session = self._sessions.popitem(last=False)
+            if session.busy:
+                skipped.append((user_id, session))
+                continue
+            self.resident_bytes -= session.size
+            self.evictions += 1
+            if session.fsm is not None:
+                snapshot = self._snapshot(session.fsm)
+                # served to a returning user until the store has it
+                self._spilling[user_id] = snapshot
+                evicted.append((user_id, snapshot))
+        for user_id, session in reversed(skipped):
+            self._sessions[user_id] = session
+            self._sessions.move_to_end(user_id, last=False)
+        return evicted
+
+    def _snapshot(self, fsm):
+        return fsm._save_snapshot(self.compress)
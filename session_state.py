@@ -0,0 +1,161 @@
+from collections.abc import MutableMapping
+
+_MISSING = object()
+
+
+class SessionVariables(MutableMapping):
+    """Per-session variable store with a fixed schema and a dict interface.
+
+    Subclasses list their keys in ``__slots__``, so a session costs one slot per
+    key instead of a hash table. Keys outside the schema (for example from state
+    saved by an older release) are kept in a small overflow dict.
+
+    Writes are tracked so a turn can be persisted as a patch of the keys it
+    changed. Assigning or deleting a key marks it; values mutated in place must
+    be marked with ``touch``, and lists grown with ``extend`` only record the
+    appended items.
+
+    ``cache`` holds values derived from the variables, such as the rendered chat
+    history; it is never saved, so whatever is put there must be rebuildable.
+    """
+
+    __slots__ = ("_extra", "_dirty", "_appended", "_cache")
+    _fields = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        fields = []
+        for klass in reversed(cls.__mro__):
+            fields.extend(
+                name
+                for name in klass.__dict__.get("__slots__", ())
+                if not name.startswith("_")
+            )
+        cls._field_order = tuple(dict.fromkeys(fields))
+        cls._fields = frozenset(cls._field_order)
+
+    def __init__(self, values=None):
+        self._extra = None
+        self._dirty = None
+        self._appended = None
+        self._cache = None
+        if values:
+            self.update(values)
+            self._dirty = None
+
+    def __getitem__(self, key):
+        if key in self._fields:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self._fields:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+        self.touch(key)
+
+    def __delitem__(self, key):
+        if key in self._fields:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+        self.touch(key)
+
+    def __contains__(self, key):
+        if key in self._fields:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def get(self, key, default=None):
+        if key in self._fields:
+            return getattr(self, key, default)
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def __iter__(self):
+        for name in self._field_order:
+            if hasattr(self, name):
+                yield name
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            self._cache = {}
+        return self._cache
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def touch(self, key):
+        if self._dirty is None:
+            self._dirty = set()
+        self._dirty.add(key)
+        if self._appended is not None:
+            self._appended.pop(key, None)
+
+    def extend(self, key, items):
+        items = list(items)
+        current = self.get(key)
+        if current is None:
+            self[key] = items
+            return
+        current.extend(items)
+        if self._dirty is not None and key in self._dirty:
+            return
+        if self._appended is None:
+            self._appended = {}
+        self._appended.setdefault(key, []).extend(items)
+
+    def mark_clean(self):
+        self._dirty = self._appended = None
+
+    def take_changes(self):
+        """Return ``(changed, removed, appended)`` since the last call and reset them."""
+        dirty, appended = self._dirty or (), self._appended or {}
+        self._dirty = self._appended = None
+        changed = {}
+        removed = []
+        for key in dirty:
+            value = self.get(key, _MISSING)
+            if value is _MISSING:
+                removed.append(key)
+            else:
+                changed[key] = value
+        return changed, removed, appended
+
+    def take_patch(self):
+        """Return the keys written since the last call as a JSON-friendly patch."""
+        changed, removed, appended = self.take_changes()
+        return {"set": changed, "unset": removed, "append": appended}
+
+
+def apply_patch(variables, patch):
+    """Apply a patch from ``take_patch`` to a variables mapping, in place."""
+    variables.update(patch.get("set", {}))
+    for key in patch.get("unset", ()):
+        variables.pop(key, None)
+    for key, items in patch.get("append", {}).items():
+        variables.setdefault(key, []).extend(items)
+    return variables
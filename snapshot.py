@@ -0,0 +1,176 @@
+import marshal
+import struct
+import threading
+import zlib
+
+from fsm_graph import compiled_graph
+from session_state import apply_patch
+
+MAGIC = b"PS"
+VERSION = 2
+FLAG_ZLIB = 0x01
+FLAG_DELTA = 0x02
+# Bodies shorter than this are stored uncompressed even when compression is asked for.
+COMPRESS_MIN_BYTES = 256
+
+# magic, version, flags, marshal format
+_HEADER = struct.Struct(">2sBBB")
+_MISSING = object()
+# what unpacking a damaged body can raise
+_BODY_ERRORS = (TypeError, ValueError, IndexError, StopIteration)
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+class SnapshotCodec:
+    """Versioned binary snapshots of ``(state, variables)`` for one FSM class.
+
+    The body is a marshalled tuple: the state's name, the names of the keys
+    that are set, then their values in that order, so repeated strings inside
+    values are stored once. Snapshots are decoded by name, so they survive a
+    release that adds states or variables: a key the schema no longer has is
+    kept in the overflow dict, and only a state the class no longer has is
+    rejected. Snapshots are only meant to be read back from our own session
+    store, never from user input. A snapshot that is truncated or damaged, or
+    that cannot be restored, raises ``SnapshotError``.
+
+    Delta snapshots carry only the keys written since the previous save, plus
+    the removed keys and items appended with ``SessionVariables.extend``;
+    ``compact`` folds a chain of them back into one full snapshot.
+    """
+
+    def __init__(self, states, variables_cls):
+        self.states = frozenset(states)
+        self.variables_cls = variables_cls
+        self.keys = variables_cls._field_order
+        self._fields = variables_cls._fields
+
+    def encode(self, state, variables, compress=False):
+        if isinstance(variables, self.variables_cls):
+            names, values = [], []
+            for key in self.keys:
+                value = getattr(variables, key, _MISSING)
+                if value is not _MISSING:
+                    names.append(key)
+                    values.append(value)
+            if variables._extra:
+                names.extend(variables._extra)
+                values.extend(variables._extra.values())
+        else:
+            names, values = list(variables), list(variables.values())
+        body = (state, tuple(names), *values)
+        return self._frame(state, 0, compress, body)
+
+    def encode_delta(self, state, variables, compress=False):
+        """Encode and reset the changes recorded on ``variables``."""
+        changed, removed, appended = variables.take_changes()
+        body = (state, tuple(changed), tuple(removed), appended, *changed.values())
+        return self._frame(state, FLAG_DELTA, compress, body)
+
+    def decode(self, snapshot):
+        flags, body = self._unframe(snapshot)
+        if flags & FLAG_DELTA:
+            raise SnapshotError("expected a full snapshot, got a delta")
+        try:
+            state, names, *values = body
+            if len(names) != len(values):
+                raise ValueError(f"{len(names)} keys for {len(values)} values")
+
+            variables = self.variables_cls()
+            extra = {}
+            for name, value in zip(names, values):
+                if name in self._fields:
+                    setattr(variables, name, value)
+                else:
+                    extra[name] = value
+            if extra:
+                variables._extra = extra
+        except _BODY_ERRORS as e:
+            raise SnapshotError(f"corrupt snapshot body: {e!r}") from None
+        return self._known(state), variables
+
+    def decode_delta(self, delta):
+        """Return ``(state, patch)`` with a patch in ``take_patch`` format."""
+        flags, body = self._unframe(delta)
+        if not flags & FLAG_DELTA:
+            raise SnapshotError("expected a delta snapshot, got a full one")
+        try:
+            state, names, removed, appended, *values = body
+            if len(names) != len(values):
+                raise ValueError(f"{len(names)} keys for {len(values)} values")
+            patch = {
+                "set": dict(zip(names, values)),
+                "unset": list(removed),
+                "append": dict(appended),
+            }
+        except _BODY_ERRORS as e:
+            raise SnapshotError(f"corrupt delta body: {e!r}") from None
+        return self._known(state), patch
+
+    def compact(self, snapshot, deltas, compress=False):
+        """Apply ``deltas`` in order to a full snapshot and return a new full one."""
+        state, variables = self.decode(snapshot)
+        for delta in deltas:
+            state, patch = self.decode_delta(delta)
+            apply_patch(variables, patch)
+        return self.encode(state, variables, compress)
+
+    def _known(self, state):
+        if type(state) is not str:
+            raise SnapshotError(f"corrupt snapshot body: state {state!r}")
+        if state not in self.states:
+            raise SnapshotError(f"snapshot is in state {state!r}, which is gone")
+        return state
+
+    def _frame(self, state, flags, compress, body):
+        if state not in self.states:
+            raise SnapshotError(f"unknown state {state!r}")
+        try:
+            data = marshal.dumps(body)
+        except ValueError as e:
+            raise SnapshotError(f"variables cannot be snapshotted: {e}") from None
+
+        if compress and len(data) >= COMPRESS_MIN_BYTES:
+            data = zlib.compress(data, 1)
+            flags |= FLAG_ZLIB
+        return _HEADER.pack(MAGIC, VERSION, flags, marshal.version) + data
+
+    def _unframe(self, snapshot):
+        try:
+            magic, version, flags, body_format = _HEADER.unpack_from(snapshot)
+        except struct.error:
+            raise SnapshotError("truncated snapshot") from None
+        if magic != MAGIC:
+            raise SnapshotError("not a snapshot")
+        if version != VERSION:
+            raise SnapshotError(f"unsupported snapshot version {version}")
+        if body_format > marshal.version:
+            raise SnapshotError(f"unsupported marshal format {body_format}")
+
+        data = snapshot[_HEADER.size :]
+        # a damaged length field can also make marshal ask for a huge container
+        try:
+            if flags & FLAG_ZLIB:
+                data = zlib.decompress(data)
+            return flags, marshal.loads(data)
+        except (zlib.error, ValueError, EOFError, TypeError, MemoryError) as e:
+            raise SnapshotError(f"corrupt snapshot body: {e!r}") from None
+
+
+_codec_lock = threading.Lock()
+
+
+def snapshot_codec(fsm_cls):
+    """Return the SnapshotCodec of ``fsm_cls``, building it on first use."""
+    codec = fsm_cls.__dict__.get("_codec")
+    if codec is None:
+        with _codec_lock:
+            codec = fsm_cls.__dict__.get("_codec")
+            if codec is None:
+                codec = SnapshotCodec(
+                    compiled_graph(fsm_cls).states, fsm_cls.variables_cls
+                )
+                fsm_cls._codec = codec
+    return codec
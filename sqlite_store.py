@@ -0,0 +1,234 @@
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    session_id TEXT PRIMARY KEY,
+    snapshot BLOB NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID
+"""
+# constant SQL, so each connection prepares these once and reuses them
+_SELECT = "SELECT snapshot FROM snapshots WHERE session_id = ?"
+_UPSERT = (
+    "INSERT OR REPLACE INTO snapshots (session_id, snapshot, updated_at) "
+    "VALUES (?, ?, ?)"
+)
+_DELETE = "DELETE FROM snapshots WHERE session_id = ?"
+
+_DELETED = object()
+
+
+class _Batch:
+    __slots__ = ("done", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+
+class SQLiteStore:
+    """Session snapshots in one SQLite database in WAL mode.
+
+    Writes from every thread are queued and committed by one writer thread,
+    many sessions per transaction. Writes that arrive while a transaction is
+    being committed go into the next one, which is committed ``flush_window``
+    seconds after its first write (at once by default), or as soon as it
+    holds ``max_batch`` sessions. With
+    ``durable`` (the default) ``put`` and ``delete`` return once their batch
+    is committed; otherwise they return at once and ``flush`` waits for them.
+    A session written twice in one window is written once. ``get`` sees
+    queued writes, then reads the row by primary key on a per-thread
+    connection, so reads never wait for the writer.
+
+    Values are bytes, such as ``FSM._save_snapshot()``, so the store can back
+    a ``session_manager.SessionManager``.
+    """
+
+    def __init__(
+        self,
+        path,
+        flush_window=0,
+        max_batch=512,
+        durable=True,
+        synchronous="NORMAL",
+        timeout=30,
+    ):
+        self.path = path
+        self.flush_window = flush_window
+        self.max_batch = max_batch
+        self.durable = durable
+        self.synchronous = synchronous
+        self.timeout = timeout
+        self.writes = self.deletes = self.batches = self.errors = 0
+        self._pending = {}
+        self._committing = {}
+        self._batch = _Batch()
+        self._inflight = None
+        self._opened_at = 0.0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._readers = []
+
+        conn = self._connect()
+        conn.execute(_SCHEMA)
+        conn.close()
+        self._writer = threading.Thread(
+            target=self._write_loop, name="sqlite-store", daemon=True
+        )
+        self._writer.start()
+
+    def get(self, key):
+        key = str(key)
+        with self._cond:
+            snapshot = self._pending.get(key)
+            if snapshot is None:
+                snapshot = self._committing.get(key)
+        if snapshot is not None:
+            return None if snapshot is _DELETED else snapshot
+        row = self._reader().execute(_SELECT, (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def put(self, key, snapshot):
+        self._queue(str(key), bytes(snapshot))
+
+    def delete(self, key):
+        self._queue(str(key), _DELETED)
+
+    def flush(self):
+        """Wait until every write queued so far is committed."""
+        with self._cond:
+            if self._pending:
+                batch = self._batch
+                self._opened_at = float("-inf")
+                self._cond.notify_all()
+            else:
+                batch = self._inflight
+        if batch is not None:
+            self._wait(batch)
+
+    def close(self):
+        """Commit queued writes, stop the writer and close every connection."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join()
+        for conn in self._readers:
+            conn.close()
+        self._readers.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        self.flush()
+        return self._reader().execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+
+    def stats(self):
+        return {
+            "writes": self.writes,
+            "deletes": self.deletes,
+            "batches": self.batches,
+            "errors": self.errors,
+            "mean_batch": (
+                (self.writes + self.deletes) / self.batches if self.batches else 0.0
+            ),
+        }
+
+    def _queue(self, key, value):
+        with self._cond:
+            # a full batch holds new sessions back until the writer takes it
+            while len(self._pending) >= self.max_batch and key not in self._pending:
+                if self._closed:
+                    break
+                self._cond.wait()
+            if self._closed:
+                raise ValueError("the store is closed")
+            if not self._pending:
+                self._opened_at = time.monotonic()
+            self._pending[key] = value
+            batch = self._batch
+            self._cond.notify_all()
+        if self.durable:
+            self._wait(batch)
+
+    @staticmethod
+    def _wait(batch):
+        batch.done.wait()
+        if batch.error is not None:
+            raise batch.error
+
+    def _connect(self):
+        # autocommit mode; the writer opens its transactions explicitly
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            with self._cond:
+                self._readers.append(conn)
+        return conn
+
+    def _write_loop(self):
+        conn = self._connect()
+        try:
+            while True:
+                with self._cond:
+                    while not self._pending and not self._closed:
+                        self._cond.wait()
+                    if not self._pending:
+                        return
+                    while len(self._pending) < self.max_batch and not self._closed:
+                        deadline = self._opened_at + self.flush_window
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    batch, writes = self._batch, self._pending
+                    self._batch, self._pending = _Batch(), {}
+                    self._committing, self._inflight = writes, batch
+                    self._cond.notify_all()
+                self._commit(conn, batch, writes)
+                with self._cond:
+                    self._committing, self._inflight = {}, None
+                batch.done.set()
+        finally:
+            conn.close()
+
+    def _commit(self, conn, batch, writes):
+        now = time.time()
+        upserts = [(k, v, now) for k, v in writes.items() if v is not _DELETED]
+        deletes = [(k,) for k, v in writes.items() if v is _DELETED]
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(_UPSERT, upserts)
+                conn.executemany(_DELETE, deletes)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        except Exception as e:
+            self.errors += 1
+            batch.error = e
+            print(f"Error: could not write {len(writes)} session snapshots: {e}")
+            return
+        self.writes += len(upserts)
+        self.deletes += len(deletes)
+        self.batches += 1
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# the modules of pulse are imported by their own names, as the bots do
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
@@ -0,0 +1,104 @@
+import logging
+
+from answer_cache import AnswerCache, MemoryBackend, SharedBackend
+
+CHUNKS = [{"chunk": "Section 138 covers dishonour of cheques."}]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_key_normalizes_the_query():
+    key = AnswerCache.key("What is a  cheque bounce?", CHUNKS, 1)
+    assert key == AnswerCache.key("what is a cheque bounce", CHUNKS, 1)
+    assert AnswerCache.key("?!", CHUNKS, 1) is None
+
+
+def test_key_changes_with_chunks_and_prompt_version():
+    key = AnswerCache.key("what is a cheque bounce", CHUNKS, 1)
+    assert key != AnswerCache.key("what is a cheque bounce", CHUNKS, 2)
+    other = [{"chunk": "Section 138 was amended."}]
+    assert key != AnswerCache.key("what is a cheque bounce", other, 1)
+
+
+def test_hit_and_miss():
+    cache = AnswerCache()
+    key = cache.key("what is udyam", CHUNKS, 1)
+    assert cache.get(key) is None
+    cache.put(key, "A registration for small businesses.")
+    cache.put(None, "never stored")
+    cache.put(cache.key("empty", CHUNKS, 1), "")
+    assert cache.get(key) == "A registration for small businesses."
+    assert cache.get(None) is None
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 1,
+        "bytes": len(key) + len("A registration for small businesses."),
+        "evictions": 0,
+        "expirations": 0,
+    }
+
+
+def test_memory_backend_expires_entries():
+    clock = Clock()
+    backend = MemoryBackend(ttl=10, clock=clock)
+    backend.set("k", "answer")
+    clock.now = 9.9
+    assert backend.get("k") == "answer"
+    clock.now = 10
+    assert backend.get("k") is None
+    assert backend.expirations == 1 and backend.bytes == 0
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_entries=2)
+    backend.set("a", "1")
+    backend.set("b", "2")
+    backend.get("a")
+    backend.set("c", "3")
+    assert (backend.get("a"), backend.get("b"), backend.get("c")) == ("1", None, "3")
+    assert backend.evictions == 1
+
+    backend = MemoryBackend(max_bytes=9)
+    backend.set("a", "1234")
+    backend.set("b", "1234")
+    backend.set("too big", "x" * 9)
+    assert len(backend) == 1 and backend.bytes == 5
+
+
+class FailingClient:
+    def get(self, key):
+        raise ConnectionError("down")
+
+    def set(self, key, value, ex):
+        raise ConnectionError("down")
+
+
+class DictClient(dict):
+    def set(self, key, value, ex):
+        self[key] = value
+
+
+def test_shared_backend():
+    client = DictClient()
+    cache = AnswerCache(SharedBackend(client, prefix="test:"))
+    cache.put("k", "answer")
+    assert client == {"test:k": b"answer"}
+    assert cache.get("k") == "answer"
+
+
+def test_shared_backend_failure_is_a_logged_miss(caplog):
+    cache = AnswerCache(SharedBackend(FailingClient()))
+    with caplog.at_level(logging.ERROR, logger="answer_cache"):
+        cache.put("k", "answer")
+        assert cache.get("k") is None
+    assert cache.stats() == {"hits": 0, "misses": 1, "errors": 2}
+    assert [r.getMessage() for r in caplog.records] == [
+        "answer cache set failed: down",
+        "answer cache get failed: down",
+    ]
@@ -0,0 +1,135 @@
+import types
+
+import pytest
+
+from answer_stream import AnswerStream
+
+ANSWER = (
+    "Section 138 covers cheques returned unpaid. "
+    "The payee must send a demand notice within thirty days. "
+    "The drawer then has fifteen days to pay.\n"
+    "After that a complaint can be filed."
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def tokens(text, clock=None, step=0.0):
+    """Yield ``text`` a few characters at a time, advancing ``clock`` by ``step``."""
+    for i in range(0, len(text), 7):
+        if clock is not None:
+            clock.now += step
+        yield text[i : i + 7]
+
+
+def test_parts_end_at_sentence_breaks():
+    clock = Clock()
+    parts = []
+    stream = AnswerStream(min_chars=20, interval=1.0, clock=clock)
+    out = stream.send(parts.append, tokens(ANSWER, clock, step=1.0))
+
+    assert out == ANSWER
+    assert parts == [
+        "Section 138 covers cheques returned unpaid.",
+        "The payee must send a demand notice within thirty days.",
+        "The drawer then has fifteen days to pay.",
+        "After that a complaint can be filed.",
+    ]
+
+
+def test_parts_hold_min_chars():
+    clock = Clock()
+    parts = []
+    AnswerStream(min_chars=60, interval=0, clock=clock).send(
+        parts.append, tokens(ANSWER)
+    )
+    assert all(len(part) >= 60 for part in parts[:-1])
+    assert " ".join(parts).split() == ANSWER.split()
+
+
+def test_text_generated_within_the_interval_is_joined():
+    clock = Clock()
+    parts = []
+    # the whole answer arrives before the interval is up
+    AnswerStream(min_chars=20, interval=5.0, clock=clock).send(
+        parts.append, tokens(ANSWER, clock, step=0.1)
+    )
+    assert parts == [
+        "Section 138 covers cheques returned unpaid.",
+        "The payee must send a demand notice within thirty days. "
+        "The drawer then has fifteen days to pay.\n"
+        "After that a complaint can be filed.",
+    ]
+
+
+def test_short_and_empty_answers():
+    parts = []
+    stream = AnswerStream(min_chars=80, clock=Clock())
+    assert stream.send(parts.append, tokens("Yes.")) == "Yes."
+    assert stream.send(parts.append, iter(["", "  "])) == "  "
+    assert parts == ["Yes."]
+
+
+@pytest.fixture(scope="module")
+def fsm():
+    pytest.importorskip("lib.data_models")
+    import cb_fsm
+
+    return cb_fsm
+
+
+class Prompt:
+    version = "1"
+
+    def messages(self, knowledge, history, query, cache=None):
+        return [{"role": "user", "content": query}]
+
+
+def session(fsm, batch_cb=None):
+    outputs = []
+    history = []
+    bot = types.SimpleNamespace(
+        cb=outputs.append,
+        batch_cb=batch_cb,
+        answer_stream=AnswerStream(min_chars=20, interval=0, clock=Clock()),
+        variables=types.SimpleNamespace(cache={}),
+        history_window=types.SimpleNamespace(
+            render=lambda variables: "",
+            add=lambda variables, query, out: history.append((query, out)),
+        ),
+        answer_cache=types.SimpleNamespace(
+            key=lambda *args: None, get=lambda key: None, put=lambda key, out: None
+        ),
+    )
+    bot.send_text = lambda text: fsm.FSM.send_text(bot, text)
+    return bot, outputs, history
+
+
+def test_streamed_answer_is_sent_once_and_kept_whole(fsm, monkeypatch):
+    monkeypatch.setattr(fsm, "llm_stream", lambda messages: tokens(ANSWER))
+    bot, outputs, history = session(fsm)
+
+    out = fsm.FSM._answer(bot, Prompt(), "cheque bounced", [], "")
+    assert out == ANSWER
+    assert [o.text for o in outputs] == [
+        "Section 138 covers cheques returned unpaid.",
+        "The payee must send a demand notice within thirty days.",
+        "The drawer then has fifteen days to pay.",
+        "After that a complaint can be filed.",
+    ]
+    assert history == [("cheque bounced", ANSWER)]
+
+
+def test_batch_sessions_get_the_answer_whole(fsm, monkeypatch):
+    monkeypatch.setattr(fsm, "llm", lambda messages: ANSWER)
+    bot, outputs, history = session(fsm, batch_cb=lambda outputs: None)
+
+    assert fsm.FSM._answer(bot, Prompt(), "cheque bounced", [], "") == ANSWER
+    assert [o.text for o in outputs] == [ANSWER]
+    assert history == [("cheque bounced", ANSWER)]
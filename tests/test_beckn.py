@@ -0,0 +1,191 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+import requests
+
+import async_http
+import beckn
+
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class Transport:
+    """Answers calls from ``script``, one status code or exception per call."""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = []
+
+    def answer(self, url, timeout):
+        self.calls.append((url, timeout))
+        step = self.script.pop(0) if self.script else 200
+        if isinstance(step, Exception):
+            raise step
+        return Response(step)
+
+    def post(self, url, json=None, timeout=None):
+        return self.answer(url, timeout)
+
+    async def post_async(self, url, json=None, timeout=None):
+        return self.answer(url, timeout)
+
+
+@pytest.fixture
+def delays(monkeypatch):
+    slept = []
+    monkeypatch.setattr(beckn.time, "sleep", slept.append)
+    monkeypatch.setattr(beckn.random, "uniform", lambda a, b: b)
+    return slept
+
+
+def client(transport, **kwargs):
+    client = beckn.BecknClient("http://bap.test/", **kwargs)
+    client._session = transport
+    return client
+
+
+@pytest.mark.parametrize("action", ["search", "select"])
+def test_idempotent_actions_retry(delays, action):
+    transport = Transport(503, 502)
+    response = client(transport).post(action, {})
+    assert response.status_code == 200
+    assert len(transport.calls) == 3
+    assert transport.calls[0] == (f"http://bap.test/{action}", beckn.TIMEOUTS[action])
+
+
+@pytest.mark.parametrize("action", ["init", "confirm"])
+def test_other_actions_do_not_retry(delays, action):
+    transport = Transport(503)
+    response = client(transport).post(action, {})
+    assert response.status_code == 503
+    assert len(transport.calls) == 1
+    assert delays == []
+
+
+def test_retries_are_bounded(delays):
+    transport = Transport(503, 503, 503, 503)
+    response = client(transport, retries=2).post("search", {})
+    assert response.status_code == 503
+    assert len(transport.calls) == 3
+    assert transport.script == [503]
+
+
+def test_client_errors_are_not_retried(delays):
+    transport = Transport(404)
+    assert client(transport).post("search", {}).status_code == 404
+    assert len(transport.calls) == 1
+
+
+def test_transport_errors_become_failed_responses(delays):
+    transport = Transport(requests.Timeout("slow"), requests.ConnectionError("down"))
+    response = client(transport, retries=1).post("search", {})
+    assert isinstance(response, beckn.FailedResponse)
+    assert response.status_code == 503
+    assert "connection failed" in response.text
+    transport = Transport(requests.Timeout("slow"))
+    response = client(transport).post("confirm", {})
+    assert response.status_code == 504
+    assert "timed out" in response.text
+
+
+def test_backoff_doubles_up_to_the_cap(delays):
+    transport = Transport(*[503] * 5)
+    client(transport, retries=5, backoff=1.0, max_backoff=4.0).post("search", {})
+    assert delays == [1.5, 3.0, 4.0, 4.0, 4.0]
+
+
+def test_stats(delays):
+    c = client(Transport(503, 200, 200, 500))
+    c.post("search", {})
+    c.post("select", {})
+    c.post("confirm", {})
+    stats = c.stats()
+    assert set(stats) == {"search", "select", "confirm"}
+    assert stats["search"]["calls"] == 2
+    assert stats["search"]["retries"] == 1
+    assert stats["search"]["errors"] == 1
+    assert stats["select"]["calls"] == 1
+    assert stats["select"]["errors"] == 0
+    assert stats["confirm"]["errors"] == 1
+    assert stats["confirm"]["retries"] == 0
+    assert stats["search"]["max_seconds"] >= stats["search"]["mean_seconds"] >= 0
+
+
+def test_async_retries_only_idempotent_actions(monkeypatch):
+    slept = []
+
+    async def sleep(delay):
+        slept.append(delay)
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    monkeypatch.setattr(beckn.random, "uniform", lambda a, b: b)
+    transport = Transport(
+        httpx.ConnectError("down"), httpx.ReadTimeout("slow"), 200, 503
+    )
+    monkeypatch.setattr(async_http, "post", transport.post_async)
+    c = beckn.BecknClient("http://bap.test", backoff=1.0, max_backoff=2.0)
+
+    async def main():
+        return await c.post_async("select", {}), await c.post_async("confirm", {})
+
+    selected, confirmed = asyncio.run(main())
+    assert selected.status_code == 200
+    assert confirmed.status_code == 503
+    assert len(transport.calls) == 4
+    assert slept == [1.5, 2.0]
+    assert c.stats()["select"]["retries"] == 2
+    assert c.stats()["select"]["errors"] == 2
+    assert c.stats()["confirm"]["calls"] == 1
+
+
+class SlowTransport:
+    """Answers each call after the ``delay`` seconds given in its body."""
+
+    def post(self, url, json=None, timeout=None):
+        time.sleep(json["delay"])
+        return Response(json["status"])
+
+    def close(self):
+        pass
+
+    async def post_async(self, url, json=None, timeout=None):
+        await asyncio.sleep(json["delay"])
+        return Response(json["status"])
+
+
+BODIES = [
+    {"delay": 0.0, "status": 200},
+    {"delay": 1.0, "status": 201},
+    {"delay": 0.05, "status": 202},
+]
+
+
+def test_post_many_answers_late_calls_with_504s():
+    c = client(SlowTransport())
+    start = time.perf_counter()
+    responses = c.post_many("select", BODIES, deadline=0.3)
+    assert time.perf_counter() - start < 0.9
+    assert [r.status_code for r in responses] == [200, 504, 202]
+    assert responses[1].text == "select missed the 0.3s deadline"
+    c.close()
+
+
+def test_post_many_async_answers_late_calls_with_504s(monkeypatch):
+    monkeypatch.setattr(async_http, "post", SlowTransport().post_async)
+    c = beckn.BecknClient("http://bap.test")
+
+    async def main():
+        start = time.perf_counter()
+        responses = await c.post_many_async("select", BODIES, deadline=0.3)
+        return time.perf_counter() - start, responses
+
+    elapsed, responses = asyncio.run(main())
+    assert elapsed < 0.9
+    assert [r.status_code for r in responses] == [200, 504, 202]
+    assert responses[1].text == "select missed the 0.3s deadline"
+    assert c.stats()["select"]["calls"] == 2
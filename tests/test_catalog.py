@@ -0,0 +1,156 @@
+import os
+
+import pytest
+
+import catalog
+from catalog import CatalogCache
+
+
+class Reader:
+    """Returns the file's text as the table and counts the parses."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, path, columns):
+        self.calls += 1
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+
+def rewrite(path, text, mtime_ns):
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = tmp_path / "data.xlsx"
+    rewrite(path, "first", 1_000_000_000_000_000_000)
+    return path
+
+
+def test_loads_once_while_the_file_is_unchanged(workbook, monkeypatch):
+    reader = Reader()
+    cache = CatalogCache(reader)
+    assert cache.load(str(workbook)) == "first"
+    assert cache.load(str(workbook)) == "first"
+    # the same file by another path is the same table
+    monkeypatch.chdir(workbook.parent)
+    assert cache.load("data.xlsx") == "first"
+    assert reader.calls == 1
+    assert cache.stats() == {"loads": 1, "hits": 2, "tables": 1}
+
+
+def test_reloads_when_the_size_changes(workbook):
+    reader = Reader()
+    cache = CatalogCache(reader)
+    cache.load(str(workbook))
+    # same mtime, so only the size tells the files apart
+    rewrite(workbook, "second!", 1_000_000_000_000_000_000)
+    assert cache.load(str(workbook)) == "second!"
+    assert reader.calls == 2
+
+
+def test_reloads_when_the_mtime_changes(workbook):
+    reader = Reader()
+    cache = CatalogCache(reader)
+    cache.load(str(workbook))
+    rewrite(workbook, "other", 1_000_000_000_000_000_001)
+    assert cache.load(str(workbook)) == "other"
+    assert cache.load(str(workbook)) == "other"
+    assert reader.calls == 2
+    assert cache.stats() == {"loads": 2, "hits": 1, "tables": 1}
+
+
+def test_columns_are_part_of_the_key(workbook):
+    reader = Reader()
+    cache = CatalogCache(reader)
+    cache.load(str(workbook))
+    cache.load(str(workbook), {"SN": "service_number"})
+    assert reader.calls == 2
+    cache.clear()
+    cache.load(str(workbook))
+    assert reader.calls == 3
+
+
+def test_missing_file_raises(tmp_path):
+    cache = CatalogCache(Reader())
+    with pytest.raises(FileNotFoundError):
+        cache.load(str(tmp_path / "missing.xlsx"))
+
+
+def test_module_load_uses_the_default_catalog(workbook, monkeypatch):
+    monkeypatch.setattr(catalog, "default_catalog", CatalogCache(Reader()))
+    assert catalog.load(str(workbook)) == "first"
+    assert catalog.default_catalog.stats()["loads"] == 1
+
+
+PROVIDERS = {
+    "SN": [1, 2, 3],
+    "Provider name": ["Lex & Co", "Nyaya Partners", "Desai Law"],
+    "Provider Short Desc": ["Cheque bounce", "Civil disputes", "Mediation"],
+    "Provider Long Desc": ["Ten years of NI Act cases.", "Delhi bar.", "ODR only."],
+    "Provider Addnt Desc URL": ["https://lex.example", "https://nyaya.example", ""],
+    "Provider Image": ["lex.png", "nyaya.png", "desai.png"],
+    "item.descriptor.code": ["CB", "CD", "MD"],
+    "item.descriptor.name": ["Cheque bounce", "Civil", "Mediation"],
+    "item.descriptor.short_desc": ["NI Act 138", "CPC", "Online"],
+    "item.descriptor.long_desc": ["Notice and complaint", "Suits", "Sessions"],
+    "item.descriptor.Images": ["cb.png", "cd.png", "md.png"],
+    "item base fee": [2000, 3500, 1500.5],
+    "Item per hearing fee": [400, 750, 0],
+    "categories_id": ["LEGAL", "LEGAL", "ODR"],
+    "intent.fulfillment.time": [
+        "2024-03-01T15:37:00Z",
+        "2024-03-02T09:05:00+05:30",
+        "2024-12-31T23:59:59.000Z",
+    ],
+}
+
+
+def iterrows_listing(df):
+    """The listing as on_enter_fetch_lsp built it before the cards were cached."""
+    from datetime import datetime
+
+    cards, providers = [], []
+    for i, row in df.iterrows():
+        timestamp_obj = datetime.fromisoformat(
+            row["intent_fulfillment_time"].replace("Z", "+00:00")
+        )
+        readable_timestamp = timestamp_obj.strftime("%Y-%m-%d %H:%M")
+        cards.append(
+            f"{row['provider_name']}\n{row['short_desc']}\n{row['long_desc']}\n"
+            f"URL: {row['url']}\nBase Fee: {row['base_fee']}\n"
+            f"Item per Hearing Fee: {row['item_per_hearing_fee']}\n"
+            f"Fulfillment Time: {readable_timestamp}"
+        )
+        providers.append(
+            {
+                "id": row["service_number"],
+                "provider_name": row["provider_name"],
+                "base_fee": row["base_fee"],
+                "intent_fulfillment_time": readable_timestamp,
+            }
+        )
+    return cards, providers
+
+
+def test_precomputed_listing_matches_iterrows(tmp_path):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("openpyxl")
+    path = tmp_path / "data.xlsx"
+    pd.DataFrame(PROVIDERS).to_excel(path, index=False)
+
+    cards, providers = iterrows_listing(
+        catalog.read_frame(path, catalog.PROVIDER_COLUMNS)
+    )
+    table = catalog.read_providers(path)
+    assert [row["card_text"] for row in table] == cards
+    assert table.providers() == providers
+    # numpy scalars are unwrapped, so sessions snapshot plain values
+    assert [type(p["base_fee"]) for p in table.providers()] == [float] * 3
+    assert type(table[0]["item_per_hearing_fee"]) is int
+    # each session gets its own copies
+    table.providers()[0]["base_fee"] = 0
+    assert table.summaries[0]["base_fee"] == 2000
@@ -0,0 +1,89 @@
+import copy
+
+from chat_history import ChatHistory, estimate_tokens, render_row
+from session_state import SessionVariables
+
+
+class Variables(SessionVariables):
+    __slots__ = ("history", "history_summary")
+
+
+def turns(history, variables, n, words=5):
+    for i in range(n):
+        history.add(variables, f"question {i}?", f"Answer {i}. " + "word " * words)
+
+
+def test_keeps_the_last_turns_verbatim():
+    history = ChatHistory(max_turns=2, max_tokens=10_000)
+    variables = Variables()
+    turns(history, variables, 3)
+    assert [row["message"] for row in variables["history"]] == [
+        "question 1?",
+        "Answer 1. " + "word " * 5,
+        "question 2?",
+        "Answer 2. " + "word " * 5,
+    ]
+    assert variables["history_summary"] == (
+        "User asked: question 0?\nBot answered: Answer 0."
+    )
+    assert history.render(variables) == (
+        "[Summary of earlier conversation]\n"
+        "User asked: question 0?\nBot answered: Answer 0.\n\n"
+        + "\n".join(render_row(row) for row in variables["history"])
+    )
+
+
+def test_evicts_turns_over_the_token_budget():
+    history = ChatHistory(max_turns=10, max_tokens=60)
+    variables = Variables()
+    turns(history, variables, 6, words=10)
+    text = "\n".join(render_row(row) for row in variables["history"])
+    assert 2 <= len(variables["history"]) < 12
+    assert sum(estimate_tokens(render_row(r)) for r in variables["history"]) <= 60
+    assert history.render(variables).endswith(text)
+
+
+def test_latest_turn_is_kept_even_over_budget():
+    history = ChatHistory(max_tokens=5)
+    variables = Variables()
+    turns(history, variables, 2, words=50)
+    assert len(variables["history"]) == 2
+    assert variables["history"][0]["message"] == "question 1?"
+
+
+def test_summary_is_trimmed_from_the_front():
+    history = ChatHistory(max_turns=1, summary_tokens=20)
+    variables = Variables()
+    turns(history, variables, 8)
+    lines = variables["history_summary"].split("\n")
+    assert sum(estimate_tokens(line) for line in lines) <= 20
+    assert lines[-1] == "Bot answered: Answer 6."
+
+
+def test_only_rows_and_summary_are_saved():
+    history = ChatHistory(max_turns=2)
+    variables = Variables()
+    turns(history, variables, 3)
+    assert set(variables.to_dict()) == {"history", "history_summary"}
+    patch = variables.take_patch()
+    assert set(patch["set"]) | set(patch["append"]) <= {"history", "history_summary"}
+
+
+def test_restored_session_renders_the_same_window():
+    history = ChatHistory(max_turns=3, max_tokens=80)
+    variables = Variables()
+    turns(history, variables, 5)
+    restored = Variables(copy.deepcopy(variables.to_dict()))
+    assert history.render(restored) == history.render(variables)
+    history.add(variables, "last?", "Done.")
+    history.add(restored, "last?", "Done.")
+    assert restored.to_dict() == variables.to_dict()
+    assert history.render(restored) == history.render(variables)
+
+
+def test_history_replaced_outside_add_is_rendered_again():
+    history = ChatHistory()
+    variables = Variables()
+    turns(history, variables, 2)
+    variables["history"] = [{"name": "User", "message": "reset"}]
+    assert history.render(variables) == "User: reset"
@@ -0,0 +1,176 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+import fsm_graph
+from fsm_graph import compiled_graph, discriminator, user_input
+
+MENU = ("1", "2", "3", "4", "5", "6")
+
+
+class Menu:
+    """A six-item menu, a free-text guard after it and a fallback."""
+
+    states = ("zero", "menu", "item", "search", "end")
+    blocking_states = ("search",)
+
+    def __init__(self):
+        self.log = []
+        self.count = 0
+        compiled_graph(type(self)).attach(self)
+
+    @classmethod
+    def build_transitions(cls):
+        transitions = [{"trigger": "next", "source": "zero", "dest": "menu"}]
+        for option in MENU:
+            transitions.append(
+                {
+                    "trigger": "next",
+                    "source": "menu",
+                    "dest": "item",
+                    "conditions": f"chose_{option}",
+                }
+            )
+        transitions += [
+            {
+                "trigger": "next",
+                "source": "menu",
+                "dest": "search",
+                "conditions": "asked",
+            },
+            {"trigger": "next", "source": "menu", "dest": "menu"},
+            {"trigger": "next", "source": "item", "dest": "end", "conditions": "done"},
+            {"trigger": "next", "source": "item", "dest": "menu"},
+            {"trigger": "next", "source": "search", "dest": "menu"},
+        ]
+        return transitions
+
+    def step(self, input):
+        self.input = input
+        return compiled_graph(type(self)).trigger(self)
+
+    async def step_async(self, input):
+        self.input = input
+        return await compiled_graph(type(self)).trigger_async(self)
+
+    def asked(self):
+        return self.input.endswith("?")
+
+    def done(self):
+        # truthy but not True, which Machine treats as false
+        return "yes" if self.input == "maybe" else self.input == "done"
+
+    def on_enter_menu(self):
+        self.count += 1
+        self.log.append(("enter menu", self.input))
+
+    def on_exit_menu(self):
+        self.log.append(("exit menu", self.input))
+
+    def on_enter_item(self):
+        self.log.append(("enter item", self.input))
+
+    def on_enter_search(self):
+        self.log.append(("search", self.input))
+
+    async def on_enter_item_async(self):
+        self.log.append(("enter item", self.input))
+
+
+for option in MENU:
+    setattr(
+        Menu,
+        f"chose_{option}",
+        discriminator(user_input, option)(lambda self, o=option: self.input == o),
+    )
+
+INPUTS = ["hi", "7", "what?", "back", "3", "maybe", "done"]
+VARIANTS = [
+    (engine, compiled) for engine in fsm_graph.ENGINES for compiled in (False, True)
+]
+
+
+def variant(engine, compiled):
+    return type("Menu", (Menu,), {"engine": engine, "compiled_dispatch": compiled})
+
+
+def transcript(cls, run_async):
+    fsm = cls()
+    turns = []
+    for text in INPUTS:
+        if run_async:
+            moved = asyncio.run(fsm.step_async(text))
+        else:
+            moved = fsm.step(text)
+        turns.append((text, moved, fsm.state, fsm.count))
+    return turns, fsm.log
+
+
+@pytest.mark.parametrize("run_async", [False, True])
+@pytest.mark.parametrize("engine, compiled", VARIANTS)
+def test_engines_take_the_same_transitions(engine, compiled, run_async):
+    expected = transcript(variant("transitions", False), False)
+    assert transcript(variant(engine, compiled), run_async) == expected
+
+
+def test_menu_is_dispatched_with_a_lookup():
+    graph = compiled_graph(variant("builtin", True))
+    assert set(graph._dispatch) == {"menu"}
+    assert not compiled_graph(variant("builtin", False))._dispatch
+
+
+def finished(engine):
+    fsm = variant(engine, False)()
+    for text in ("hi", "1", "done"):
+        fsm.step(text)
+    assert fsm.state == "end"
+    return fsm
+
+
+def test_state_without_transitions_raises_machine_error():
+    fsm = finished("builtin")
+    with pytest.raises(fsm_graph.MachineError):
+        fsm.step("again")
+    with pytest.raises(fsm_graph.MachineError):
+        asyncio.run(fsm.step_async("again"))
+
+
+@pytest.mark.parametrize("engine", fsm_graph.ENGINES)
+def test_machine_error_is_the_same_on_both_engines(engine):
+    transitions = pytest.importorskip("transitions")
+    fsm = finished(engine)
+    with pytest.raises(transitions.MachineError, match="from state end"):
+        fsm.step("again")
+
+
+def test_unknown_engine_is_rejected():
+    with pytest.raises(ValueError):
+        fsm_graph.StateGraph(Menu, Menu.states, [], engine="fast")
+
+
+@pytest.fixture(scope="module")
+def bots():
+    # the bots need lib.data_models from the host application
+    pytest.importorskip("lib.data_models")
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+    import conversations
+    import engines
+
+    with conversations.stubbed() as quiet:
+        yield conversations, engines, quiet
+
+
+@pytest.mark.parametrize("run_async", [False, True])
+def test_bots_run_the_same_on_both_engines(bots, run_async):
+    conversations, engines, quiet = bots
+    for name, (fsm_cls, inputs) in conversations.SCRIPTS.items():
+        classes = [engines.variant(fsm_cls, engine) for engine in engines.ENGINES]
+        with quiet():
+            expected, actual = (
+                engines.transcript(cls, inputs, run_async) for cls in classes
+            )
+        assert len(expected) == len(inputs), name
+        for i, (want, got) in enumerate(zip(expected, actual)):
+            assert got == want, f"{name}: turn {i + 1} {inputs[i]!r}"
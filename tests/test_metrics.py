@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+import metrics
+from fsm_graph import compiled_graph
+from metrics import Metrics
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Bot:
+    """Moves zero -> ask -> answer, advancing ``clock`` in every callback."""
+
+    states = ("zero", "ask", "answer")
+    clock = None
+
+    def __init__(self):
+        self.status = None
+        compiled_graph(type(self)).attach(self)
+
+    @classmethod
+    def build_transitions(cls):
+        return [
+            {"trigger": "next", "source": "zero", "dest": "ask", "conditions": "ready"},
+            {"trigger": "next", "source": "ask", "dest": "answer"},
+        ]
+
+    def step(self):
+        compiled_graph(type(self)).trigger(self)
+
+    def ready(self):
+        self.clock.now += 0.125
+        return True
+
+    def on_enter_ask(self):
+        self.clock.now += 0.5
+        self.status = "WAIT_FOR_ME"
+
+    def on_enter_answer(self):
+        pass
+
+    async def on_enter_answer_async(self):
+        self.clock.now += 40
+        self.status = 'say "hi"\n'
+
+
+@pytest.fixture
+def bot(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(metrics.time, "perf_counter", clock)
+    m = Metrics(buckets=(0.25, 1))
+    cls = m.instrument(type("Bot", (Bot,), {"__module__": "cb_fsm", "clock": clock}))
+    return m, cls
+
+
+def test_exposition_after_a_session(bot):
+    m, cls = bot
+    session = cls()
+    session.step()
+    asyncio.run(compiled_graph(cls).trigger_async(session))
+
+    assert m.prometheus() == (
+        "# HELP pulse_fsm_callback_seconds Time spent in FSM state callbacks "
+        "and guards.\n"
+        "# TYPE pulse_fsm_callback_seconds histogram\n"
+        + histogram("answer", "on_enter_answer_async", "enter", (0, 0, 1), "40.0")
+        + histogram("ask", "on_enter_ask", "enter", (0, 1, 1), "0.5")
+        + histogram("zero", "ready", "guard", (1, 1, 1), "0.125")
+        + "# HELP pulse_fsm_status_total Session status after entering a state.\n"
+        "# TYPE pulse_fsm_status_total counter\n"
+        'pulse_fsm_status_total{bot="cb_fsm",state="answer",'
+        'status="say \\"hi\\"\\n"} 1\n'
+        'pulse_fsm_status_total{bot="cb_fsm",state="ask",status="WAIT_FOR_ME"} 1\n'
+    )
+
+
+def histogram(state, callback, kind, buckets, total):
+    labels = f'bot="cb_fsm",state="{state}",callback="{callback}",kind="{kind}"'
+    lines = [
+        f'pulse_fsm_callback_seconds_bucket{{{labels},le="{le}"}} {n}\n'
+        for le, n in zip(("0.25", "1.0", "+Inf"), buckets)
+    ]
+    lines.append(f"pulse_fsm_callback_seconds_sum{{{labels}}} {total}\n")
+    lines.append(f"pulse_fsm_callback_seconds_count{{{labels}}} {buckets[-1]}\n")
+    return "".join(lines)
+
+
+def test_buckets_are_cumulative_and_reset_keeps_the_series(bot):
+    m, cls = bot
+    for _ in range(3):
+        cls().step()
+    lines = m.prometheus().splitlines()
+    guard = [line for line in lines if 'callback="ready"' in line]
+    assert [line.rsplit(" ", 1)[1] for line in guard] == ["3", "3", "3", "0.375", "3"]
+
+    m.reset()
+    lines = m.prometheus().splitlines()
+    guard = [line for line in lines if 'callback="ready"' in line]
+    assert [line.rsplit(" ", 1)[1] for line in guard] == ["0", "0", "0", "0.0", "0"]
+    assert not any(line.startswith("pulse_fsm_status_total{") for line in lines)
+
+
+def test_instrumenting_twice_counts_once(bot):
+    m, cls = bot
+    m.instrument(cls)
+    cls().step()
+    assert 'callback="ready",kind="guard"} 1\n' in m.prometheus()
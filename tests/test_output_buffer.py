@@ -0,0 +1,128 @@
+import asyncio
+import threading
+
+import pytest
+
+from output_buffer import OutputBuffer, OutputRelay
+
+
+def test_buffer_hands_over_the_turn_in_order():
+    buffer = OutputBuffer()
+    batches = []
+    for output in ("a", "b", "c"):
+        buffer(output)
+    assert len(buffer) == 3
+    assert buffer.flush(lambda outputs: batches.append(outputs) or "sent") == "sent"
+    assert batches == [["a", "b", "c"]]
+    assert len(buffer) == 0
+
+
+def test_buffer_sends_nothing_for_a_silent_turn():
+    batches = []
+    assert OutputBuffer().flush(batches.append) is None
+    assert batches == []
+
+
+def test_relay_delivers_on_the_loop_in_order():
+    delivered = []
+
+    async def cb(output):
+        await asyncio.sleep(0)
+        delivered.append((output, threading.get_ident()))
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        relay = OutputRelay(cb, loop)
+        relay("first")
+
+        def state():
+            # a blocking state sends from an executor thread
+            relay("second")
+            relay("third")
+
+        await loop.run_in_executor(None, state)
+        relay("fourth")
+        await relay.flush()
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(main())
+    outputs = [output for output, _ in delivered]
+    assert outputs == ["first", "second", "third", "fourth"]
+    assert {thread for _, thread in delivered} == {loop_thread}
+
+
+def test_relay_close_drops_undelivered_outputs():
+    delivered = []
+
+    async def main():
+        relay = OutputRelay(delivered.append, asyncio.get_running_loop())
+        relay("lost")
+        relay.close()
+        await relay.flush()
+
+    asyncio.run(main())
+    assert delivered == []
+
+
+def test_relay_flush_raises_a_failed_cb():
+    def cb(output):
+        raise RuntimeError(output)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        relay = OutputRelay(cb, loop)
+        await loop.run_in_executor(None, relay, "boom")
+        await asyncio.sleep(0)
+        with pytest.raises(RuntimeError, match="boom"):
+            await relay.flush()
+        relay.close()
+
+    asyncio.run(main())
+
+
+class Turn:
+    """Stands in for a bot: its second state sends an output and then fails."""
+
+    def __init__(self, status_cls):
+        self.state = "zero"
+        self.status = status_cls.MOVE_FORWARD
+        self.cb = None
+        self.batches = []
+        self.batch_cb = self.batches.append
+        self._graph = self
+
+    def next(self):
+        if self.state == "zero":
+            self.state = "ask"
+            self.cb("question")
+        else:
+            self.cb("half an answer")
+            raise RuntimeError("llm down")
+
+    async def trigger_async(self, model):
+        self.next()
+
+
+@pytest.fixture(scope="module")
+def fsm():
+    pytest.importorskip("lib.data_models")
+    import cb_fsm
+
+    return cb_fsm
+
+
+def test_turn_flushes_its_outputs_when_a_state_fails(fsm):
+    turn = Turn(fsm.Status)
+    with pytest.raises(RuntimeError, match="llm down"):
+        fsm.FSM.process_input_or_callback(turn, "hi")
+    assert turn.batches == [["question", "half an answer"]]
+    assert turn.cb is None
+
+
+def test_async_turn_flushes_delivered_outputs_when_a_state_fails(fsm):
+    turn = Turn(fsm.Status)
+    with pytest.raises(RuntimeError, match="llm down"):
+        asyncio.run(fsm.FSM.process_input_or_callback_async(turn, "hi"))
+    # the failed step's own output never reached the relay's cb
+    assert turn.batches == [["question"]]
+    assert turn.cb is None
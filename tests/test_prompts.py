@@ -0,0 +1,105 @@
+import sys
+import types
+
+import pytest
+
+import deps
+from chat_history import ChatHistory
+from prompts import MIN_CACHEABLE_TOKENS, AnswerPrompt
+from session_state import SessionVariables
+
+# about the length of the bots' answer prompts
+INSTRUCTIONS = (
+    "You are a legal expert on Indian Laws. Answer the user's query based on "
+    "the [Knowledge] provided below. Keep the following in mind:\n"
+) + "  Base your answer solely on the information found in [Knowledge].\n" * 28
+KNOWLEDGE = "Section 138 of the Negotiable Instruments Act covers dishonour. " * 30
+ANSWER = (
+    "According to the Negotiable Instruments Act, a bounced cheque is an "
+    "offence. The payee must send a legal notice within thirty days. "
+) * 5
+
+
+class Variables(SessionVariables):
+    __slots__ = ("history", "history_summary")
+
+
+@pytest.fixture(autouse=True)
+def llm(monkeypatch):
+    module = types.SimpleNamespace(
+        sm=lambda content: {"role": "system", "content": content},
+        um=lambda content: {"role": "user", "content": content},
+    )
+    monkeypatch.setitem(sys.modules, "llm", module)
+    monkeypatch.setattr(deps, "_env_loaded", True)
+
+
+def answer_turn(prompt, window, variables, query):
+    prompt.messages(KNOWLEDGE, window.render(variables), query, variables.cache)
+    window.add(variables, query, ANSWER)
+
+
+def test_instructions_alone_are_below_the_threshold():
+    prompt = AnswerPrompt("answer", INSTRUCTIONS)
+    assert 400 < prompt.prefix_tokens < MIN_CACHEABLE_TOKENS
+    prompt.messages(KNOWLEDGE, "", "what is a cheque bounce")
+    assert prompt.stats()["cacheable_tokens"] == 0
+
+
+def test_second_turn_of_a_restored_session_shares_its_history():
+    prompt = AnswerPrompt("answer", INSTRUCTIONS)
+    window = ChatHistory()
+    earlier = Variables()
+    for i in range(4):
+        window.add(earlier, f"question {i}", ANSWER)
+    # spilled and restored: nothing of the last prompt is left in the cache
+    variables = Variables(earlier.to_dict())
+
+    history = window.render(variables)
+    answer_turn(prompt, window, variables, "what is a cheque bounce")
+    assert prompt.stats()["cacheable_tokens"] == 0
+    answer_turn(prompt, window, variables, "how do I send a notice")
+
+    # instructions and the history the first turn sent are sent again
+    shared = prompt.prefix_tokens + prompt.count_tokens(f"[Chat History]\n{history}")
+    assert shared >= MIN_CACHEABLE_TOKENS
+    assert prompt.stats()["cacheable_tokens"] == shared
+    assert prompt.stats()["calls"] == 2
+
+
+def test_history_grows_into_the_cacheable_prefix():
+    prompt = AnswerPrompt("answer", INSTRUCTIONS)
+    window = ChatHistory()
+    variables = Variables()
+    cacheable = []
+    for i in range(6):
+        answer_turn(prompt, window, variables, f"question {i}")
+        cacheable.append(prompt.stats()["cacheable_tokens"])
+    # the first calls share the instructions and too little history
+    assert cacheable[:2] == [0, 0]
+    assert cacheable[-1] > 0
+    assert cacheable == sorted(cacheable)
+
+
+def test_trimmed_history_shares_only_the_common_start():
+    prompt = AnswerPrompt("answer", INSTRUCTIONS)
+    cache = {}
+    prompt.messages(KNOWLEDGE, "User: hi\nBot: hello", "q1", cache)
+    prompt.messages(KNOWLEDGE, "User: bye", "q2", cache)
+    stats = prompt.stats()
+    assert stats["cacheable_tokens"] == 0
+    shared = prompt._shared_tokens(
+        [INSTRUCTIONS.strip(), "[Chat History]\nUser: hi", "[Knowledge]"],
+        [INSTRUCTIONS.strip(), "[Chat History]\nUser: bye", "[Knowledge]"],
+    )
+    assert shared == prompt.prefix_tokens + prompt.count_tokens(
+        "[Chat History]\nUser: "
+    )
+
+
+def test_another_prompt_shares_only_its_own_instructions():
+    prompt = AnswerPrompt("answer", INSTRUCTIONS)
+    other = AnswerPrompt("other", INSTRUCTIONS + "Answer in Hindi.\n")
+    assert prompt._shared_tokens(
+        [other.instructions, "[Knowledge]"], [prompt.instructions, "[Knowledge]"]
+    ) == prompt.prefix_tokens
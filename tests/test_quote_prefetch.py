@@ -0,0 +1,155 @@
+import asyncio
+import threading
+import time
+
+import beckn
+from quote_prefetch import QuotePrefetcher
+
+PROVIDERS = [{"bpp_id": "bpp", "id": str(i)} for i in range(3)]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Response:
+    status_code = 200
+
+    def __init__(self, price):
+        self.data = {
+            "responses": [
+                {
+                    "message": {
+                        "order": {
+                            "quote": {
+                                "price": {"value": price},
+                                "breakup": [
+                                    {"price": {"value": "100"}},
+                                    {"price": {"value": "50"}},
+                                ],
+                            }
+                        }
+                    }
+                }
+            ]
+        }
+
+    def json(self):
+        return self.data
+
+
+class Client:
+    """Quotes each provider its id as the price; fails while ``down``."""
+
+    def __init__(self, down=False, gate=None):
+        self.calls = []
+        self.down = down
+        self.gate = gate
+        self._lock = threading.Lock()
+
+    def post(self, action, data):
+        with self._lock:
+            self.calls.append((action, data["provider"]))
+        if self.gate is not None:
+            self.gate.wait()
+        if self.down:
+            return beckn.FailedResponse(503, "down")
+        return Response(data["provider"])
+
+    async def post_async(self, action, data):
+        return self.post(action, data)
+
+
+def requests():
+    return [(p, {"provider": p["id"]}) for p in PROVIDERS]
+
+
+def quote(price):
+    return {"quote": price, "base_fee": "100", "fee_per_hearing": "50"}
+
+
+def test_prefetched_quotes_are_hits():
+    prefetcher = QuotePrefetcher(clock=Clock())
+    client = Client()
+    prefetcher.prefetch(requests(), client)
+    assert prefetcher.get(PROVIDERS[1]) == quote("1")
+    assert prefetcher.get({"bpp_id": "bpp", "id": "9"}) is None
+    # listed again within the ttl: nothing is fetched twice
+    prefetcher.prefetch(requests(), client)
+    assert prefetcher.get(PROVIDERS[2]) == quote("2")
+    assert sorted(client.calls) == [("select", "0"), ("select", "1"), ("select", "2")]
+    assert prefetcher.stats() == {"hits": 2, "misses": 1, "fetches": 3, "errors": 0}
+
+
+def test_quotes_expire():
+    clock = Clock()
+    prefetcher = QuotePrefetcher(ttl=60, clock=clock)
+    client = Client()
+    prefetcher.prefetch(requests(), client)
+    prefetcher.get(PROVIDERS[0])
+    clock.now = 60
+    assert prefetcher.get(PROVIDERS[0]) is None
+    prefetcher.prefetch(requests(), client)
+    assert prefetcher.get(PROVIDERS[0]) == quote("0")
+    assert len(client.calls) == 6
+
+
+def test_failed_prefetch_is_forgotten_and_retried():
+    prefetcher = QuotePrefetcher(clock=Clock())
+    client = Client(down=True)
+    prefetcher.prefetch(requests(), client)
+    assert prefetcher.get(PROVIDERS[0]) is None
+    # the entries go when the jobs end, on the pool's threads
+    for _ in range(100):
+        if not prefetcher._entries:
+            break
+        time.sleep(0.01)
+    assert not prefetcher._entries
+    client.down = False
+    prefetcher.prefetch(requests(), client)
+    assert prefetcher.get(PROVIDERS[0]) == quote("0")
+    assert len(client.calls) == 6
+    assert prefetcher.stats()["errors"] == 3
+
+
+def test_get_gives_up_after_wait():
+    gate = threading.Event()
+    prefetcher = QuotePrefetcher(wait=0.01, clock=Clock())
+    prefetcher.prefetch(requests()[:1], Client(gate=gate))
+    assert prefetcher.get(PROVIDERS[0]) is None
+    gate.set()
+    assert prefetcher.get(PROVIDERS[0]) == quote("0")
+
+
+def test_async_prefetch():
+    prefetcher = QuotePrefetcher(clock=Clock())
+    client = Client()
+
+    async def main():
+        prefetcher.prefetch(requests(), client)
+        return [await prefetcher.get_async(p) for p in PROVIDERS]
+
+    assert asyncio.run(main()) == [quote("0"), quote("1"), quote("2")]
+    # a task of a loop that has finished is read without blocking
+    assert prefetcher.get(PROVIDERS[0]) == quote("0")
+
+
+def test_concurrent_prefetches_share_one_pool():
+    prefetcher = QuotePrefetcher(clock=Clock())
+    client = Client()
+    executor = prefetcher._executor
+    threads = [
+        threading.Thread(target=prefetcher.prefetch, args=(requests(), client))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert prefetcher._executor is executor
+    assert [prefetcher.get(p) for p in PROVIDERS] == [quote(str(i)) for i in range(3)]
+    assert len(client.calls) == 3
@@ -0,0 +1,170 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import beckn
+from search_cache import SearchCache, SearchResult, parse_duration
+
+REQUEST = {"context": {"transaction_id": ""}, "message": {"intent": {"odr": True}}}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Response:
+    status_code = 200
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+class Gateway:
+    """Answers /search with one provider per call, numbered by call."""
+
+    def __init__(self, delay=0, responses=True):
+        self.calls = 0
+        self.delay = delay
+        self.responses = responses
+
+    def fetch(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return Response({"responses": [self.calls] if self.responses else []})
+
+    async def fetch_async(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return Response({"responses": [self.calls] if self.responses else []})
+
+
+def new_cache(clock, **kwargs):
+    return SearchCache(parse=lambda data: data["responses"], clock=clock, **kwargs)
+
+
+def test_parse_duration():
+    assert parse_duration(beckn.TTL) > 0
+    assert parse_duration("P1DT2H3M4.5S") == 86400 + 7200 + 180 + 4.5
+    with pytest.raises(ValueError):
+        parse_duration("PT")
+
+
+def test_key_ignores_the_context():
+    other = dict(REQUEST, context={"transaction_id": "abc"})
+    assert SearchCache.key(REQUEST) == SearchCache.key(other)
+
+
+def test_hit_then_stale_refresh_then_miss():
+    clock = Clock()
+    cache = new_cache(clock, ttl=10, stale_for=5)
+    gateway = Gateway()
+    first = cache.get(REQUEST, gateway.fetch)
+    assert isinstance(first, SearchResult) and first.providers == (1,)
+    clock.now = 9
+    assert cache.get(REQUEST, gateway.fetch) is first
+    assert gateway.calls == 1
+
+    # stale: served as is while one background call refreshes it
+    clock.now = 12
+    assert cache.get(REQUEST, gateway.fetch) is first
+    for _ in range(100):
+        if cache.refreshes:
+            break
+        time.sleep(0.01)
+    assert gateway.calls == 2
+    assert cache.get(REQUEST, gateway.fetch).providers == (2,)
+
+    clock.now = 100
+    assert cache.get(REQUEST, gateway.fetch).providers == (3,)
+    assert cache.stats() == {
+        "hits": 2,
+        "stale_hits": 1,
+        "misses": 2,
+        "refreshes": 1,
+        "errors": 0,
+    }
+
+
+def test_failures_and_empty_searches_are_not_cached():
+    cache = new_cache(Clock())
+    failed = beckn.FailedResponse(503, "down")
+    assert cache.get(REQUEST, lambda: failed) is failed
+    gateway = Gateway(responses=False)
+    assert not cache.get(REQUEST, gateway.fetch).responded
+    assert not cache.get(REQUEST, gateway.fetch).responded
+    assert gateway.calls == 2
+
+
+def test_invalidate():
+    cache = new_cache(Clock())
+    gateway = Gateway()
+    cache.get(REQUEST, gateway.fetch)
+    cache.invalidate(REQUEST)
+    cache.get(REQUEST, gateway.fetch)
+    cache.invalidate()
+    assert cache.get(REQUEST, gateway.fetch).providers == (3,)
+
+
+def run_threads(target, n=8):
+    results = [None] * n
+
+    def run(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_misses_share_one_call():
+    cache = new_cache(Clock())
+    gateway = Gateway(delay=0.05)
+    results = run_threads(lambda: cache.get(REQUEST, gateway.fetch))
+    assert gateway.calls == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_concurrent_misses_share_one_failure():
+    cache = new_cache(Clock())
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        raise ConnectionError("gateway down")
+
+    results = run_threads(lambda: cache.get(REQUEST, fetch))
+    assert len(calls) == 1
+    assert all(isinstance(result, ConnectionError) for result in results)
+    # the failure is not kept: the next miss calls the gateway again
+    gateway = Gateway()
+    assert cache.get(REQUEST, gateway.fetch).providers == (1,)
+
+
+def test_async_misses_share_one_call():
+    cache = new_cache(Clock())
+    gateway = Gateway(delay=0.05)
+
+    async def main():
+        return await asyncio.gather(
+            *(cache.get_async(REQUEST, gateway.fetch_async) for _ in range(8))
+        )
+
+    results = asyncio.run(main())
+    assert gateway.calls == 1
+    assert all(result is results[0] for result in results)
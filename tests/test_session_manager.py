@@ -0,0 +1,246 @@
+import asyncio
+import threading
+
+import pytest
+
+from fsm_graph import compiled_graph
+from session_manager import MemoryStore, SessionManager
+from session_state import SessionVariables
+from snapshot import snapshot_codec
+
+
+class Variables(SessionVariables):
+    __slots__ = ("count", "inputs")
+
+
+class Counter:
+    """Counts its turns and sends the count back."""
+
+    states = ("zero", "counting")
+    variables_cls = Variables
+
+    def __init__(self, cb):
+        self.cb = cb
+        self.batch_cb = None
+        self.variables = Variables()
+        compiled_graph(Counter).attach(self)
+
+    @classmethod
+    def build_transitions(cls):
+        return [
+            {"trigger": "next", "source": "zero", "dest": "counting"},
+            {"trigger": "next", "source": "counting", "dest": "counting"},
+        ]
+
+    def process_input_or_callback(self, input):
+        self.input = input
+        compiled_graph(Counter).trigger(self)
+
+    async def process_input_or_callback_async(self, input):
+        self.input = input
+        await compiled_graph(Counter).trigger_async(self)
+
+    def on_enter_counting(self):
+        self.variables["count"] = self.variables.get("count", 0) + 1
+        self.variables.extend("inputs", [self.input])
+        self.cb(self.variables["count"])
+
+    def _save_snapshot(self, compress=False):
+        return snapshot_codec(Counter).encode(self.state, self.variables, compress)
+
+    def _restore_snapshot(self, snapshot):
+        self.state, self.variables = snapshot_codec(Counter).decode(snapshot)
+
+
+def turns(user_ids, rounds):
+    return [(user_id, f"{user_id}:{i}") for i in range(rounds) for user_id in user_ids]
+
+
+def check(manager, user_ids, rounds):
+    for user_id in user_ids:
+        fsm = manager.process(user_id, "check")
+        assert fsm.state == "counting"
+        assert fsm.variables["count"] == rounds + 1
+        assert fsm.variables["inputs"] == [f"{user_id}:{i}" for i in range(rounds)] + [
+            "check"
+        ]
+
+
+def test_sessions_beyond_max_sessions_are_spilled_and_restored():
+    store = MemoryStore()
+    manager = SessionManager(Counter, store, max_sessions=2)
+    users = ["a", "b", "c", "d", "e"]
+    sent = []
+    for user_id, text in turns(users, 3):
+        manager.process(user_id, text, cb=sent.append)
+    assert len(manager) == 2
+    assert list(manager._sessions) == ["d", "e"]
+    assert sorted(store._snapshots) == ["a", "b", "c", "d", "e"]
+    stats = manager.stats()
+    assert stats["creates"] == 5
+    assert stats["restores"] == 10
+    assert stats["evictions"] == 13
+    assert sent == [1] * 5 + [2] * 5 + [3] * 5
+    check(manager, users, 3)
+
+
+def test_resident_sessions_are_not_restored():
+    manager = SessionManager(Counter, max_sessions=10)
+    first = manager.process("a", "hi")
+    assert manager.process("a", "again") is first
+    assert manager.stats()["hits"] == 1
+    assert len(manager.store) == 0
+
+
+def test_max_bytes_evicts_least_recently_used():
+    manager = SessionManager(Counter, max_bytes=1)
+    for user_id, text in turns(["a", "b"], 2):
+        manager.process(user_id, text)
+    assert len(manager) == 0
+    check(manager, ["a", "b"], 2)
+
+
+def test_async_sessions_are_spilled_and_restored():
+    store = MemoryStore()
+    manager = SessionManager(Counter, store, max_sessions=3)
+    users = [f"user{i}" for i in range(8)]
+
+    async def user(user_id):
+        for i in range(4):
+            await manager.process_async(user_id, f"{user_id}:{i}")
+            await asyncio.sleep(0)
+
+    async def main():
+        await asyncio.gather(*(user(user_id) for user_id in users))
+
+    asyncio.run(main())
+    assert len(manager) <= 3
+    assert manager.stats()["restores"] > 0
+    check(manager, users, 4)
+
+
+def test_turns_of_one_user_are_serialized():
+    manager = SessionManager(Counter, max_sessions=1)
+
+    def run(user_id):
+        for i in range(50):
+            manager.process(user_id, f"{user_id}:{i}")
+
+    threads = [threading.Thread(target=run, args=(u,)) for u in "ab" for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for user_id in "ab":
+        assert manager.process(user_id, "check").variables["count"] == 101
+
+
+class SlowStore(MemoryStore):
+    """Holds the first ``put`` until ``release`` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.writing = threading.Event()
+        self.release = threading.Event()
+
+    def put(self, key, snapshot):
+        if not self.writing.is_set():
+            self.writing.set()
+            self.release.wait(5)
+        super().put(key, snapshot)
+
+
+def test_returning_user_is_served_while_their_snapshot_is_written():
+    store = SlowStore()
+    manager = SessionManager(Counter, store, max_sessions=1)
+    manager.process("a", "a:0")
+    # b's turn evicts a, and the write of a's snapshot hangs
+    spill = threading.Thread(target=manager.process, args=("b", "b:0"))
+    spill.start()
+    assert store.writing.wait(5)
+    assert store.get("a") is None
+    assert "a" in manager._spilling
+
+    # a comes back before the store has it: restored from the pending snapshot
+    sent = []
+    answered = threading.Event()
+
+    def cb(output):
+        sent.append(output)
+        answered.set()
+
+    # a's turn then waits to write b, as writes to the store go one at a time
+    turn = threading.Thread(target=manager.process, args=("a", "a:1", cb))
+    turn.start()
+    assert answered.wait(5)
+    assert sent == [2]
+    store.release.set()
+    spill.join()
+    turn.join()
+    manager.flush()
+    assert not manager._spilling
+    check(manager, ["a"], 2)
+    check(manager, ["b"], 1)
+
+
+def test_flush_writes_resident_sessions():
+    store = MemoryStore()
+    manager = SessionManager(Counter, store)
+    for user_id, text in turns(["a", "b"], 2):
+        manager.process(user_id, text)
+    assert len(store) == 0
+    manager.flush()
+    assert len(manager) == 2
+    restarted = SessionManager(Counter, store)
+    check(restarted, ["a", "b"], 2)
+    assert restarted.stats()["restores"] == 2
+
+
+def test_sqlite_store_backs_the_manager(tmp_path):
+    from sqlite_store import SQLiteStore
+
+    path = str(tmp_path / "sessions.db")
+    with SQLiteStore(path) as store:
+        manager = SessionManager(Counter, store, max_sessions=1, compress=True)
+        for user_id, text in turns(["a", "b", "c"], 2):
+            manager.process(user_id, text)
+        manager.flush()
+    with SQLiteStore(path) as store:
+        check(SessionManager(Counter, store), ["a", "b", "c"], 2)
+
+
+def test_unreadable_snapshot_starts_the_session_over(capsys):
+    store = MemoryStore()
+    store.put("a", b"PS\x02garbage")
+    manager = SessionManager(Counter, store)
+    fsm = manager.process("a", "hi")
+    assert fsm.variables["count"] == 1
+    assert manager.stats()["creates"] == 1
+    assert manager.stats()["restores"] == 0
+    assert "could not restore session a" in capsys.readouterr().out
+
+
+def test_discard_forgets_resident_and_stored_sessions():
+    store = MemoryStore()
+    manager = SessionManager(Counter, store, max_sessions=1)
+    manager.process("a", "hi")
+    manager.process("b", "hi")
+    manager.discard("a")
+    manager.discard("b")
+    assert len(manager) == 0 and len(store) == 0
+    assert manager.process("a", "again").variables["count"] == 1
+
+
+def test_failed_turn_still_releases_the_session():
+    manager = SessionManager(Counter, max_sessions=1)
+
+    def fail(output):
+        raise RuntimeError("host down")
+
+    with pytest.raises(RuntimeError):
+        manager.process("a", "hi", cb=fail)
+    manager.process("b", "hi")
+    assert list(manager._sessions) == ["b"]
+    fsm = manager.process("a", "again")
+    assert fsm.cb is None
+    assert fsm.variables["count"] == 2
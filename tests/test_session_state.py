@@ -0,0 +1,62 @@
+from session_state import SessionVariables, apply_patch
+
+
+class Variables(SessionVariables):
+    __slots__ = ("query", "history", "language")
+
+
+def test_mapping_interface():
+    variables = Variables({"query": "hi", "legacy": 1})
+    assert variables["query"] == "hi"
+    assert variables.get("language") is None
+    assert "language" not in variables and "legacy" in variables
+    variables["language"] = "en"
+    assert list(variables) == ["query", "language", "legacy"]
+    assert variables.to_dict() == {"query": "hi", "language": "en", "legacy": 1}
+    del variables["legacy"]
+    assert len(variables) == 2
+
+
+def test_values_passed_to_init_are_clean():
+    assert Variables({"query": "hi"}).take_patch() == {
+        "set": {},
+        "unset": [],
+        "append": {},
+    }
+
+
+def test_patch_records_writes_removals_and_appends():
+    variables = Variables({"query": "hi", "history": [1], "legacy": 1})
+    variables["query"] = "what is udyam"
+    del variables["legacy"]
+    variables.extend("history", [2, 3])
+    assert variables.take_patch() == {
+        "set": {"query": "what is udyam"},
+        "unset": ["legacy"],
+        "append": {"history": [2, 3]},
+    }
+    assert variables.take_patch() == {"set": {}, "unset": [], "append": {}}
+
+
+def test_extend_of_a_written_key_is_a_write():
+    variables = Variables()
+    variables.extend("history", [1])
+    variables.extend("history", [2])
+    assert variables.take_patch()["set"] == {"history": [1, 2]}
+
+
+def test_apply_patch_replays_a_turn():
+    saved = Variables({"query": "hi", "history": [1]})
+    variables = Variables({"query": "hi", "history": [1]})
+    variables["language"] = "hi"
+    variables.extend("history", [2])
+    del variables["query"]
+    apply_patch(saved, variables.take_patch())
+    assert saved.to_dict() == variables.to_dict()
+
+
+def test_cache_is_not_a_variable():
+    variables = Variables({"query": "hi"})
+    variables.cache["rendered"] = "User: hi"
+    assert variables.to_dict() == {"query": "hi"}
+    assert variables.take_patch()["set"] == {}
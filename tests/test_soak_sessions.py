@@ -0,0 +1,22 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def soak_sessions():
+    # the bots need lib.data_models from the host application
+    pytest.importorskip("lib.data_models")
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+    return importlib.import_module("soak_sessions")
+
+
+@pytest.mark.parametrize("name", ["cb_fsm", "venture_fsm"])
+def test_sessions_stay_flat(soak_sessions, name):
+    # benchmarks/soak_sessions.py at a twentieth of its default size
+    module = importlib.import_module(name)
+    states = module.FSM.states
+    assert soak_sessions.check(module, 5_000, 1_000) == []
+    assert module.FSM.states is states
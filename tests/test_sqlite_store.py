@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+
+from sqlite_store import SQLiteStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "sessions.db")
+
+
+def test_put_get_delete(path):
+    with SQLiteStore(path) as store:
+        store.put("u1", b"one")
+        store.put(2, b"two")
+        assert store.get("u1") == b"one"
+        assert store.get("2") == b"two"
+        store.delete("u1")
+        assert store.get("u1") is None
+        assert store.get("missing") is None
+        assert len(store) == 1
+
+
+def test_snapshots_outlive_the_store(path):
+    with SQLiteStore(path) as store:
+        store.put("u1", b"one")
+    with SQLiteStore(path) as store:
+        assert store.get("u1") == b"one"
+
+
+def test_writes_are_committed_in_groups(path):
+    with SQLiteStore(path, flush_window=0.05, durable=False) as store:
+        for i in range(100):
+            store.put(f"u{i}", b"x")
+        # queued writes are visible before they are committed
+        assert store.get("u99") == b"x"
+        store.flush()
+        assert store.stats()["batches"] < 5
+        assert store.stats()["writes"] == 100
+        assert len(store) == 100
+
+
+def test_durable_writers_share_a_transaction(path):
+    with SQLiteStore(path, flush_window=0.05) as store:
+        threads = [
+            threading.Thread(target=store.put, args=(f"u{i}", b"x")) for i in range(16)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = store.stats()
+        assert stats["writes"] == 16
+        assert stats["batches"] < 16
+
+
+def test_session_written_twice_in_a_batch_is_written_once(path):
+    with SQLiteStore(path, flush_window=0.05, durable=False) as store:
+        store.put("u1", b"old")
+        store.put("u1", b"new")
+        store.flush()
+        assert store.stats()["writes"] == 1
+    with SQLiteStore(path) as store:
+        assert store.get("u1") == b"new"
+
+
+def test_batches_are_capped(path):
+    with SQLiteStore(path, flush_window=10, max_batch=10, durable=False) as store:
+        for i in range(35):
+            store.put(f"u{i}", b"x")
+        store.flush()
+        assert store.stats()["batches"] == 4
+
+
+def test_closed_store_rejects_writes(path):
+    store = SQLiteStore(path)
+    store.close()
+    with pytest.raises(ValueError):
+        store.put("u1", b"one")
@@ -0,0 +1,152 @@
+import json
+
+import pytest
+
+import tracing
+from fsm_graph import compiled_graph
+from tracing import JSONLSink, Tracer
+
+
+class Output:
+    def __init__(self, text, dest=None):
+        self.text = text
+        self.dest = dest
+
+
+class Bot:
+    """Asks the rag service on the first turn and answers on the second."""
+
+    states = ("zero", "ask", "answer")
+
+    def __init__(self, cb):
+        self.cb = cb
+        self.batch_cb = None
+        self.status = None
+        compiled_graph(type(self)).attach(self)
+
+    @classmethod
+    def build_transitions(cls):
+        return [
+            {"trigger": "next", "source": "zero", "dest": "ask"},
+            {"trigger": "next", "source": "ask", "dest": "answer"},
+        ]
+
+    def process_input_or_callback(self, input):
+        self.input = input
+        compiled_graph(type(self)).trigger(self)
+
+    def on_enter_ask(self):
+        with tracing.span("llm", model="test"):
+            pass
+        self.cb(Output(self.input, dest="rag"))
+
+    def on_enter_answer(self):
+        self.cb(Output(self.input))
+
+
+class ListSink:
+    def __init__(self):
+        self.records = []
+        self.flushes = 0
+
+    def write(self, record):
+        self.records.append(record)
+
+    def flush(self):
+        self.flushes += 1
+
+
+def traced_bot(sink):
+    cls = Tracer(sink).instrument(type("Bot", (Bot,), {}))
+    outputs = []
+    return cls(outputs.append), outputs
+
+
+def test_spans_are_parented_within_the_session_trace():
+    sink = ListSink()
+    bot, outputs = traced_bot(sink)
+    bot.process_input_or_callback("what is a cheque bounce")
+    bot.process_input_or_callback('{"chunks": []}')
+
+    assert [o.text for o in outputs] == ["what is a cheque bounce", '{"chunks": []}']
+    spans = {r["name"]: r for r in sink.records if r["name"] != "turn"}
+    first, second = [r for r in sink.records if r["name"] == "turn"]
+    assert {r["trace_id"] for r in sink.records} == {bot.trace_id}
+    assert first["parent_id"] is None and second["parent_id"] is None
+    assert spans["on_enter_ask"]["parent_id"] == first["span_id"]
+    assert spans["llm"]["parent_id"] == spans["on_enter_ask"]["span_id"]
+    assert spans["llm"]["attributes"] == {"model": "test"}
+    assert spans["on_enter_answer"]["parent_id"] == second["span_id"]
+    # the wait for the answer belongs to the turn that asked
+    assert spans["rag"]["parent_id"] == first["span_id"]
+    assert spans["rag"]["attributes"] == {"dest": "rag"}
+    assert second["attributes"]["rag_response_bytes"] == len('{"chunks": []}')
+    assert first["attributes"] == {
+        "bot": Bot.__module__,
+        "state": "zero",
+        "end_state": "ask",
+        "status": None,
+    }
+    # one flush per turn, when its root span ends
+    assert sink.flushes == 2
+    assert bot.cb == outputs.append
+
+
+def test_restored_session_starts_a_new_trace():
+    sink = ListSink()
+    bot, outputs = traced_bot(sink)
+    bot.process_input_or_callback("what is a cheque bounce")
+    restored = type(bot)(outputs.append)
+    restored.state = bot.state
+    restored.process_input_or_callback('{"chunks": []}')
+
+    assert restored.trace_id != bot.trace_id
+    assert "rag" not in {r["name"] for r in sink.records}
+
+
+def test_jsonl_sink_writes_one_span_per_line(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    sink = JSONLSink(str(path))
+    bot, outputs = traced_bot(sink)
+    bot.process_input_or_callback("what is a cheque bounce")
+
+    # flushed at the end of the turn, before the sink is closed
+    lines = path.read_text(encoding="utf-8").splitlines()
+    sink.close()
+    records = [json.loads(line) for line in lines]
+    assert [r["name"] for r in records] == ["llm", "on_enter_ask", "turn"]
+    for record in records:
+        assert set(record) == {
+            "trace_id",
+            "span_id",
+            "parent_id",
+            "name",
+            "start",
+            "duration_ms",
+            "attributes",
+            "error",
+        }
+        assert record["duration_ms"] >= 0
+        assert record["error"] is None
+
+
+def test_failed_callback_records_the_error():
+    sink = ListSink()
+    bot, outputs = traced_bot(sink)
+
+    def fail(output):
+        raise RuntimeError("gateway down")
+
+    bot.cb = fail
+    with pytest.raises(RuntimeError):
+        bot.process_input_or_callback("what is a cheque bounce")
+    errors = {r["name"]: r["error"] for r in sink.records}
+    assert errors["on_enter_ask"] == "RuntimeError: gateway down"
+    assert errors["turn"] == "RuntimeError: gateway down"
+    assert bot.cb is fail
+
+
+def test_span_outside_a_traced_turn_does_nothing():
+    with tracing.span("llm") as span:
+        span.set(tokens=3)
+    tracing.record("beckn", 0.1)
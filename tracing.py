@@ -0,0 +1,303 @@
+import contextvars
+import functools
+import inspect
+import json
+import random
+import threading
+import time
+import uuid
+
+# the span that work in this thread or task belongs to, if it is being traced
+_current = contextvars.ContextVar("pulse_span", default=None)
+
+
+def _new_id():
+    return f"{random.getrandbits(64):016x}"
+
+
+class Span:
+    """One timed piece of a traced turn; also a context manager that runs it."""
+
+    __slots__ = (
+        "tracer",
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start",
+        "duration",
+        "attributes",
+        "error",
+        "_started",
+        "_token",
+    )
+
+    def __init__(self, tracer, name, trace_id, parent_id=None, attributes=None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_id()
+        self.parent_id = parent_id
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration = None
+        self.attributes = attributes if attributes is not None else {}
+        self.error = None
+        self._token = None
+
+    def child(self, name, **attributes):
+        return Span(self.tracer, name, self.trace_id, self.span_id, attributes)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self, duration=None):
+        if duration is None:
+            duration = time.perf_counter() - self._started
+        self.duration = duration
+        self.tracer.export(self)
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.end()
+
+    def as_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": self.duration * 1000,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoSpan:
+    """Stands in for a span outside a traced turn; does nothing."""
+
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name, **attributes):
+    """Return a child span of the current one, or a no-op outside a traced turn.
+
+    Use it as ``with tracing.span("llm") as s: ...``; the span is exported
+    when the block ends.
+    """
+    parent = _current.get()
+    if parent is None:
+        return _NO_SPAN
+    return parent.child(name, **attributes)
+
+
+def record(name, seconds, **attributes):
+    """Export a span of ``seconds`` that ends now, under the current span."""
+    parent = _current.get()
+    if parent is not None:
+        child = parent.child(name, **attributes)
+        child.start -= seconds
+        child.end(seconds)
+
+
+class JSONLSink:
+    """Appends one JSON object per span to ``path``.
+
+    Spans are written as they end and the file is flushed after each turn,
+    so a trace can be read while the bot runs.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class Tracer:
+    """Span tracing of FSM turns, exported to ``sink``.
+
+    ``instrument`` wraps ``process_input_or_callback`` (and its async variant)
+    of an FSM class in a ``turn`` span, and every ``on_enter_*``/``on_exit_*``
+    callback in a span of its own. Beckn calls and ``llm`` calls made during
+    the turn add their spans through ``span``/``record``, and the time between
+    a turn that sent a ``rag`` output and the turn that got the answer back is
+    exported as a ``rag`` span.
+
+    Every span of a session carries its trace id, taken from the session's
+    ``generate_reference_id`` when it has one, or a random uuid. The id and
+    the pending ``rag`` span are plain attributes of the session object, not
+    part of its snapshot: a session that ``SessionManager`` spills and
+    restores starts a new trace, and if that happens between a rag request
+    and its answer, no ``rag`` span is exported for it. ``sink`` is any
+    object with ``write(record)`` and ``flush()``, such as ``JSONLSink``.
+    """
+
+    def __init__(self, sink):
+        self.sink = sink
+
+    def export(self, span):
+        self.sink.write(span.as_dict())
+        if span.parent_id is None:
+            self.sink.flush()
+
+    def instrument(self, fsm_cls):
+        """Wrap the turns and state callbacks of ``fsm_cls`` in place and return it.
+
+        Instrumenting a class twice does nothing.
+        """
+        from fsm_graph import compiled_graph
+
+        graph = compiled_graph(fsm_cls)
+        bot = fsm_cls.__module__
+        names = ["process_input_or_callback", "process_input_or_callback_async"]
+        for state in graph.states:
+            for kind in ("enter", "exit"):
+                names.append(f"on_{kind}_{state}")
+                names.append(f"on_{kind}_{state}_async")
+        for name in names:
+            func = getattr(fsm_cls, name, None)
+            if not callable(func) or getattr(func, "traced_by", None) is self:
+                continue
+            if name.startswith("process_input_or_callback"):
+                wrapper = self._wrap_turn(func, bot)
+            else:
+                wrapper = self._wrap_callback(func, name)
+            setattr(fsm_cls, name, wrapper)
+        graph.reload_callbacks()
+        return fsm_cls
+
+    def trace_id(self, model):
+        trace_id = getattr(model, "trace_id", None)
+        if trace_id is None:
+            generate = getattr(model, "generate_reference_id", None)
+            trace_id = generate() if generate is not None else uuid.uuid4().hex
+            model.trace_id = trace_id
+        return trace_id
+
+    def _start_turn(self, model, bot, input):
+        turn = Span(
+            self,
+            "turn",
+            self.trace_id(model),
+            attributes={"bot": bot, "state": model.state},
+        )
+        pending = getattr(model, "_rag_sent", None)
+        if pending is not None:
+            # the answer to the last turn's rag request is this turn's input
+            model._rag_sent = None
+            parent_id, dest, start, started = pending
+            rag = Span(self, "rag", turn.trace_id, parent_id, {"dest": dest})
+            rag.start = start
+            rag.end(time.perf_counter() - started)
+            turn.set(rag_response_bytes=len(str(input)))
+
+        def watch(output):
+            dest = getattr(output, "dest", None)
+            if isinstance(dest, str) and dest.startswith("rag"):
+                model._rag_sent = (turn.span_id, dest, time.time(), time.perf_counter())
+
+        cb, batch_cb = model.cb, model.batch_cb
+        if cb is not None:
+
+            def traced_cb(output):
+                watch(output)
+                return cb(output)
+
+            model.cb = traced_cb
+        if batch_cb is not None:
+
+            def traced_batch_cb(outputs):
+                for output in outputs:
+                    watch(output)
+                return batch_cb(outputs)
+
+            model.batch_cb = traced_batch_cb
+        return turn, (cb, batch_cb)
+
+    @staticmethod
+    def _end_turn(model, turn, callbacks):
+        model.cb, model.batch_cb = callbacks
+        status = getattr(model, "status", None)
+        turn.set(end_state=model.state, status=getattr(status, "name", status))
+
+    def _wrap_turn(self, func, bot):
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def wrapper(model, input):
+                turn, callbacks = self._start_turn(model, bot, input)
+                with turn:
+                    try:
+                        return await func(model, input)
+                    finally:
+                        self._end_turn(model, turn, callbacks)
+
+        else:
+
+            @functools.wraps(func)
+            def wrapper(model, input):
+                turn, callbacks = self._start_turn(model, bot, input)
+                with turn:
+                    try:
+                        return func(model, input)
+                    finally:
+                        self._end_turn(model, turn, callbacks)
+
+        wrapper.traced_by = self
+        return wrapper
+
+    def _wrap_callback(self, func, name):
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def wrapper(model, *args):
+                parent = _current.get()
+                if parent is None:
+                    return await func(model, *args)
+                with parent.child(name, state=model.state):
+                    return await func(model, *args)
+
+        else:
+
+            @functools.wraps(func)
+            def wrapper(model, *args):
+                parent = _current.get()
+                if parent is None:
+                    return func(model, *args)
+                with parent.child(name, state=model.state):
+                    return func(model, *args)
+
+        wrapper.traced_by = self
+        return wrapper
@@ -1,31 +1,99 @@
-from datetime import datetime
+import inspect
 import json
 import re
-from dotenv import load_dotenv
 import uuid
 from enum import Enum
-import requests
 import logging
 
-from transitions import Machine
 import os
 import sys
-import pandas as pd
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 sys.path.append("..")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from lib.data_models import MessageType, FSMOutput, OptionsListType, UploadFile
-from llm import llm, sm, um
+import beckn
+import catalog
+import deps
+import search_cache
+from answer_cache import AnswerCache
+from chat_history import ChatHistory
+from deps import llm, llm_stream
+from fsm_graph import compiled_graph, discriminator, user_input, variable
+from output_buffer import OutputBuffer, OutputRelay
+from prompts import AnswerPrompt
+from session_state import SessionVariables
+from snapshot import snapshot_codec
+
+
+def __getattr__(name):
+    # magic_string is read on first use, so importing the bot doesn't load .env-dev
+    if name == "magic_string":
+        return deps.magic_string()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# enum
-load_dotenv("../.env-dev")
-magic_string = os.getenv("JB_MAGIC_STRING")
 
 logging.basicConfig()
 logger = logging.getLogger("flow")
 logger.setLevel(logging.INFO)
 
 
+UDYAM_ANSWER_PROMPT = AnswerPrompt(
+    "udyam_answer",
+    """You are a legal expert on Indian Laws. Answer the user's query based on the [Knowledge] provided below. Keep the following in mind:
+
+  Answer Based on Provided Texts: Base your answer solely on the information found in [Knowledge].
+
+  Accuracy and Relevance: Ensure that your responses are accurate and relevant to the question asked. Your answers should reflect the content and context of the provided legal texts.
+
+  Admitting Lack of Information: If the information necessary to answer a question is not available in the provided texts, respond with "I don't know." Do not attempt to infer, guess, or provide information outside the scope of the provided texts.
+
+  Citing Sources: When providing an answer, cite the specific text or document from the provided materials. This will help in validating the response and maintaining transparency.
+
+  Confidentiality and Professionalism: Maintain a professional tone in all responses. Ensure confidentiality and do not request or disclose personal information. Be brief and use grade 8 level English.
+
+  Limitations Reminder: Regularly remind the user that your capabilities are limited to the information available in the provided legal texts and that you are an AI model designed to assist with legal information, not provide legal advice.
+
+  Example Interaction:
+  User:What are the requirements from my company for it to be officially registered?
+  Bot: According to the Companies Act, 2013, the checklist for Private Limited Company Registration includes having at least two directors (with a DIN issued by the Ministry of Corporate Affairs), a unique company name, no minimum capital requirement, and a registered office. Additionally, one director must be a resident of India.
+
+  User: How can I register a business in Germany?
+  Bot: Sorry, I don't know.
+
+  User: What is the Capital of Vietnam?
+  Bot: Sorry, this doesn't look like a legal question. I can only attempt to answer legal queries related to Udyam.""",
+)
+
+
+VENTURE_ANSWER_PROMPT = AnswerPrompt(
+    "venture_answer",
+    """You are a legal expert on Indian Laws. Answer the user's query based on the [Knowledge] provided below. Keep the following in mind:
+
+  Answer Based on Provided Texts: Base your answer solely on the information found in [Knowledge].
+
+  Accuracy and Relevance: Ensure that your responses are accurate and relevant to the question asked. Your answers should reflect the content and context of the provided legal texts.
+
+  Admitting Lack of Information: If the information necessary to answer a question is not available in the provided texts, respond with "I don't know." Do not attempt to infer, guess, or provide information outside the scope of the provided texts.
+
+  Citing Sources: When providing an answer, cite the specific text or document from the provided materials. This will help in validating the response and maintaining transparency.
+
+  Confidentiality and Professionalism: Maintain a professional tone in all responses. Ensure confidentiality and do not request or disclose personal information. Be brief and use grade 8 level English.
+
+  Limitations Reminder: Regularly remind the user that your capabilities are limited to the information available in the provided legal texts and that you are an AI model designed to assist with legal information, not provide legal advice.
+
+  Example Interaction:
+  User:What are the requirements from my company for it to be officially registered?
+  Bot: According to the Companies Act, 2013, the checklist for Private Limited Company Registration includes having at least two directors (with a DIN issued by the Ministry of Corporate Affairs), a unique company name, no minimum capital requirement, and a registered office. Additionally, one director must be a resident of India.
+
+  User: How can I register a business in Germany?
+  Bot: Sorry, I don't know.
+
+  User: What is the Capital of Vietnam?
+  Bot: Sorry, this doesn't look like a legal question. I can only attempt to answer legal queries related to business venture, gst, specific to India.""",
+)
+
+
 class Status(Enum):
     WAIT_FOR_ME = 0
     WAIT_FOR_USER_INPUT = 1
@@ -33,8 +101,56 @@ class Status(Enum):
     WAIT_FOR_CALLBACK = 3
 
 
+class Variables(SessionVariables):
+    __slots__ = (
+        "service_picked",
+        "name",
+        "business_name",
+        "business_category",
+        "query",
+        "udyam_query",
+        "history",
+        "history_summary",
+        "rag_trigger",
+        "random_query",
+        "investment",
+        "turnover",
+        "invalid_category",
+        "documents",
+        "has_aadhar",
+        "has_pan",
+        "has_gst_number",
+        "has_prev",
+        "business_eligible",
+        "udyam_flow",
+        "gst_flow",
+        "form_input",
+        "providers",
+        "selected_provider",
+        "selected_provider_name",
+        "selected_base_fee",
+        "intent_fulfillment_time",
+        "odr_providers",
+        "search_req",
+        "select_req",
+        "init_req",
+        "init_results",
+        "invalid_email",
+        "r_name",
+        "r_phone",
+        "r_email",
+        "c_name",
+        "c_phone",
+        "c_email",
+        "c_address",
+        "c_city",
+        "dispute_details",
+        "claim_value",
+    )
+
+
 class FSM:
-    states = [
+    states = (
         "zero",
         "select_language",
         "select_options_main",
@@ -102,45 +218,135 @@ class FSM:
         "send_link_odr",
         "ask_further_assistance",
         "end",
-    ]
+    )
+    # reached only through the explicit transitions in build_transitions
+    extra_states = (
+        "ask_for_question",
+        "fetch_answer",
+        "generate_response",
+        "ask_for_another_question",
+        "process_query",
+        "generate_query_response",
+    )
 
     status = Status.WAIT_FOR_ME
-    variables = dict()
+    variables_cls = Variables
+    # enter callbacks that wait on the LLM; the async path runs them in an executor
+    blocking_states = (
+        "generate_query_response",
+        "generate_response",
+        "generate_udyam_response",
+    )
+    beckn_client = beckn.default_client
+    provider_search_cache = search_cache.default_cache
+    # set to a quote_prefetch.QuotePrefetcher to fetch quotes while the user picks
+    quote_prefetcher = None
+    history_window = ChatHistory()
+    answer_cache = AnswerCache()
+    # set to an answer_stream.AnswerStream to send answers sentence by sentence;
+    # not used for sessions with a batch_cb
+    answer_stream = None
+    batch_cb = None
+    # check the main menu and rag_trigger guards with one lookup, see
+    # fsm_graph.discriminator
+    compiled_dispatch = True
+    # "builtin" runs next() without transitions.Machine, see fsm_graph.StateGraph
+    engine = "transitions"
+    _graph = None
 
     def _save_state(self):
-        return self.state, self.variables
+        self.variables.mark_clean()
+        return self.state, self.variables.to_dict()
+
+    def _save_delta(self):
+        return self.state, self.variables.take_patch()
 
     def _restore_state(self, state, variables):
         self.state = state
+        if not isinstance(variables, Variables):
+            variables = Variables(variables)
         self.variables = variables
         self.status = Status.WAIT_FOR_ME
 
+    def _save_snapshot(self, compress=False):
+        self.variables.mark_clean()
+        return snapshot_codec(FSM).encode(self.state, self.variables, compress)
+
+    def _save_snapshot_delta(self, compress=False):
+        return snapshot_codec(FSM).encode_delta(self.state, self.variables, compress)
+
+    def _restore_snapshot(self, snapshot):
+        self._restore_state(*snapshot_codec(FSM).decode(snapshot))
+
     def process_input_or_callback(self, input):
         self.input = input
+        cb = self.cb
+        buffer = None if self.batch_cb is None else OutputBuffer()
+        if buffer is not None:
+            self.cb = buffer
+        try:
+            while self.state != "end":
+                self.next()
+                if self.status == Status.MOVE_FORWARD:
+                    continue
+                else:
+                    break
+        finally:
+            if buffer is not None:
+                self.cb = cb
+                buffer.flush(self.batch_cb)
 
-        while self.state != "end":
-            self.next()
-            if self.status == Status.MOVE_FORWARD:
-                continue
-            else:
-                break
+    async def process_input_or_callback_async(self, input):
+        import asyncio
 
-    def __init__(self, cb: callable, generate_reference_id: callable = None):
+        self.input = input
+        cb = self.cb
+        buffer = None if self.batch_cb is None else OutputBuffer()
+        # cb runs on the loop, also for states run in the executor
+        relay = OutputRelay(
+            cb if buffer is None else buffer, asyncio.get_running_loop()
+        )
+        self.cb = relay
+        try:
+            while self.state != "end":
+                await self._graph.trigger_async(self)
+                # deliver this step's outputs, in order, before the next state runs
+                await relay.flush()
+                if self.status == Status.MOVE_FORWARD:
+                    continue
+                else:
+                    break
+        finally:
+            self.cb = cb
+            relay.close()
+            if buffer is not None:
+                result = buffer.flush(self.batch_cb)
+                if inspect.isawaitable(result):
+                    await result
+
+    def __init__(
+        self,
+        cb: callable,
+        generate_reference_id: callable = None,
+        batch_cb: callable = None,
+    ):
+        # with batch_cb, each turn's outputs go to it as one list and cb is unused
         self.cb = cb
         self.generate_reference_id = generate_reference_id
+        self.batch_cb = batch_cb
+        self.variables = Variables()
+        compiled_graph(FSM).attach(self)
 
+    def next(self):
+        return self._graph.trigger(self)
+
+    @staticmethod
+    def build_transitions():
         transitions = [
             {"trigger": "next", "source": FSM.states[i], "dest": FSM.states[i + 1]}
             for i in range(len(FSM.states) - 1)
         ]
 
-        FSM.states.append("ask_for_question")
-        FSM.states.append("fetch_answer")
-        FSM.states.append("generate_response")
-        FSM.states.append("ask_for_another_question")
-        FSM.states.append("process_query")
-        FSM.states.append("generate_query_response")
-
         transitions.append(
             {
                 "trigger": "next",
@@ -815,7 +1021,7 @@ class FSM:
             }
         )
         transitions.reverse()
-        Machine(model=self, states=FSM.states, transitions=transitions, initial="zero")
+        return transitions
 
     # helper functions
     def yes_or_no(self, message):
@@ -831,6 +1037,37 @@ class FSM:
             )
         )
 
+    def _answer(self, prompt, query, chunks, knowledge):
+        """Answer ``query`` from ``chunks``, send it and add it to the chat history."""
+        chat_history_str = self.history_window.render(self.variables)
+
+        # answers that build on earlier turns are not shared between sessions
+        cache_key = None
+        if not chat_history_str:
+            cache_key = self.answer_cache.key(query, chunks, prompt.version)
+        out = self.answer_cache.get(cache_key)
+        streamed = False
+        if out is None:
+            messages = prompt.messages(
+                knowledge, chat_history_str, query, self.variables.cache
+            )
+            # a batch_cb gets the turn's outputs at once, so streaming cannot help
+            if self.answer_stream is None or self.batch_cb is not None:
+                out = llm(messages)
+            else:
+                out = self.answer_stream.send(self.send_text, llm_stream(messages))
+                streamed = True
+            self.answer_cache.put(cache_key, out)
+
+        # update chat_history
+        self.history_window.add(self.variables, query, out)
+        if not streamed:
+            self.cb(FSMOutput(text=f"{out}"))
+        return out
+
+    def send_text(self, text):
+        self.cb(FSMOutput(text=text))
+
     def create_options(self, message, services_data, menu_selector=None):
         services = [
             OptionsListType(id=str(i), title=title)
@@ -879,92 +1116,57 @@ class FSM:
             )
             self.status = Status.MOVE_FORWARD
         else:
-            chat_history = self.variables.get("history", [])
-            chat_history_str = "\n".join(
-                [f"{row['name']}: {row['message']}" for row in chat_history]
+            self._answer(
+                UDYAM_ANSWER_PROMPT, self.variables["query"], chunks, knowledge
             )
-
-            out = llm(
-                [
-                    sm(
-                        f"""You are a legal expert on Indian Laws. Answer the user's query based on the [Knowledge] provided below. Keep the following in mind:
-
-  Answer Based on Provided Texts: Base your answer solely on the information found in [Knowledge].
-
-  Accuracy and Relevance: Ensure that your responses are accurate and relevant to the question asked. Your answers should reflect the content and context of the provided legal texts.
-
-  Admitting Lack of Information: If the information necessary to answer a question is not available in the provided texts, respond with "I don't know." Do not attempt to infer, guess, or provide information outside the scope of the provided texts.
-
-  Citing Sources: When providing an answer, cite the specific text or document from the provided materials. This will help in validating the response and maintaining transparency.
-
-  Confidentiality and Professionalism: Maintain a professional tone in all responses. Ensure confidentiality and do not request or disclose personal information. Be brief and use grade 8 level English.
-
-  Limitations Reminder: Regularly remind the user that your capabilities are limited to the information available in the provided legal texts and that you are an AI model designed to assist with legal information, not provide legal advice.
-
-  Example Interaction:
-  User:What are the requirements from my company for it to be officially registered?
-  Bot: According to the Companies Act, 2013, the checklist for Private Limited Company Registration includes having at least two directors (with a DIN issued by the Ministry of Corporate Affairs), a unique company name, no minimum capital requirement, and a registered office. Additionally, one director must be a resident of India.
-
-  User: How can I register a business in Germany?
-  Bot: Sorry, I don't know.
-
-  User: What is the Capital of Vietnam?
-  Bot: Sorry, this doesn't look like a legal question. I can only attempt to answer legal queries related to Udyam.
-
-
-    [Knowledge]
-    {knowledge}
-
-    [Chat History]
-    {chat_history_str}
-    """
-                    ),
-                    um(f"User: {self.variables['query']}\nBot: "),
-                ]
-            )
-
-            # update chat_history
-            chat_history.append({"name": "User", "message": self.variables["query"]})
-            chat_history.append({"name": "Bot", "message": out})
-            self.variables["history"] = chat_history
-            self.cb(FSMOutput(text=f"{out}"))
-
             self.status = Status.MOVE_FORWARD
 
     # condition checks
+    @discriminator(user_input, "1")
     def is_know_more(self):
         return self.input == "1"
 
+    @discriminator(user_input, "2")
     def is_udyam_eligibility(self):
         return self.input == "2"
 
+    @discriminator(user_input, "3")
     def is_consult_advisor(self):
         return self.input == "3"
 
+    @discriminator(user_input, "4")
     def if_gst_registration(self):
         return self.input == "4"
 
+    @discriminator(user_input, "5")
     def is_udyam_registration(self):
         return self.input == "5"
 
+    @discriminator(user_input, "6")
     def is_odr(self):
         return self.input == "6"
 
+    @discriminator(user_input, "1")
     def if_assistance_required(self):
         return self.input == "1"
 
+    @discriminator(user_input, "2")
     def if_assistance_not_required(self):
         return self.input == "2"
 
+    @discriminator(variable("business_eligible"), True)
     def is_business_eligible(self):
         return self.variables["business_eligible"] == True
 
+    @discriminator(variable("business_eligible"), False)
     def is_business_not_eligible(self):
         return self.variables["business_eligible"] == False
 
+    @discriminator(user_input, "1")
     def is_confirmed(self):
         return self.input == "1"
 
+    @discriminator(user_input, "2")
     def is_not_confirmed(self):
         return self.input == "2"
 
@@ -974,45 +1176,59 @@ class FSM:
     def is_random_query(self):
         return self.variables["random_query"]
 
+    @discriminator(variable("rag_trigger"), "investment")
     def is_investment_query(self):
         return self.variables["rag_trigger"] == "investment"
 
+    @discriminator(variable("rag_trigger"), "turnover")
     def is_turnover_query(self):
         return self.variables["rag_trigger"] == "turnover"
 
+    @discriminator(variable("rag_trigger"), "sector_lending")
     def is_sector_lending_query(self):
         return self.variables["rag_trigger"] == "sector_lending"
 
+    @discriminator(variable("rag_trigger"), "business_type")
     def is_business_type_query(self):
         return self.variables["rag_trigger"] == "business_type"
 
+    @discriminator(variable("rag_trigger"), "requirements")
     def is_requirements_query(self):
         return self.variables["rag_trigger"] == "requirements"
 
+    @discriminator(variable("rag_trigger"), "select_udyam_advisor")
     def is_select_udyam_advisor_query(self):
         return self.variables["rag_trigger"] == "select_udyam_advisor"
 
+    @discriminator(variable("rag_trigger"), "confirm_udyam_advisor")
     def is_confirm_udyam_advisor_query(self):
         return self.variables["rag_trigger"] == "confirm_udyam_advisor"
 
+    @discriminator(variable("rag_trigger"), "udyam_form")
     def is_udyam_form_query(self):
         return self.variables["rag_trigger"] == "udyam_form"
 
+    @discriminator(variable("rag_trigger"), "select_advisor")
     def is_select_advisor_query(self):
         return self.variables["rag_trigger"] == "select_advisor"
 
+    @discriminator(variable("rag_trigger"), "confirm_advisor")
     def is_confirm_advisor_query(self):
         return self.variables["rag_trigger"] == "confirm_advisor"
 
+    @discriminator(variable("rag_trigger"), "name")
     def is_name_query(self):
         return self.variables["rag_trigger"] == "name"
 
+    @discriminator(variable("rag_trigger"), "business_name")
     def is_business_name_query(self):
         return self.variables["rag_trigger"] == "business_name"
 
+    @discriminator(variable("rag_trigger"), "documents")
     def is_documents_query(self):
         return self.variables["rag_trigger"] == "documents"
 
+    @discriminator(variable("rag_trigger"), "slot")
     def is_slot_query(self):
         return self.variables["rag_trigger"] == "slot"
 
@@ -1043,6 +1259,7 @@ class FSM:
         )
         self.status = Status.WAIT_FOR_USER_INPUT
 
+    @discriminator(user_input, "language_selected")
     def if_dialog_contains_selected_language(self):
         if self.input == "language_selected":
             return True
@@ -1094,56 +1311,9 @@ class FSM:
             )
             self.status = Status.MOVE_FORWARD
         else:
-            chat_history = self.variables.get("history", [])
-            chat_history_str = "\n".join(
-                [f"{row['name']}: {row['message']}" for row in chat_history]
+            self._answer(
+                VENTURE_ANSWER_PROMPT, self.variables["query"], chunks, knowledge
             )
-
-            out = llm(
-                [
-                    sm(
-                        f"""You are a legal expert on Indian Laws. Answer the user's query based on the [Knowledge] provided below. Keep the following in mind:
-
-  Answer Based on Provided Texts: Base your answer solely on the information found in [Knowledge].
-
-  Accuracy and Relevance: Ensure that your responses are accurate and relevant to the question asked. Your answers should reflect the content and context of the provided legal texts.
-
-  Admitting Lack of Information: If the information necessary to answer a question is not available in the provided texts, respond with "I don't know." Do not attempt to infer, guess, or provide information outside the scope of the provided texts.
-
-  Citing Sources: When providing an answer, cite the specific text or document from the provided materials. This will help in validating the response and maintaining transparency.
-
-  Confidentiality and Professionalism: Maintain a professional tone in all responses. Ensure confidentiality and do not request or disclose personal information. Be brief and use grade 8 level English.
-
-  Limitations Reminder: Regularly remind the user that your capabilities are limited to the information available in the provided legal texts and that you are an AI model designed to assist with legal information, not provide legal advice.
-
-  Example Interaction:
-  User:What are the requirements from my company for it to be officially registered?
-  Bot: According to the Companies Act, 2013, the checklist for Private Limited Company Registration includes having at least two directors (with a DIN issued by the Ministry of Corporate Affairs), a unique company name, no minimum capital requirement, and a registered office. Additionally, one director must be a resident of India.
-
-  User: How can I register a business in Germany?
-  Bot: Sorry, I don't know.
-
-  User: What is the Capital of Vietnam?
-  Bot: Sorry, this doesn't look like a legal question. I can only attempt to answer legal queries related to business venture, gst, specific to India.
-
-
-    [Knowledge]
-    {knowledge}
-
-    [Chat History]
-    {chat_history_str}
-    """
-                    ),
-                    um(f"User: {self.variables['query']}\nBot: "),
-                ]
-            )
-
-            # update chat_history
-            chat_history.append({"name": "User", "message": self.variables["query"]})
-            chat_history.append({"name": "Bot", "message": out})
-            self.variables["history"] = chat_history
-            self.cb(FSMOutput(text=f"{out}"))
-
             self.status = Status.MOVE_FORWARD
 
     def on_enter_ask_for_another_question(self):
@@ -1223,58 +1393,9 @@ class FSM:
             )
             self.status = Status.MOVE_FORWARD
         else:
-            chat_history = self.variables.get("history", [])
-            chat_history_str = "\n".join(
-                [f"{row['name']}: {row['message']}" for row in chat_history]
-            )
-
-            out = llm(
-                [
-                    sm(
-                        f"""You are a legal expert on Indian Laws. Answer the user's query based on the [Knowledge] provided below. Keep the following in mind:
-
-  Answer Based on Provided Texts: Base your answer solely on the information found in [Knowledge].
-
-  Accuracy and Relevance: Ensure that your responses are accurate and relevant to the question asked. Your answers should reflect the content and context of the provided legal texts.
-
-  Admitting Lack of Information: If the information necessary to answer a question is not available in the provided texts, respond with "I don't know." Do not attempt to infer, guess, or provide information outside the scope of the provided texts.
-
-  Citing Sources: When providing an answer, cite the specific text or document from the provided materials. This will help in validating the response and maintaining transparency.
-
-  Confidentiality and Professionalism: Maintain a professional tone in all responses. Ensure confidentiality and do not request or disclose personal information. Be brief and use grade 8 level English.
-
-  Limitations Reminder: Regularly remind the user that your capabilities are limited to the information available in the provided legal texts and that you are an AI model designed to assist with legal information, not provide legal advice.
-
-  Example Interaction:
-  User:What are the requirements from my company for it to be officially registered?
-  Bot: According to the Companies Act, 2013, the checklist for Private Limited Company Registration includes having at least two directors (with a DIN issued by the Ministry of Corporate Affairs), a unique company name, no minimum capital requirement, and a registered office. Additionally, one director must be a resident of India.
-
-  User: How can I register a business in Germany?
-  Bot: Sorry, I don't know.
-
-  User: What is the Capital of Vietnam?
-  Bot: Sorry, this doesn't look like a legal question. I can only attempt to answer legal queries related to Udyam.
-
-
-    [Knowledge]
-    {knowledge}
-
-    [Chat History]
-    {chat_history_str}
-    """
-                    ),
-                    um(f"User: {self.variables['udyam_query']}\nBot: "),
-                ]
+            self._answer(
+                UDYAM_ANSWER_PROMPT, self.variables["udyam_query"], chunks, knowledge
             )
-
-            # update chat_history
-            chat_history.append(
-                {"name": "User", "message": self.variables["udyam_query"]}
-            )
-            chat_history.append({"name": "Bot", "message": out})
-            self.variables["history"] = chat_history
-            self.cb(FSMOutput(text=f"{out}"))
-
             self.status = Status.MOVE_FORWARD
 
     def on_enter_ask_for_another_udyam_question(self):
@@ -1535,70 +1656,21 @@ class FSM:
         self.cb(FSMOutput(text=msg))
 
         try:
-            columns = {
-                "SN": "service_number",
-                "Provider name": "provider_name",
-                "Provider Short Desc": "short_desc",
-                "Provider Long Desc": "long_desc",
-                "Provider Addnt Desc URL": "url",
-                "Provider Image": "image",
-                "item.descriptor.code": "descriptor_code",
-                "item.descriptor.name": "descriptor_name",
-                "item.descriptor.short_desc": "descriptor_short_desc",
-                "item.descriptor.long_desc": "descriptor_long_desc",
-                "item.descriptor.Images": "descriptor_images",
-                "item base fee": "base_fee",
-                "Item per hearing fee": "item_per_hearing_fee",
-                "categories_id": "categories_id",
-                "intent.fulfillment.time": "intent_fulfillment_time",
-            }
-            df = pd.read_excel(
-                "pulse/data/venture_dummy_catalog.xlsx", usecols=columns.keys()
-            )
-            df = df.rename(columns=columns)
-            providers = []
-
-            for i, row in df.iterrows():
-                provider_name = row["provider_name"]
-                short_desc = row["short_desc"]
-                long_desc = row["long_desc"]
-                url = row["url"]
-                # image = row['image']
-                descriptor_code = row["descriptor_code"]
-                descriptor_name = row["descriptor_name"]
-                descriptor_short_desc = row["descriptor_short_desc"]
-                descriptor_long_desc = row["descriptor_long_desc"]
-                descriptor_images = row["descriptor_images"]
-                base_fee = row["base_fee"]
-                item_per_hearing_fee = row["item_per_hearing_fee"]
-
-                timestamp_obj = datetime.fromisoformat(
-                    row["intent_fulfillment_time"].replace("Z", "+00:00")
-                )
-
-                # Convert datetime object to Unix timestamp
-                readable_timestamp = timestamp_obj.strftime("%Y-%m-%d %H:%M")
-
+            table = catalog.load("pulse/data/venture_dummy_catalog.xlsx")
+            for i, row in enumerate(table):
                 self.cb(
                     FSMOutput(
-                        text=f"{provider_name}\n{short_desc}\n{long_desc}\nURL: {url}\nBase Fee: {base_fee}\nItem per Hearing Fee: {item_per_hearing_fee}\nFulfillment Time: {readable_timestamp}",
+                        text=row["card_text"],
                         type=MessageType.INTERACTIVE,
                         # media_url=image,
                         options_list=[
                             OptionsListType(id=str(i + 1), title="Book Appointment")
                         ],
                         footer="Click below to book this advocate",
-                        header=provider_name,
+                        header=row["provider_name"],
                     )
                 )
-                providers.append(
-                    {
-                        "id": row["service_number"],
-                        "provider_name": row["provider_name"],
-                        "base_fee": row["base_fee"],
-                        "intent_fulfillment_time": readable_timestamp,
-                    }
-                )
+            providers = table.providers()
 
         except FileNotFoundError:
             print("Error: business_venture.xlsx not found.")
@@ -1713,70 +1785,21 @@ class FSM:
         self.cb(FSMOutput(text=msg))
 
         try:
-            columns = {
-                "SN": "service_number",
-                "Provider name": "provider_name",
-                "Provider Short Desc": "short_desc",
-                "Provider Long Desc": "long_desc",
-                "Provider Addnt Desc URL": "url",
-                "Provider Image": "image",
-                "item.descriptor.code": "descriptor_code",
-                "item.descriptor.name": "descriptor_name",
-                "item.descriptor.short_desc": "descriptor_short_desc",
-                "item.descriptor.long_desc": "descriptor_long_desc",
-                "item.descriptor.Images": "descriptor_images",
-                "item base fee": "base_fee",
-                "Item per hearing fee": "item_per_hearing_fee",
-                "categories_id": "categories_id",
-                "intent.fulfillment.time": "intent_fulfillment_time",
-            }
-            df = pd.read_excel(
-                "pulse/data/venture_dummy_catalog.xlsx", usecols=columns.keys()
-            )
-            df = df.rename(columns=columns)
-            providers = []
-
-            for i, row in df.iterrows():
-                provider_name = row["provider_name"]
-                short_desc = row["short_desc"]
-                long_desc = row["long_desc"]
-                url = row["url"]
-                # image = row['image']
-                descriptor_code = row["descriptor_code"]
-                descriptor_name = row["descriptor_name"]
-                descriptor_short_desc = row["descriptor_short_desc"]
-                descriptor_long_desc = row["descriptor_long_desc"]
-                descriptor_images = row["descriptor_images"]
-                base_fee = row["base_fee"]
-                item_per_hearing_fee = row["item_per_hearing_fee"]
-
-                timestamp_obj = datetime.fromisoformat(
-                    row["intent_fulfillment_time"].replace("Z", "+00:00")
-                )
-
-                # Convert datetime object to Unix timestamp
-                readable_timestamp = timestamp_obj.strftime("%Y-%m-%d %H:%M")
-
+            table = catalog.load("pulse/data/venture_dummy_catalog.xlsx")
+            for i, row in enumerate(table):
                 self.cb(
                     FSMOutput(
-                        text=f"{provider_name}\n{short_desc}\n{long_desc}\nURL: {url}\nBase Fee: {base_fee}\nItem per Hearing Fee: {item_per_hearing_fee}\nFulfillment Time: {readable_timestamp}",
+                        text=row["card_text"],
                         type=MessageType.INTERACTIVE,
                         # media_url=image,
                         options_list=[
                             OptionsListType(id=str(i + 1), title="Book Appointment")
                         ],
                         footer="Click below to book this advocate",
-                        header=provider_name,
+                        header=row["provider_name"],
                     )
                 )
-                providers.append(
-                    {
-                        "id": row["service_number"],
-                        "provider_name": row["provider_name"],
-                        "base_fee": row["base_fee"],
-                        "intent_fulfillment_time": readable_timestamp,
-                    }
-                )
+            providers = table.providers()
 
         except FileNotFoundError:
             print("Error: business_venture.xlsx not found.")
@@ -1964,34 +1987,41 @@ class FSM:
         self.yes_or_no(message)
         self.status = Status.WAIT_FOR_USER_INPUT
 
-    def on_enter_fetch_odr_providers(self):
-        self.status = Status.WAIT_FOR_ME
-        url = "https://ps-bap-client.becknprotocol.io/search"
+    def search_request(self):
         data = {
-            "context": {
-                "domain": "online-dispute-resolution:0.1.0",
-                "location": {"country": {"code": "IND"}},
-                "transaction_id": "",
-                "message_id": "",
-                "action": "search",
-                "timestamp": "",
-                "version": "1.1.0",
-                "bap_id": "ps-bap-network.becknprotocol.io",
-                "bap_uri": "https://ps-bap-network.becknprotocol.io",
-                "ttl": "PT10M",
-            },
+            "context": beckn.context("search"),
             "message": {
                 "intent": {
                     "item": {"descriptor": {"name": "financial disputes"}},
                 }
             },
         }
-        response = requests.post(url, json=data)
+        return data
+
+    def on_enter_fetch_odr_providers(self):
+        self.status = Status.WAIT_FOR_ME
+        data = self.search_request()
+        response = self.provider_search_cache.get(
+            data, lambda: self.beckn_client.post("search", data)
+        )
+        self.handle_search_response(response)
+        self.status = Status.MOVE_FORWARD
+
+    async def on_enter_fetch_odr_providers_async(self):
+        self.status = Status.WAIT_FOR_ME
+        data = self.search_request()
+        response = await self.provider_search_cache.get_async(
+            data, lambda: self.beckn_client.post_async("search", data)
+        )
+        self.handle_search_response(response)
+        self.status = Status.MOVE_FORWARD
+
+    def handle_search_response(self, response):
         if response.status_code == 200:
-            self.parse_search_response(response.json())
+            self.parse_search_response(response)
         else:
             logger.error(
-                f"Request to {url} failed. Status code: {response.status_code}\n Error msg: {response.text}"
+                f"Request to {self.beckn_client.url('search')} failed. Status code: {response.status_code}\n Error msg: {response.text}"
             )
             self.cb(
                 FSMOutput(
@@ -2000,10 +2030,8 @@ class FSM:
             )
             self.variables["search_req"] = False
 
-        self.status = Status.MOVE_FORWARD
-
-    def parse_search_response(self, response_data):
-        if response_data["responses"] == []:
+    def parse_search_response(self, result):
+        if not result.responded:
             self.cb(
                 FSMOutput(
                     text="Pulse server seems to be down, please try again in sometime"
@@ -2011,38 +2039,24 @@ class FSM:
             )
             self.variables["search_req"] = False
         else:
-            providers = []
-            i = 0
-            for resp in response_data["responses"]:
-                if "providers" in resp["message"]:
-                    for provider in resp["message"]["providers"]:
-                        provider_info = {
-                            "bpp_id": resp["context"]["bpp_id"],
-                            "bpp_uri": resp["context"]["bpp_uri"],
-                            "id": provider["id"],
-                            "name": provider["descriptor"]["name"],
-                            "short_desc": provider["descriptor"]["short_desc"],
-                            "long_desc": provider["descriptor"]["long_desc"],
-                            "url": provider["descriptor"]["additional_desc"]["url"],
-                        }
-                        providers.append(provider_info)
-                        self.cb(
-                            FSMOutput(
-                                text=f"{provider_info['short_desc']}\n{provider_info['long_desc']}\nURL: {provider_info['url']}",
-                                type=MessageType.INTERACTIVE,
-                                # media_url=image,
-                                options_list=[
-                                    OptionsListType(id=str(i + 1), title="Know more")
-                                ],
-                                header=provider_info.get("name"),
-                            )
-                        )
-                        i += 1
-                else:
-                    print("No providers found in the response")
+            providers = [dict(provider) for provider in result.providers]
+            for i, provider_info in enumerate(providers):
+                self.cb(
+                    FSMOutput(
+                        text=f"{provider_info['short_desc']}\n{provider_info['long_desc']}\nURL: {provider_info['url']}",
+                        type=MessageType.INTERACTIVE,
+                        # media_url=image,
+                        options_list=[OptionsListType(id=str(i + 1), title="Know more")],
+                        header=provider_info.get("name"),
+                    )
+                )
 
             self.variables["search_req"] = True
             self.variables["odr_providers"] = providers
+            if self.quote_prefetcher is not None:
+                self.quote_prefetcher.prefetch(
+                    [(p, self.select_request(p)) for p in providers], self.beckn_client
+                )
 
     def on_enter_select_odr_provider(self):
         self.status = Status.WAIT_FOR_ME
@@ -2053,36 +2067,48 @@ class FSM:
             int(self.input) - 1
         ]
 
-    def on_enter_selected_provider_details(self):
-        self.status = Status.WAIT_FOR_ME
-        url = "https://ps-bap-client.becknprotocol.io/select"
+    def select_request(self, provider=None):
+        if provider is None:
+            provider = self.variables["selected_provider"]
         data = {
-            "context": {
-                "domain": "online-dispute-resolution:0.1.0",
-                "location": {"country": {"code": "IND"}},
-                "transaction_id": "",
-                "message_id": "",
-                "action": "select",
-                "timestamp": "",
-                "version": "1.1.0",
-                "bap_uri": "https://ps-bap-network.becknprotocol.io",
-                "bap_id": "ps-bap-network.becknprotocol.io",
-                "bpp_id": self.variables["selected_provider"]["bpp_id"],
-                "bpp_uri": self.variables["selected_provider"]["bpp_uri"],
-                "ttl": "PT10M",
-            },
-            "message": {
-                "order": {
-                    "providers": {"id": self.variables["selected_provider"]["id"]}
-                }
-            },
+            "context": beckn.context("select", provider),
+            "message": {"order": {"providers": {"id": provider["id"]}}},
         }
-        response = requests.post(url, json=data)
+        return data
+
+    def on_enter_selected_provider_details(self):
+        self.status = Status.WAIT_FOR_ME
+        quote = None
+        if self.quote_prefetcher is not None:
+            quote = self.quote_prefetcher.get(self.variables["selected_provider"])
+        if quote is not None:
+            self.show_quote(quote)
+        else:
+            data = self.select_request()
+            self.handle_select_response(self.beckn_client.post("select", data))
+        self.status = Status.MOVE_FORWARD
+
+    async def on_enter_selected_provider_details_async(self):
+        self.status = Status.WAIT_FOR_ME
+        quote = None
+        if self.quote_prefetcher is not None:
+            provider = self.variables["selected_provider"]
+            quote = await self.quote_prefetcher.get_async(provider)
+        if quote is not None:
+            self.show_quote(quote)
+        else:
+            data = self.select_request()
+            self.handle_select_response(
+                await self.beckn_client.post_async("select", data)
+            )
+        self.status = Status.MOVE_FORWARD
+
+    def handle_select_response(self, response):
         if response.status_code == 200:
             self.parse_select_response(response.json())
         else:
             logger.error(
-                f"Request to {url} failed. Status code: {response.status_code}\n Error msg: {response.text}"
+                f"Request to {self.beckn_client.url('select')} failed. Status code: {response.status_code}\n Error msg: {response.text}"
             )
             self.cb(
                 FSMOutput(
@@ -2090,11 +2116,11 @@ class FSM:
                 )
             )
             self.variables["select_req"] = False
-        self.status = Status.MOVE_FORWARD
 
     def parse_select_response(self, response_data):
         self.status = Status.WAIT_FOR_ME
-        if response_data["responses"] == []:
+        quote = beckn.parse_quote(response_data)
+        if quote is None:
             self.cb(
                 FSMOutput(
                     text="Pulse server seems to be down, please try again in sometime"
@@ -2103,27 +2129,20 @@ class FSM:
             logger.error(f"No responses found from bpp providers")
             self.variables["select_req"] = False
         else:
-            resp = response_data["responses"][0]
-            self.variables["selected_provider"].update(
-                {
-                    "quote": resp["message"]["order"]["quote"]["price"]["value"],
-                    "base_fee": resp["message"]["order"]["quote"]["breakup"][0][
-                        "price"
-                    ]["value"],
-                    "fee_per_hearing": resp["message"]["order"]["quote"]["breakup"][1][
-                        "price"
-                    ]["value"],
-                }
-            )
-            info = self.variables["selected_provider"]
-            message = f"{info['short_desc']}\n"
-            message += f"{info['long_desc']}\n"
-            message += f"{info['url']}\n"
-            message += f"Base Fee: Rs. {info['base_fee']}\n"
-            message += f"Fee per Hearing: Rs. {info['fee_per_hearing']}\n"
-            message += f"Total Fee: Rs. {info['quote']}"
-            self.cb(FSMOutput(text=message, header=info["name"]))
-            self.variables["select_req"] = True
+            self.show_quote(quote)
+
+    def show_quote(self, quote):
+        self.variables["selected_provider"].update(quote)
+        self.variables.touch("selected_provider")
+        info = self.variables["selected_provider"]
+        message = f"{info['short_desc']}\n"
+        message += f"{info['long_desc']}\n"
+        message += f"{info['url']}\n"
+        message += f"Base Fee: Rs. {info['base_fee']}\n"
+        message += f"Fee per Hearing: Rs. {info['fee_per_hearing']}\n"
+        message += f"Total Fee: Rs. {info['quote']}"
+        self.cb(FSMOutput(text=message, header=info["name"]))
+        self.variables["select_req"] = True
 
     def on_enter_fix_provider(self):
         self.status = Status.WAIT_FOR_ME
@@ -2207,64 +2226,81 @@ class FSM:
         self.status = Status.MOVE_FORWARD
         self.status = Status.WAIT_FOR_USER_INPUT
 
+    def init_requests(self):
+        submission_id = "c844d5f4-29c3-4398-b594-8b4716ef5dbf"
+        bodies = [
+            (
+                "respondent",
+                self.init_request_body(
+                    "respondent",
+                    self.variables["r_name"],
+                    self.variables["r_phone"],
+                    self.variables["r_email"],
+                    submission_id,
+                ),
+            ),
+            (
+                "dispute-details",
+                self.init_request_body(
+                    "dispute-details",
+                    self.variables["c_name"],
+                    self.variables["c_email"],
+                    self.variables["c_phone"],
+                    submission_id,
+                ),
+            ),
+            (
+                "consent-form",
+                self.init_request_body(
+                    "consent-form",
+                    self.variables["c_name"],
+                    self.variables["c_email"],
+                    self.variables["c_phone"],
+                    submission_id,
+                ),
+            ),
+        ]
+        return bodies
+
     def on_enter_confirm_odr_provider(self):
         self.status = Status.WAIT_FOR_ME
-        url = "https://ps-bap-client.becknprotocol.io/init"
-        data = self.init_request_body(
-            "respondent",
-            self.variables["r_name"],
-            self.variables["r_phone"],
-            self.variables["r_email"],
-            "c844d5f4-29c3-4398-b594-8b4716ef5dbf",
-        )
-        response = requests.post(url, json=data)
-        if response.status_code == 200:
-            logger.info(f"init consent form response: {response.json()}")
-            self.variables["init_req"] = True
+        bodies = self.init_requests()
+        responses = self.beckn_client.post_many("init", [data for _, data in bodies])
+        self.handle_init_responses([tag for tag, _ in bodies], responses)
 
-        else:
-            logger.error(
-                f"Request to {url} failed. Status code: {response.status_code}\n Error msg: {response.text}"
-            )
-            self.variables["init_req"] = False
+        self.status = Status.MOVE_FORWARD
 
-        data = self.init_request_body(
-            "dispute-details",
-            self.variables["c_name"],
-            self.variables["c_email"],
-            self.variables["c_phone"],
-            "c844d5f4-29c3-4398-b594-8b4716ef5dbf",
+    async def on_enter_confirm_odr_provider_async(self):
+        self.status = Status.WAIT_FOR_ME
+        bodies = self.init_requests()
+        responses = await self.beckn_client.post_many_async(
+            "init", [data for _, data in bodies]
         )
-        response = requests.post(url, json=data)
-        if response.status_code == 200:
-            logger.info(f"init consent form response: {response.json()}")
-            self.variables["init_req"] = True
+        self.handle_init_responses([tag for tag, _ in bodies], responses)
 
-        else:
-            logger.error(
-                f"Request to {url} failed. Status code: {response.status_code}\n Error msg: {response.text}"
-            )
-            self.variables["init_req"] = False
+        self.status = Status.MOVE_FORWARD
 
-        data = self.init_request_body(
-            "consent-form",
-            self.variables["c_name"],
-            self.variables["c_email"],
-            self.variables["c_phone"],
-            "c844d5f4-29c3-4398-b594-8b4716ef5dbf",
-        )
-        response = requests.post(url, json=data)
+    def handle_init_responses(self, tags, responses):
+        results = {}
+        for tag, response in zip(tags, responses):
+            results[tag] = {
+                "ok": self.handle_init_response(tag, response),
+                "status_code": response.status_code,
+            }
+        self.variables["init_results"] = results
+        self.variables["init_req"] = all(result["ok"] for result in results.values())
+
+    def handle_init_response(self, tag, response):
+        name = tag.replace("-", " ")
         if response.status_code == 200:
-            logger.info(f"init consent form response: {response.json()}")
-            self.variables["init_req"] = True
+            logger.info(f"init {name} response: {response.json()}")
+            return True
 
         else:
             logger.error(
-                f"Request to {url} failed. Status code: {response.status_code}\n Error msg: {response.text}"
+                f"Request to {self.beckn_client.url('init')} failed. Status code: {response.status_code}\n Error msg: {response.text}"
             )
-            self.variables["init_req"] = False
-
-        self.status = Status.MOVE_FORWARD
+            return False
 
     def init_request_body(
         self,
@@ -2275,20 +2311,7 @@ class FSM:
         submission_id,
     ):
         return {
-            "context": {
-                "domain": "online-dispute-resolution:0.1.0",
-                "location": {"country": {"code": "IND"}},
-                "action": "init",
-                "version": "1.1.0",
-                "transaction_id": "",
-                "message_id": "",
-                "timestamp": "",
-                "bap_uri": "https://ps-bap-network.becknprotocol.io",
-                "bap_id": "ps-bap-network.becknprotocol.io",
-                "bpp_id": self.variables["selected_provider"]["bpp_id"],
-                "bpp_uri": self.variables["selected_provider"]["bpp_uri"],
-                "ttl": "PT10M",
-            },
+            "context": beckn.context("init", self.variables["selected_provider"]),
             "message": {
                 "order": {
                     "provider": {"id": self.variables["selected_provider"]["id"]},
@@ -2326,24 +2349,9 @@ class FSM:
         self.yes_or_no(message)
         self.status = Status.WAIT_FOR_USER_INPUT
 
-    def on_enter_send_link_odr(self):
-        self.status = Status.WAIT_FOR_ME
-        url = "https://ps-bap-client.becknprotocol.io/confirm"
+    def confirm_request(self):
         data = {
-            "context": {
-                "domain": "online-dispute-resolution:0.1.0",
-                "location": {"country": {"code": "IND"}},
-                "action": "confirm",
-                "version": "1.1.0",
-                "transaction_id": "",
-                "message_id": "",
-                "timestamp": "",
-                "bap_uri": "https://ps-bap-network.becknprotocol.io",
-                "bap_id": "ps-bap-network.becknprotocol.io",
-                "bpp_id": self.variables["selected_provider"]["bpp_id"],
-                "bpp_uri": self.variables["selected_provider"]["bpp_uri"],
-                "ttl": "PT10M",
-            },
+            "context": beckn.context("confirm", self.variables["selected_provider"]),
             "message": {
                 "order": {
                     "provider": {"id": self.variables["selected_provider"]["id"]},
@@ -2376,15 +2384,30 @@ class FSM:
                 }
             },
         }
-        response = requests.post(url, json=data)
+        return data
+
+    def on_enter_send_link_odr(self):
+        self.status = Status.WAIT_FOR_ME
+        data = self.confirm_request()
+        self.handle_confirm_response(self.beckn_client.post("confirm", data))
+        self.status = Status.MOVE_FORWARD
 
+    async def on_enter_send_link_odr_async(self):
+        self.status = Status.WAIT_FOR_ME
+        data = self.confirm_request()
+        self.handle_confirm_response(
+            await self.beckn_client.post_async("confirm", data)
+        )
+        self.status = Status.MOVE_FORWARD
+
+    def handle_confirm_response(self, response):
         if response.status_code == 200:
             self.parse_confirm_response(response.json())
             logger.info(f"Request to cofirm: {response.status_code}")
 
         else:
             logger.error(
-                f"Request to {url} failed. Status code: {response.status_code}\n Error msg: {response.text}"
+                f"Request to {self.beckn_client.url('confirm')} failed. Status code: {response.status_code}\n Error msg: {response.text}"
             )
             self.cb(
                 FSMOutput(
@@ -2392,8 +2415,6 @@ class FSM:
                 )
             )
 
-        self.status = Status.MOVE_FORWARD
-
     def parse_confirm_response(self, response_data):
         resp = response_data["responses"][0]
         self.variables["selected_provider"].update(
@@ -2414,6 +2435,7 @@ class FSM:
                 "docs_url": resp["message"]["order"]["docs"][0]["url"],
             }
         )
+        self.variables.touch("selected_provider")
         info = self.variables["selected_provider"]
         message = f"Your dispute has been confirmed. You may contact your case manager, {info['agent_name']}.\n"
 
@@ -2454,6 +2476,8 @@ if __name__ == "__main__":
             print(f"File: {kwargs['file']}")
         return print(x)
 
+    magic_string = deps.magic_string()
+
     def generate_reference_id():
         return magic_string + str(uuid.uuid4())[:25] + magic_string
 